@@ -3,6 +3,7 @@ import requests
 import pandas as pd
 import time
 import os
+import threading
 from io import BytesIO
 from datetime import datetime
 import plotly.express as px
@@ -17,7 +18,18 @@ import json
 API_BASE_URL = 'http://localhost:8000'  # Ensure this matches your Django backend URL
 UPLOAD_ENDPOINT = f'{API_BASE_URL}/product/create/'  # Corrected endpoint to match your working reference
 STATUS_ENDPOINT_TEMPLATE = f'{API_BASE_URL}/{{}}/'  # Endpoint to retrieve individual product status
+EVENTS_ENDPOINT_TEMPLATE = f'{API_BASE_URL}/product/{{}}/events/'  # Server-sent processing status events
 DATA_ENDPOINT = f'{API_BASE_URL}/product/'  # Endpoint to list all products
+CHANGES_ENDPOINT = f'{API_BASE_URL}/product/changes/'  # Products created or modified since a token
+STATS_ENDPOINT = f'{API_BASE_URL}/product/stats/'  # Aggregate statistics computed by the backend
+SEARCH_ENDPOINT = f'{API_BASE_URL}/product/search/'  # Full-text search over products
+PAGE_SIZE = 1000  # Rows per page when listing products
+REFRESH_SECONDS = 30  # How long fetched product data is reused before checking for changes
+PRODUCT_COLUMNS = [
+    'id', 'call_sid', 'audio_url', 'audio_transcription', 'extracted_product_name', 'extracted_description',
+    'extracted_price', 'price_amount', 'price_currency', 'extracted_location', 'created_at', 'updated_at', 'state',
+    'processed', 'pending_transcription', 'pending_ner',
+]
 
 # Path to the hardcoded audio file
 HARDCODED_FILE_PATH = './sugat.wav'  # Updated to 'sugat.wav' as per your reference
@@ -85,26 +97,196 @@ def get_processing_status(product_id):
         st.error(f"An error occurred while fetching status: {e}")
         return None
 
-def fetch_all_products():
+def follow_status_events(product_id, timeout=600):
     """
-    Fetches all products from the backend.
+    Follows the product's status event stream until processing completes or fails.
+    The server closes the stream periodically; we reconnect with the last
+    event id so no transition is missed.
+
+    Args:
+        product_id (int): The ID of the product.
+        timeout (float): Give up after this many seconds.
+
+    Yields:
+        tuple: (event name, product state dict) as transitions happen.
+    """
+    url = EVENTS_ENDPOINT_TEMPLATE.format(product_id)
+    last_event_id = None
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        headers = {'Accept': 'text/event-stream'}
+        if last_event_id:
+            headers['Last-Event-ID'] = last_event_id
+        with requests.get(url, headers=headers, stream=True, timeout=(5, 60)) as response:
+            response.raise_for_status()
+            event, data = None, None
+            for line in response.iter_lines(decode_unicode=True):
+                if line.startswith('id:'):
+                    last_event_id = line[3:].strip()
+                elif line.startswith('event:'):
+                    event = line[6:].strip()
+                elif line.startswith('data:'):
+                    data = json.loads(line[5:])
+                elif not line and event:
+                    yield event, data
+                    if event in ('processed', 'failed', 'deleted'):
+                        return
+                    event, data = None, None
+
+def fetch_changes(since=None):
+    """
+    Fetches every product created or modified after the change token `since`.
+
+    Args:
+        since (str, optional): Token returned by a previous fetch; None for a full sync.
+
+    Returns:
+        tuple: (list of product dicts in change order, token to pass next time).
+    """
+    params = {'page_size': PAGE_SIZE}
+    rows = []
+    while True:
+        if since:
+            params['since'] = since
+        response = requests.get(CHANGES_ENDPOINT, params=params)
+        response.raise_for_status()
+        payload = response.json()
+        rows.extend(payload['results'])
+        since = payload['next']
+        if not payload['has_more']:
+            return rows, since
+
+def to_products_frame(rows):
+    """
+    Builds a typed products DataFrame, parsing timestamps once.
+    """
+    df = pd.DataFrame(rows, columns=PRODUCT_COLUMNS)
+    df['id'] = df['id'].astype('int64')
+    df['created_at'] = pd.to_datetime(df['created_at'], utc=True)
+    df['updated_at'] = pd.to_datetime(df['updated_at'], utc=True)
+    for column in ('processed', 'pending_transcription', 'pending_ner'):
+        df[column] = df[column].astype(bool)
+    # Decimals arrive as strings
+    df['price_amount'] = pd.to_numeric(df['price_amount'], errors='coerce')
+    return df
+
+@st.cache_data(ttl=REFRESH_SECONDS, show_spinner=False)
+def fetch_new_changes(since):
+    """
+    Fetches rows changed after `since`; cached per token for REFRESH_SECONDS,
+    so reruns in between make no requests.
+    """
+    rows, next_since = fetch_changes(since)
+    return to_products_frame(rows), next_since
+
+@st.cache_resource
+def product_store():
+    """
+    Process-wide store of the rows synced so far and the change token after them.
+    """
+    return {'df': to_products_frame([]), 'since': None, 'lock': threading.Lock()}
+
+def load_products():
+    """
+    Returns every product, fetching only rows created or modified since the
+    last sync and merging them into the cached DataFrame.
+
+    Returns:
+        DataFrame: Typed product data, oldest first. Treat it as read-only; copy before editing.
+    """
+    store = product_store()
+    with store['lock']:
+        try:
+            changed_df, since = fetch_new_changes(store['since'])
+        except Exception as e:
+            st.error(f"An error occurred while fetching data: {e}")
+            return store['df']
+        if since != store['since']:
+            if not changed_df.empty:
+                # Changed rows replace their previous version
+                combined = pd.concat([store['df'], changed_df], ignore_index=True)
+                combined = combined.drop_duplicates('id', keep='last')
+                store['df'] = combined.sort_values(['created_at', 'id']).reset_index(drop=True)
+            store['since'] = since
+        return store['df']
+
+def reset_products():
+    """
+    Drops the cached rows so the next load starts from scratch.
+    """
+    fetch_new_changes.clear()
+    product_store.clear()
+
+def fetch_stats(start=None, end=None, bucket='day'):
+    """
+    Fetches aggregate product statistics from the backend.
+
+    Args:
+        start (date, optional): First day to include.
+        end (date, optional): Last day to include.
+        bucket (str): 'hour', 'day' or 'week'.
 
     Returns:
-        DataFrame: Pandas DataFrame containing all product data.
+        dict or None: Status counts, creation buckets and latency percentiles.
     """
+    params = {'bucket': bucket}
+    if start:
+        params['start'] = start.isoformat()
+    if end:
+        params['end'] = end.isoformat()
     try:
-        response = requests.get(DATA_ENDPOINT)
-        st.write("**Fetch Products Response Status Code:**", response.status_code)  # Debugging
-        st.write("**Fetch Products Response Content:**", response.text)  # Debugging
-        if response.status_code == 200:
-            return pd.DataFrame(response.json())
-        else:
-            st.error(f"Failed to fetch data. Status code: {response.status_code}")
+        response = requests.get(STATS_ENDPOINT, params=params)
+        if response.status_code != 200:
+            st.error(f"Failed to fetch statistics. Status code: {response.status_code}")
+            return None
+        return response.json()
+    except Exception as e:
+        st.error(f"An error occurred while fetching statistics: {e}")
+        return None
+
+def fetch_recent_products(limit=10):
+    """
+    Fetches the newest products with only the columns the Home tab shows.
+
+    Returns:
+        DataFrame: Up to `limit` products, newest first.
+    """
+    params = {'page_size': limit, 'fields': 'id,call_sid,processed,created_at'}
+    try:
+        response = requests.get(DATA_ENDPOINT, params=params)
+        if response.status_code != 200:
             return pd.DataFrame()
+        return pd.DataFrame(response.json()['results'])
     except Exception as e:
-        st.error(f"An error occurred while fetching data: {e}")
+        st.error(f"An error occurred while fetching recent products: {e}")
         return pd.DataFrame()
 
+def search_product_ids(query, page_size=100):
+    """
+    Runs a full-text search on the backend, following `next` until every
+    match has been fetched.
+
+    Returns:
+        list or None: Matching product ids, best match first; None on error.
+    """
+    url = SEARCH_ENDPOINT
+    params = {'q': query, 'page_size': page_size, 'fields': 'id'}
+    ids = []
+    try:
+        while url:
+            response = requests.get(url, params=params)
+            if response.status_code != 200:
+                st.error(f"Search failed. Status code: {response.status_code}")
+                return None
+            data = response.json()
+            ids.extend(row['id'] for row in data['results'])
+            # `next` already carries the query string
+            url, params = data.get('next'), None
+        return ids
+    except Exception as e:
+        st.error(f"An error occurred while searching: {e}")
+        return None
+
 def download_link(object_to_download, download_filename, download_link_text):
     """
     Generates a download link for a dataframe or text.
@@ -177,25 +359,16 @@ tabs = st.tabs(["🏠 Home", "🎤 Upload Audio", "🔍 Data Explorer", "📈 An
 with tabs[0]:
     st.header("📈 Overview")
 
-    # Fetch data
+    # Fetch aggregates
     with st.spinner('Fetching data...'):
-        df = fetch_all_products()
-
-    if not df.empty:
-        # Ensure 'created_at' is datetime with timezone awareness
-        if not pd.api.types.is_datetime64_any_dtype(df['created_at']):
-            df['created_at'] = pd.to_datetime(df['created_at'])
-            st.write("**Converted 'created_at' to datetime.**")
-        if df['created_at'].dt.tz is None:
-            # Assume UTC if no timezone is set
-            df['created_at'] = df['created_at'].dt.tz_localize('UTC')
-            st.write("**'created_at' was timezone-naive and has been localized to UTC.**")
+        stats = fetch_stats()
 
+    if stats and stats['total']:
         # Key Metrics
-        total_products = len(df)
-        processed_products = df[df['processed'] == True].shape[0]
-        pending_transcriptions = df[df['pending_transcription'] == True].shape[0]
-        pending_ner = df[df['pending_ner'] == True].shape[0]
+        total_products = stats['total']
+        processed_products = stats['processed']
+        pending_transcriptions = stats['pending_transcription']
+        pending_ner = stats['pending_ner']
 
         # Metrics Display
         col1, col2, col3, col4 = st.columns(4)
@@ -217,16 +390,19 @@ with tabs[0]:
         st.plotly_chart(fig1, use_container_width=True)
 
         st.subheader("Products Added Over Time")
-        df_sorted = df.sort_values('created_at')
-        fig2 = px.line(df_sorted, x='created_at', y='id', title='Products Added Over Time', labels={'id': 'Product Count', 'created_at': 'Date'})
+        buckets_df = pd.DataFrame(stats['buckets'])
+        buckets_df['bucket'] = pd.to_datetime(buckets_df['bucket'])
+        buckets_df['total'] = buckets_df['count'].cumsum()
+        fig2 = px.line(buckets_df, x='bucket', y='total', title='Products Added Over Time', labels={'total': 'Product Count', 'bucket': 'Date'})
         st.plotly_chart(fig2, use_container_width=True)
 
         st.markdown("---")
 
         # Recent Activities
         st.subheader("Recent Activities")
-        recent_df = df.sort_values('created_at', ascending=False).head(10)
-        st.table(recent_df[['id', 'call_sid', 'processed', 'created_at']])
+        recent_df = fetch_recent_products()
+        if not recent_df.empty:
+            st.table(recent_df[['id', 'call_sid', 'processed', 'created_at']])
     else:
         st.info("No data available to display.")
 
@@ -278,33 +454,39 @@ with tabs[1]:
                         if product_id:
                             st.success(f"Uploaded successfully! Product ID: {product_id}")
 
-                            # Initialize status
-                            processing = True
-                            while processing:
-                                status = get_processing_status(product_id)
-                                if status:
-                                    processing_flag = status.get('pending_transcription', False) or status.get('pending_ner', False)
-                                    if not processing_flag:
-                                        st.success("Processing Complete!")
-                                        # Display results
-                                        st.subheader("Transcription")
-                                        st.write(status.get('audio_transcription', "No transcription available."))
-
-                                        st.subheader("Extracted Product Information")
-                                        extracted_info = {
-                                            "Product Name": status.get('extracted_product_name', "N/A"),
-                                            "Description": status.get('extracted_description', "N/A"),
-                                            "Price": status.get('extracted_price', "N/A"),
-                                            "Location": status.get('extracted_location', "N/A"),
-                                        }
-                                        st.json(extracted_info)
-                                        processing = False
-                                    else:
-                                        st.info("Processing in progress...")
-                                        time.sleep(3)  # Wait before next status check
-                                else:
-                                    st.error("Error fetching processing status.")
-                                    processing = False
+                            # Wait for the server to push status transitions
+                            progress = st.empty()
+                            progress.info("Processing in progress...")
+                            finished = failed = False
+                            try:
+                                for event, _ in follow_status_events(product_id):
+                                    if event == 'transcription_done':
+                                        progress.info("Transcription done, extracting product information...")
+                                    elif event == 'processed':
+                                        finished = True
+                                    elif event == 'failed':
+                                        failed = True
+                                        progress.error("Processing failed after all retries.")
+                            except Exception as e:
+                                st.error(f"Lost the processing status stream: {e}")
+
+                            status = get_processing_status(product_id) if finished else None
+                            if status:
+                                progress.success("Processing Complete!")
+                                # Display results
+                                st.subheader("Transcription")
+                                st.write(status.get('audio_transcription', "No transcription available."))
+
+                                st.subheader("Extracted Product Information")
+                                extracted_info = {
+                                    "Product Name": status.get('extracted_product_name', "N/A"),
+                                    "Description": status.get('extracted_description', "N/A"),
+                                    "Price": status.get('extracted_price', "N/A"),
+                                    "Location": status.get('extracted_location', "N/A"),
+                                }
+                                st.json(extracted_info)
+                            elif not failed:
+                                st.error("Error fetching processing status.")
         else:
             st.warning("Please enter the Call SID.")
 
@@ -314,20 +496,20 @@ with tabs[1]:
 with tabs[2]:
     st.header("🔍 Data Explorer")
 
-    # Fetch data
+    # Fetch data (only rows added since the last load)
     with st.spinner('Fetching data...'):
-        df = fetch_all_products()
+        df = load_products()
 
     if not df.empty:
         # Filters
         st.sidebar.subheader("Filter Products")
         status_filter = st.sidebar.multiselect(
             "Processing Status",
-            options=["Processed", "Pending Transcription", "Pending NER"],
-            default=["Processed", "Pending Transcription", "Pending NER"]
+            options=["Processed", "Pending Transcription", "Pending NER", "Failed"],
+            default=["Processed", "Pending Transcription", "Pending NER", "Failed"]
         )
 
-        call_sid_filter = st.sidebar.text_input("Call SID Contains")
+        search_query = st.sidebar.text_input("Search (product, location, transcript, call SID)")
 
         # Apply filters
         filtered_df = df.copy()
@@ -337,8 +519,13 @@ with tabs[2]:
             filtered_df = pd.concat([filtered_df, df[df['pending_transcription'] == True]], ignore_index=True)
         if "Pending NER" in status_filter:
             filtered_df = pd.concat([filtered_df, df[df['pending_ner'] == True]], ignore_index=True)
-        if call_sid_filter.strip():
-            filtered_df = filtered_df[filtered_df['call_sid'].str.contains(call_sid_filter.strip(), na=False)]
+        if "Failed" in status_filter:
+            filtered_df = pd.concat([filtered_df, df[df['state'] == 'failed']], ignore_index=True)
+        if search_query.strip():
+            # Matched by the backend's full-text index rather than scanning the frame
+            matching_ids = search_product_ids(search_query.strip())
+            if matching_ids is not None:
+                filtered_df = filtered_df[filtered_df['id'].isin(matching_ids)]
 
         # Remove duplicates after filtering
         filtered_df = filtered_df.drop_duplicates()
@@ -395,18 +582,9 @@ with tabs[3]:
 
     # Fetch data
     with st.spinner('Fetching data...'):
-        df = fetch_all_products()
+        df = load_products()
 
     if not df.empty:
-        # Convert 'created_at' to datetime with timezone awareness
-        if not pd.api.types.is_datetime64_any_dtype(df['created_at']):
-            df['created_at'] = pd.to_datetime(df['created_at'])
-            st.write("**Converted 'created_at' to datetime.**")
-        if df['created_at'].dt.tz is None:
-            # Assume UTC if no timezone is set
-            df['created_at'] = df['created_at'].dt.tz_localize('UTC')
-            st.write("**'created_at' was timezone-naive and has been localized to UTC.**")
-
         # Filters
         st.sidebar.subheader("Analytics Filters")
         date_range = st.sidebar.date_input(
@@ -425,18 +603,18 @@ with tabs[3]:
         st.write(f"**End Date (UTC):** {end_date}")
         
         # Filter the DataFrame
-        filtered_df = df[(df['created_at'] >= start_date) & (df['created_at'] <= end_date)]
+        filtered_df = df[(df['created_at'] >= start_date) & (df['created_at'] <= end_date)].copy()
 
-        # Key Metrics
+        # Key Metrics, aggregated by the backend over the same range
         st.subheader("Key Metrics")
-        total = len(filtered_df)
-        processed = filtered_df[filtered_df['processed'] == True].shape[0]
-        pending = filtered_df[(filtered_df['pending_transcription'] == True) | (filtered_df['pending_ner'] == True)].shape[0]
+        range_stats = fetch_stats(date_range[0], date_range[1]) or {}
+        latency = range_stats.get('latency_seconds', {})
 
-        col1, col2, col3 = st.columns(3)
-        col1.metric("Total Products", total)
-        col2.metric("Processed", processed)
-        col3.metric("Pending", pending)
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Total Products", range_stats.get('total', 0))
+        col2.metric("Processed", range_stats.get('processed', 0))
+        col3.metric("Pending Transcription", range_stats.get('pending_transcription', 0))
+        col4.metric("Median Processing Time (s)", f"{latency['p50']:.1f}" if latency.get('p50') is not None else "N/A")
 
         st.markdown("---")
 
@@ -451,22 +629,24 @@ with tabs[3]:
             st.info("No location data available for geographical distribution.")
 
         # Price Analysis
-        if 'extracted_price' in filtered_df.columns and not filtered_df['extracted_price'].isnull().all():
+        if not filtered_df['price_amount'].isnull().all():
             st.subheader("Price Analysis")
-            # Clean price data
-            filtered_df['extracted_price_clean'] = filtered_df['extracted_price'].astype(str).str.replace('[^0-9.]', '', regex=True)
-            filtered_df['extracted_price_clean'] = pd.to_numeric(filtered_df['extracted_price_clean'], errors='coerce')
-            fig_price = px.histogram(filtered_df, x='extracted_price_clean', nbins=20, title='Price Distribution', labels={'extracted_price_clean': 'Price'})
+            # The backend's parsed amounts, as used by /stats; one color per currency
+            priced_df = filtered_df.dropna(subset=['price_amount'])
+            fig_price = px.histogram(priced_df, x='price_amount', color='price_currency', nbins=20, title='Price Distribution',
+                                     labels={'price_amount': 'Price', 'price_currency': 'Currency'})
             st.plotly_chart(fig_price, use_container_width=True)
         else:
             st.info("No price data available for analysis.")
 
         # Processing Time Analysis
-        st.subheader("Processing Time Over Time")
-        df_sorted = filtered_df.sort_values('created_at')
-        df_sorted['processing_time'] = df_sorted['created_at'].diff().dt.total_seconds()
-        fig_time = px.line(df_sorted, x='created_at', y='processing_time', title='Processing Time Over Time', labels={'created_at': 'Date', 'processing_time': 'Time (seconds)'})
-        st.plotly_chart(fig_time, use_container_width=True)
+        st.subheader("Processing Time Percentiles")
+        if latency.get('count'):
+            percentiles = {k: v for k, v in latency.items() if k.startswith('p')}
+            fig_time = px.bar(x=list(percentiles.keys()), y=list(percentiles.values()), title='Processing Time Percentiles', labels={'x': 'Percentile', 'y': 'Time (seconds)'})
+            st.plotly_chart(fig_time, use_container_width=True)
+        else:
+            st.info("No processed products in this range yet.")
     else:
         st.info("No data available for analytics.")
 
@@ -519,6 +699,9 @@ with tabs[4]:
 
 # Sidebar for additional navigation or filters if needed
 st.sidebar.markdown("---")
+if st.sidebar.button("Reload All Data"):
+    reset_products()
+    st.rerun()
 st.sidebar.markdown("**About**")
 st.sidebar.info("""
 **Product Audio Processing Dashboard**  
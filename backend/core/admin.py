@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Product
+from .models import Product, ProcessingJob, ProcessingRun
+from .search import search_filter
 
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
@@ -10,9 +11,32 @@ class ProductAdmin(admin.ModelAdmin):
         'extracted_product_name',
         'extracted_description',
         'extracted_price',
-        'pending_transcription',
-        'pending_ner',
+        'price_amount',
+        'state',
+        'transcription_attempts',
+        'ner_attempts',
         'created_at',
     )
-    list_filter = ('pending_transcription', 'pending_ner', 'created_at')
+    list_filter = ('state', 'created_at')
     search_fields = ('extracted_product_name', 'extracted_description')
+
+    def get_search_results(self, request, queryset, search_term):
+        # Use the full-text index instead of icontains scans over search_fields
+        return search_filter(queryset, search_term), False
+
+
+@admin.register(ProcessingJob)
+class ProcessingJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'product', 'status', 'attempts', 'run_after', 'locked_until', 'locked_by', 'updated_at')
+    list_filter = ('status',)
+    raw_id_fields = ('product',)
+
+
+@admin.register(ProcessingRun)
+class ProcessingRunAdmin(admin.ModelAdmin):
+    list_display = (
+        'id', 'product', 'outcome', 'started_at', 'duration', 'transcribe_seconds', 'ner_seconds',
+        'prompt_tokens', 'completion_tokens',
+    )
+    list_filter = ('outcome',)
+    raw_id_fields = ('product', 'job')
@@ -0,0 +1,259 @@
+# core/audio.py
+
+import io
+import logging
+import os
+import wave
+from dataclasses import dataclass
+
+import numpy as np
+from django.conf import settings
+
+from .cache import CacheStats
+
+logger = logging.getLogger(__name__)
+
+AUDIO_PREPROCESS = getattr(settings, 'AUDIO_PREPROCESS', True)
+AUDIO_TARGET_RATE = getattr(settings, 'AUDIO_TARGET_RATE', 16000)
+AUDIO_SILENCE_THRESHOLD_DB = getattr(settings, 'AUDIO_SILENCE_THRESHOLD_DB', -40.0)
+AUDIO_MIN_SECONDS = getattr(settings, 'AUDIO_MIN_SECONDS', 1.0)
+TRANSCRIBE_CHUNK_SECONDS = getattr(settings, 'TRANSCRIBE_CHUNK_SECONDS', 120.0)
+TRANSCRIBE_CHUNK_OVERLAP = getattr(settings, 'TRANSCRIBE_CHUNK_OVERLAP', 1.0)
+
+# Energy VAD frame length and padding kept around detected speech
+FRAME_SECONDS = 0.02
+PAD_SECONDS = 0.2
+
+# Running totals of what preprocessing saved
+audio_stats = CacheStats('audio')
+
+
+class AudioRejected(Exception):
+    """
+    Raised when a recording is silent or too short to be worth transcribing.
+    """
+
+
+@dataclass
+class PreprocessedAudio:
+    file: io.BytesIO
+    filename: str
+    bytes_in: int
+    bytes_out: int
+    seconds_in: float
+    seconds_out: float
+    samples: np.ndarray = None
+    rate: int = AUDIO_TARGET_RATE
+
+
+def decode_wav(audio_file):
+    """
+    Decodes PCM WAV data into float samples in [-1, 1].
+
+    Args:
+        audio_file (file-like): Binary WAV stream.
+
+    Returns:
+        tuple: (samples of shape (frames, channels), sample rate), or None if
+        the stream is not PCM WAV.
+    """
+    try:
+        with wave.open(audio_file, 'rb') as wav:
+            channels = wav.getnchannels()
+            width = wav.getsampwidth()
+            rate = wav.getframerate()
+            raw = wav.readframes(wav.getnframes())
+    except (wave.Error, EOFError):
+        return None
+
+    # A truncated data chunk can end part way through a frame; drop the remainder
+    raw = raw[:len(raw) - len(raw) % (width * channels)]
+    if width == 1:
+        samples = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif width == 2:
+        samples = np.frombuffer(raw, dtype='<i2').astype(np.float32) / 32768.0
+    elif width == 3:
+        bytes_ = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3)
+        ints = (bytes_[:, 0].astype(np.int32) | (bytes_[:, 1].astype(np.int32) << 8)
+                | (bytes_[:, 2].astype(np.int32) << 16))
+        ints = np.where(ints & 0x800000, ints - 0x1000000, ints)
+        samples = ints.astype(np.float32) / 8388608.0
+    elif width == 4:
+        samples = np.frombuffer(raw, dtype='<i4').astype(np.float32) / 2147483648.0
+    else:
+        return None
+
+    return samples.reshape(-1, channels), rate
+
+
+def downmix(samples):
+    """
+    Averages all channels into one.
+    """
+    return samples.mean(axis=1) if samples.ndim == 2 else samples
+
+
+def resample(samples, rate, target_rate):
+    """
+    Resamples mono audio by linear interpolation. When downsampling, a boxcar
+    filter over the decimation ratio first suppresses most aliasing.
+    """
+    if rate == target_rate or samples.size == 0:
+        return samples
+    ratio = rate / target_rate
+    if ratio > 1:
+        width = int(round(ratio))
+        if width > 1:
+            samples = np.convolve(samples, np.ones(width, dtype=np.float32) / width, mode='same')
+    target_length = int(round(samples.size / ratio))
+    positions = np.arange(target_length, dtype=np.float64) * ratio
+    return np.interp(positions, np.arange(samples.size), samples).astype(np.float32)
+
+
+def frame_energy_db(samples, rate, frame_seconds=FRAME_SECONDS):
+    """
+    Returns the RMS level in dBFS of consecutive non-overlapping frames.
+    """
+    frame = max(1, int(rate * frame_seconds))
+    frames = samples.size // frame
+    if frames == 0:
+        return np.empty(0, dtype=np.float32), frame
+    blocks = samples[:frames * frame].reshape(frames, frame)
+    rms = np.sqrt(np.mean(np.square(blocks, dtype=np.float64), axis=1))
+    return 20 * np.log10(np.maximum(rms, 1e-10)), frame
+
+
+def trim_silence(samples, rate, threshold_db=AUDIO_SILENCE_THRESHOLD_DB, pad_seconds=PAD_SECONDS):
+    """
+    Drops leading and trailing frames quieter than `threshold_db`.
+
+    Returns:
+        ndarray: The trimmed samples (empty if every frame is silent).
+    """
+    energy, frame = frame_energy_db(samples, rate)
+    voiced = np.flatnonzero(energy > threshold_db)
+    if voiced.size == 0:
+        return samples[:0]
+    pad = int(rate * pad_seconds)
+    start = max(0, voiced[0] * frame - pad)
+    end = min(samples.size, (voiced[-1] + 1) * frame + pad)
+    return samples[start:end]
+
+
+def split_on_silence(samples, rate, chunk_seconds=None, overlap_seconds=None, search_seconds=None):
+    """
+    Splits audio into chunks of at most about `chunk_seconds`, cutting at the
+    quietest frame in the last `search_seconds` of each chunk so words are
+    rarely cut in half. Consecutive chunks overlap by `overlap_seconds`.
+
+    Args:
+        samples (ndarray): Mono float samples.
+        rate (int): Sample rate of `samples`.
+        chunk_seconds (float): Maximum chunk length; defaults to TRANSCRIBE_CHUNK_SECONDS.
+        overlap_seconds (float): Overlap between chunks; defaults to TRANSCRIBE_CHUNK_OVERLAP.
+        search_seconds (float): Window searched for a cut point; defaults to a quarter chunk.
+
+    Returns:
+        list of tuple: (start, end) sample offsets, in order.
+    """
+    chunk_seconds = chunk_seconds if chunk_seconds is not None else TRANSCRIBE_CHUNK_SECONDS
+    overlap_seconds = overlap_seconds if overlap_seconds is not None else TRANSCRIBE_CHUNK_OVERLAP
+    total = samples.size
+    chunk = int(chunk_seconds * rate)
+    if total <= chunk:
+        return [(0, total)]
+
+    energy, frame = frame_energy_db(samples, rate)
+    search = int((search_seconds if search_seconds is not None else chunk_seconds / 4) * rate)
+    overlap = int(overlap_seconds * rate)
+
+    bounds = []
+    start = 0
+    while start < total:
+        limit = start + chunk
+        if limit >= total:
+            bounds.append((start, total))
+            break
+        # Quietest frame between (limit - search) and limit
+        first = max(start + overlap + frame, limit - search) // frame
+        last = limit // frame
+        window = energy[first:last]
+        cut = (first + int(np.argmin(window))) * frame if window.size else limit
+        bounds.append((start, cut))
+        start = max(cut - overlap, start + 1)
+    return bounds
+
+
+def encode_wav(samples, rate):
+    """
+    Encodes mono float samples as 16-bit PCM WAV.
+    """
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype('<i2')
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(pcm.tobytes())
+    buffer.seek(0)
+    return buffer
+
+
+def preprocess_audio(audio_file, filename):
+    """
+    Shrinks a WAV recording before upload: downmix to mono, resample to
+    AUDIO_TARGET_RATE, trim leading/trailing silence and re-encode as 16-bit PCM.
+
+    Args:
+        audio_file (file-like): Seekable binary audio stream.
+        filename (str): Original file name.
+
+    Returns:
+        PreprocessedAudio or None: None if the audio is not PCM WAV, in which
+        case the original stream should be uploaded unchanged.
+
+    Raises:
+        AudioRejected: If the recording is silent or shorter than AUDIO_MIN_SECONDS.
+    """
+    audio_file.seek(0, os.SEEK_END)
+    bytes_in = audio_file.tell()
+    audio_file.seek(0)
+
+    decoded = decode_wav(audio_file)
+    audio_file.seek(0)
+    if decoded is None:
+        return None
+
+    samples, rate = decoded
+    seconds_in = samples.shape[0] / rate if rate else 0.0
+
+    mono = resample(downmix(samples), rate, AUDIO_TARGET_RATE)
+    trimmed = trim_silence(mono, AUDIO_TARGET_RATE)
+    seconds_out = trimmed.size / AUDIO_TARGET_RATE
+
+    if seconds_out < AUDIO_MIN_SECONDS:
+        audio_stats.incr('rejected')
+        reason = "silent" if trimmed.size == 0 else f"only {seconds_out:.2f}s of audio"
+        raise AudioRejected(f"{filename}: {reason}")
+
+    encoded = encode_wav(trimmed, AUDIO_TARGET_RATE)
+    bytes_out = encoded.getbuffer().nbytes
+
+    audio_stats.incr('processed')
+    audio_stats.incr('bytes_saved', max(0, bytes_in - bytes_out))
+    audio_stats.incr('seconds_saved', max(0.0, seconds_in - seconds_out))
+    logger.debug(
+        f"Preprocessed {filename}: {bytes_in} -> {bytes_out} bytes, "
+        f"{seconds_in:.2f}s -> {seconds_out:.2f}s"
+    )
+
+    return PreprocessedAudio(
+        file=encoded,
+        filename=f"{os.path.splitext(filename)[0]}.wav",
+        bytes_in=bytes_in,
+        bytes_out=bytes_out,
+        seconds_in=seconds_in,
+        seconds_out=seconds_out,
+        samples=trimmed,
+        rate=AUDIO_TARGET_RATE,
+    )
@@ -0,0 +1,246 @@
+# core/benchmark.py
+
+import json
+import logging
+import random
+import re
+import resource
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client
+from django.db.models import Sum
+from django.urls import reverse
+
+from .audio import encode_wav
+from .models import ProcessingJob, Product
+
+logger = logging.getLogger(__name__)
+
+LATENCY_DISTRIBUTIONS = ('fixed', 'uniform', 'exponential', 'lognormal')
+
+BENCHMARK_RATE = 16000
+
+
+def sample_latency(mean, distribution, rng):
+    """
+    Draws one latency in seconds with the given mean.
+    """
+    if mean <= 0:
+        return 0.0
+    if distribution == 'uniform':
+        return rng.uniform(0, 2 * mean)
+    if distribution == 'exponential':
+        return rng.expovariate(1 / mean)
+    if distribution == 'lognormal':
+        # sigma 0.5 gives a realistic long tail; mu keeps the mean at `mean`
+        sigma = 0.5
+        return rng.lognormvariate(np.log(mean) - sigma ** 2 / 2, sigma)
+    return mean
+
+
+class MockAIServer:
+    """
+    Local stand-in for the Whisper and chat-completion endpoints, served on a
+    background thread. Responses are delayed by `*_latency` seconds on average
+    and fail with a 503 at `error_rate`.
+
+    Chat requests get a NER-shaped JSON reply (an array for batched prompts),
+    and every transcript is unique so the caches do not hide the API calls.
+    """
+
+    def __init__(self, transcription_latency=0.5, chat_latency=0.5, distribution='fixed', error_rate=0.0, seed=None):
+        self.transcription_latency = transcription_latency
+        self.chat_latency = chat_latency
+        self.distribution = distribution
+        self.error_rate = error_rate
+        self.requests = {'transcription': 0, 'chat': 0, 'errors': 0}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def api_base(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _draw(self, operation):
+        """
+        Returns (latency, fail, sequence number) for one request.
+        """
+        mean = self.transcription_latency if operation == 'transcription' else self.chat_latency
+        with self._lock:
+            self.requests[operation] += 1
+            fail = self._rng.random() < self.error_rate
+            if fail:
+                self.requests['errors'] += 1
+            return sample_latency(mean, self.distribution, self._rng), fail, self.requests[operation]
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+                if self.path.endswith('/audio/transcriptions'):
+                    operation = 'transcription'
+                elif self.path.endswith('/chat/completions'):
+                    operation = 'chat'
+                else:
+                    return self._reply(404, {'error': {'message': 'Not found'}})
+
+                latency, fail, number = server._draw(operation)
+                time.sleep(latency)
+                if fail:
+                    return self._reply(503, {'error': {'message': 'Simulated overload'}})
+                if operation == 'transcription':
+                    return self._reply(200, {'text': f"मेरो {number} किलो आलु बेच्नु छ"})
+                return self._reply(200, chat_reply(json.loads(body)))
+
+            def _reply(self, status, payload):
+                data = json.dumps(payload, ensure_ascii=False).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def chat_reply(request):
+    """
+    Builds a chat-completion response for a single or batched NER prompt.
+    """
+    prompt = request['messages'][-1]['content']
+    fields = {"product_name": "आलु", "description": "ताजा आलु", "price": "५० रुपैयाँ", "location": "काठमाडौं"}
+    ids = re.findall(r'"id": "(\d+)"', prompt.split('Reply with only', 1)[0])
+    content = [dict(fields, id=item_id) for item_id in ids] if ids else fields
+    return {'choices': [{'message': {'role': 'assistant', 'content': json.dumps(content, ensure_ascii=False)}}]}
+
+
+def make_recording(index, seconds=3.0, rate=BENCHMARK_RATE):
+    """
+    Builds a short WAV of tone bursts separated by silence. The pitch depends on
+    `index`, so every recording hashes differently.
+    """
+    t = np.arange(int(seconds * rate)) / rate
+    tone = 0.5 * np.sin(2 * np.pi * (220 + index) * t)
+    tone[(t % 1.0) > 0.7] = 0  # 300 ms of silence each second
+    return encode_wav(tone, rate).getvalue()
+
+
+def percentiles(values, points=(50, 90, 95, 99)):
+    """
+    Nearest-rank percentiles of `values`.
+
+    Returns:
+        dict: {"p50": ..., ...}; empty if there are no values.
+    """
+    ordered = sorted(values)
+    if not ordered:
+        return {}
+    return {
+        f"p{p}": ordered[min(len(ordered) - 1, max(0, -(-p * len(ordered) // 100) - 1))]
+        for p in points
+    }
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def upload(index, prefix):
+    """
+    Posts one recording to ProductCreateAPIView.
+
+    Returns:
+        tuple: (call_sid, seconds, HTTP status).
+    """
+    call_sid = f"{prefix}{index}"
+    audio = SimpleUploadedFile(f"{call_sid}.wav", make_recording(index), content_type='audio/wav')
+    started = time.monotonic()
+    response = Client().post(reverse('product-create'), {'call_sid': call_sid, 'audio_url': audio})
+    return call_sid, time.monotonic() - started, response.status_code
+
+
+def wait_until_settled(call_sids, timeout, poll_interval=0.2):
+    """
+    Waits until every product is processed or its job has failed for good.
+
+    Returns:
+        bool: False if `timeout` ran out first.
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        unsettled = Product.objects.filter(call_sid__in=call_sids, processed_at__isnull=True).exclude(
+            jobs__status=ProcessingJob.STATUS_FAILED,
+        )
+        if not unsettled.exists():
+            return True
+        time.sleep(poll_interval)
+    return False
+
+
+def run_benchmark(uploads, concurrency, timeout, prefix='BENCH-'):
+    """
+    Uploads `uploads` recordings with `concurrency` parallel clients and waits
+    for the workers (already running) to process them.
+
+    Returns:
+        dict: Upload latency and time-to-processed percentiles (seconds),
+        throughput (products per second), counts and peak RSS (MB).
+    """
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda index: upload(index, prefix), range(uploads)))
+    upload_seconds = time.monotonic() - started
+
+    created = [call_sid for call_sid, _, status in results if status == 201]
+    settled = wait_until_settled(created, timeout)
+    elapsed = time.monotonic() - started
+
+    jobs = ProcessingJob.objects.filter(product__call_sid__in=created)
+    products = Product.objects.filter(call_sid__in=created, processed_at__isnull=False)
+    to_processed = [
+        (done - created_at).total_seconds() for created_at, done in products.values_list('created_at', 'processed_at')
+    ]
+    return {
+        'uploads': uploads,
+        'created': len(created),
+        'processed': len(to_processed),
+        'failed': jobs.filter(status=ProcessingJob.STATUS_FAILED).count(),
+        'retries': jobs.aggregate(retries=Sum('attempts'))['retries'] - jobs.count() if created else 0,
+        'timed_out': not settled,
+        'upload_latency': percentiles([seconds for _, seconds, _ in results]),
+        'time_to_processed': percentiles(to_processed),
+        'upload_throughput': uploads / upload_seconds if upload_seconds else 0.0,
+        'throughput': len(to_processed) / elapsed if elapsed else 0.0,
+        'elapsed': elapsed,
+        'peak_rss_mb': peak_rss_mb(),
+    }
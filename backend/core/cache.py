@@ -0,0 +1,276 @@
+# core/cache.py
+
+import logging
+import threading
+import unicodedata
+from collections import Counter, OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import IntegrityError
+from django.db.models import F
+from django.utils import timezone
+
+from .hashing import hash_chunks
+from .models import NERCache, Product, TranscriptCache
+from .serializers import ProductRetrieveSerializer
+
+logger = logging.getLogger(__name__)
+
+TRANSCRIPT_CACHE_SIZE = getattr(settings, 'TRANSCRIPT_CACHE_SIZE', 1024)
+NER_CACHE_SIZE = getattr(settings, 'NER_CACHE_SIZE', 1024)
+NER_CACHE_TTL = getattr(settings, 'NER_CACHE_TTL', 30 * 24 * 60 * 60)
+PRODUCT_CACHE_ALIAS = getattr(settings, 'PRODUCT_CACHE_ALIAS', 'default')
+PRODUCT_CACHE_TTL = getattr(settings, 'PRODUCT_CACHE_TTL', 60 * 60)
+
+
+class LRUCache:
+    """
+    A small thread-safe, bounded least-recently-used cache.
+    """
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                return default
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def set(self, key, value):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class CacheStats:
+    """
+    Thread-safe hit/miss counters, keyed by `<cache>_<event>`. Counters
+    created with a `component` name are exported on /metrics:
+    `metrics.flush_stats` drains what each process counted into the shared
+    totals.
+    """
+    registry = {}
+
+    def __init__(self, component=None):
+        self._counts = Counter()
+        self._pending = Counter()
+        self._lock = threading.Lock()
+        if component:
+            CacheStats.registry[component] = self
+
+    def incr(self, name, amount=1):
+        with self._lock:
+            self._counts[name] += amount
+            self._pending[name] += amount
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._counts)
+
+    def drain(self):
+        """
+        Returns the counts added since the last drain and forgets them.
+        """
+        with self._lock:
+            pending = dict(self._pending)
+            self._pending.clear()
+            return pending
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+            self._pending.clear()
+
+
+cache_stats = CacheStats('cache')
+
+transcript_memory_cache = LRUCache(maxsize=TRANSCRIPT_CACHE_SIZE)
+
+ner_memory_cache = LRUCache(maxsize=NER_CACHE_SIZE)
+
+
+def get_cached_transcript(audio_hash, model, language):
+    """
+    Looks up a transcript for identical audio, checking memory then the database.
+
+    Returns:
+        str or None: The cached transcript, or None on a miss.
+    """
+    key = (audio_hash, model, language)
+    transcript = transcript_memory_cache.get(key)
+    if transcript is not None:
+        cache_stats.incr('transcript_memory_hits')
+        return transcript
+
+    entry = TranscriptCache.objects.filter(audio_hash=audio_hash, model=model, language=language).first()
+    if entry is None:
+        cache_stats.incr('transcript_misses')
+        return None
+
+    cache_stats.incr('transcript_db_hits')
+    TranscriptCache.objects.filter(pk=entry.pk).update(hits=F('hits') + 1, last_hit_at=timezone.now())
+    transcript_memory_cache.set(key, entry.transcript)
+    return entry.transcript
+
+
+def store_transcript(audio_hash, model, language, transcript):
+    """
+    Saves a transcript for later uploads of the same audio.
+    """
+    if not audio_hash or not transcript:
+        return
+    try:
+        TranscriptCache.objects.get_or_create(
+            audio_hash=audio_hash,
+            model=model,
+            language=language,
+            defaults={'transcript': transcript},
+        )
+    except IntegrityError:
+        # Another worker stored the same audio concurrently.
+        pass
+    transcript_memory_cache.set((audio_hash, model, language), transcript)
+
+
+def normalize_transcript(transcript):
+    """
+    Normalizes a transcript for cache keys: Unicode NFC, collapsed whitespace.
+    """
+    return " ".join(unicodedata.normalize('NFC', transcript or "").split())
+
+
+def ner_cache_key(transcript, model, prompt_version, temperature):
+    """
+    Builds the NER cache key for a transcript and the prompt/model settings.
+
+    Returns:
+        tuple: (key, transcript_hash, model, prompt_version, temperature)
+    """
+    transcript_hash = hash_chunks([normalize_transcript(transcript).encode('utf-8')])
+    key = hash_chunks([f"{transcript_hash}|{model}|{prompt_version}|{float(temperature)}".encode('utf-8')])
+    return key, transcript_hash, model, prompt_version, float(temperature)
+
+
+def get_cached_ner(cache_key):
+    """
+    Looks up a memoized NER result, checking memory then the database.
+
+    Args:
+        cache_key (tuple): As returned by `ner_cache_key`.
+
+    Returns:
+        dict or None: A copy of the cached fields, or None on a miss.
+    """
+    key = cache_key[0]
+    result = ner_memory_cache.get(key)
+    if result is not None:
+        cache_stats.incr('ner_memory_hits')
+        return dict(result)
+
+    entry = NERCache.objects.filter(key=key, expires_at__gt=timezone.now()).first()
+    if entry is None:
+        cache_stats.incr('ner_misses')
+        return None
+
+    cache_stats.incr('ner_db_hits')
+    NERCache.objects.filter(pk=entry.pk).update(hits=F('hits') + 1)
+    ner_memory_cache.set(key, entry.result)
+    return dict(entry.result)
+
+
+def store_ner(cache_key, result):
+    """
+    Saves a NER result, replacing any expired entry for the same key.
+    """
+    key, transcript_hash, model, prompt_version, temperature = cache_key
+    NERCache.objects.update_or_create(
+        key=key,
+        defaults={
+            'transcript_hash': transcript_hash,
+            'model': model,
+            'prompt_version': prompt_version,
+            'temperature': temperature,
+            'result': result,
+            'expires_at': timezone.now() + timedelta(seconds=NER_CACHE_TTL),
+        },
+    )
+    ner_memory_cache.set(key, dict(result))
+
+
+def purge_expired_ner_cache():
+    """
+    Deletes expired NER cache rows.
+
+    Returns:
+        int: Number of rows deleted.
+    """
+    deleted, _ = NERCache.objects.filter(expires_at__lte=timezone.now()).delete()
+    if deleted:
+        logger.debug(f"Evicted {deleted} expired NER cache row(s).")
+    return deleted
+
+
+def product_cache():
+    return caches[PRODUCT_CACHE_ALIAS]
+
+
+def product_cache_key(pk, version):
+    """
+    Keys include the row version, so a payload cached by another process can
+    never be served after the product changes.
+    """
+    return f"product:{pk}:v{version}"
+
+
+def get_product_payloads(products):
+    """
+    Returns serialized payloads for `products`, serializing only cache misses.
+
+    Args:
+        products (iterable of Product): Rows with at least `id` and `version` loaded.
+
+    Returns:
+        dict: Product id -> full serialized payload (media URLs are relative).
+    """
+    keys = {product_cache_key(product.pk, product.version): product.pk for product in products}
+    cache = product_cache()
+    payloads = {keys[key]: payload for key, payload in cache.get_many(list(keys)).items()}
+    cache_stats.incr('product_hits', len(payloads))
+
+    missing = [pk for pk in keys.values() if pk not in payloads]
+    if missing:
+        cache_stats.incr('product_misses', len(missing))
+        fresh = {}
+        for product in Product.objects.filter(pk__in=missing):
+            payload = dict(ProductRetrieveSerializer(product).data)
+            payloads[product.pk] = fresh[product_cache_key(product.pk, product.version)] = payload
+        cache.set_many(fresh, PRODUCT_CACHE_TTL)
+    return payloads
+
+
+def invalidate_product(pk, version):
+    """
+    Drops the cached payload for one version of a product.
+    """
+    product_cache().delete(product_cache_key(pk, version))
@@ -0,0 +1,364 @@
+# core/clients.py
+
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from email.utils import parsedate_to_datetime
+
+import httpx
+import requests
+from django.conf import settings
+from django.utils import timezone
+from requests.adapters import HTTPAdapter
+from tenacity import AsyncRetrying, Retrying, retry_if_exception, stop_after_attempt
+
+logger = logging.getLogger(__name__)
+
+HTTP_POOL_SIZE = getattr(settings, 'HTTP_POOL_SIZE', 20)
+HTTP_MAX_ATTEMPTS = getattr(settings, 'HTTP_MAX_ATTEMPTS', 4)
+HTTP_BACKOFF_BASE = getattr(settings, 'HTTP_BACKOFF_BASE', 0.5)
+HTTP_BACKOFF_MAX = getattr(settings, 'HTTP_BACKOFF_MAX', 30.0)
+CIRCUIT_BREAKER_THRESHOLD = getattr(settings, 'CIRCUIT_BREAKER_THRESHOLD', 5)
+CIRCUIT_BREAKER_RESET = getattr(settings, 'CIRCUIT_BREAKER_RESET', 30.0)
+
+# (connect, read) timeouts in seconds per logical endpoint
+HTTP_TIMEOUTS = {
+    'transcription': (5, 120),
+    'chat': (5, 60),
+    'media': (5, 30),
+    **getattr(settings, 'HTTP_TIMEOUTS', {}),
+}
+
+RETRYABLE_STATUS_CODES = {408, 409, 425, 429, 500, 502, 503, 504}
+
+# Bytes read from an upload per write to the socket
+UPLOAD_CHUNK_SIZE = getattr(settings, 'UPLOAD_CHUNK_SIZE', 64 * 1024)
+
+
+class CircuitOpenError(requests.RequestException):
+    """
+    Raised without making a request while an endpoint's circuit is open.
+    """
+
+
+class RetryableHTTPError(requests.HTTPError):
+    """
+    A response with a status worth retrying (429/5xx), carrying any Retry-After delay.
+    """
+
+    def __init__(self, *args, retry_after=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Fails fast after `threshold` consecutive failures. After `reset_timeout`
+    seconds one trial request is let through (half-open); its outcome closes
+    or re-opens the circuit.
+    """
+
+    def __init__(self, name, threshold=CIRCUIT_BREAKER_THRESHOLD, reset_timeout=CIRCUIT_BREAKER_RESET):
+        self.name = name
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return 'half-open'
+        return 'open'
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half-open' and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial_in_flight or self.failures >= self.threshold:
+                if self.opened_at is None:
+                    logger.warning(f"Circuit for {self.name} opened after {self.failures} failure(s)")
+                self.opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+    def release(self):
+        """
+        Gives up a half-open trial that ended without an outcome (e.g. the
+        caller was cancelled), so a later call can make the trial instead.
+        """
+        with self._lock:
+            self._trial_in_flight = False
+
+
+def _build_session():
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+# One keep-alive connection pool shared by all outbound calls
+session = _build_session()
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(endpoint):
+    with _breakers_lock:
+        if endpoint not in _breakers:
+            _breakers[endpoint] = CircuitBreaker(endpoint)
+        return _breakers[endpoint]
+
+
+def parse_retry_after(value):
+    """
+    Parses a Retry-After header (delta seconds or HTTP date) into seconds.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - timezone.now()).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_wait(retry_state):
+    """
+    Tenacity wait strategy: honours Retry-After when the server sent one,
+    otherwise exponential backoff with full jitter.
+    """
+    exc = retry_state.outcome.exception()
+    retry_after = getattr(exc, 'retry_after', None)
+    if retry_after is not None:
+        return min(retry_after, HTTP_BACKOFF_MAX)
+    ceiling = min(HTTP_BACKOFF_MAX, HTTP_BACKOFF_BASE * (2 ** (retry_state.attempt_number - 1)))
+    return random.uniform(0, ceiling)
+
+
+def _is_retryable(exc):
+    return isinstance(exc, (RetryableHTTPError, requests.ConnectionError, requests.Timeout,
+                            httpx.NetworkError, httpx.TimeoutException))
+
+
+def _retrying(retrying_class, endpoint, max_attempts):
+    return retrying_class(
+        stop=stop_after_attempt(max_attempts or HTTP_MAX_ATTEMPTS),
+        wait=backoff_wait,
+        retry=retry_if_exception(_is_retryable),
+        reraise=True,
+        before_sleep=lambda state: logger.warning(
+            f"{endpoint} request failed ({state.outcome.exception()}); retry {state.attempt_number}"
+        ),
+    )
+
+
+def _check_status(breaker, endpoint, response):
+    """
+    Records a response on the breaker and raises for error statuses; a
+    retryable status counts as a failure, anything else as a success.
+    """
+    if response.status_code in RETRYABLE_STATUS_CODES:
+        breaker.record_failure()
+        retry_after = parse_retry_after(response.headers.get('Retry-After'))
+        raise RetryableHTTPError(
+            f"{response.status_code} from {endpoint}", response=response, retry_after=retry_after,
+        )
+    breaker.record_success()
+    response.raise_for_status()
+    return response
+
+
+class UploadSource:
+    """
+    Bytes or a seekable binary file to upload, read in chunks from where the
+    file was positioned. Every read seeks to its own offset under a lock, so
+    retries and concurrent (hedged) attempts can each send the whole file
+    from one handle.
+    """
+
+    def __init__(self, data):
+        self._data = data
+        self._lock = threading.Lock()
+        if isinstance(data, (bytes, bytearray, memoryview)):
+            self._start, self.size = 0, len(data)
+        else:
+            self._start = data.tell()
+            self.size = data.seek(0, os.SEEK_END) - self._start
+            data.seek(self._start)
+
+    def chunks(self, chunk_size=UPLOAD_CHUNK_SIZE):
+        offset = 0
+        while offset < self.size:
+            if isinstance(self._data, (bytes, bytearray, memoryview)):
+                chunk = self._data[offset:offset + chunk_size]
+            else:
+                with self._lock:
+                    self._data.seek(self._start + offset)
+                    chunk = self._data.read(min(chunk_size, self.size - offset))
+            if not chunk:
+                raise OSError(f"Upload ended after {offset} of {self.size} bytes")
+            offset += len(chunk)
+            yield bytes(chunk)
+
+    def read(self):
+        return b"".join(self.chunks())
+
+
+class MultipartBody:
+    """
+    A multipart/form-data body of plain `fields` and one file part, streamed
+    from an UploadSource while it is sent instead of built in memory. Pass it
+    as `data=` with `content_type` as the Content-Type header; it has a
+    length, so requests sends a Content-Length, and each iteration starts
+    over, so retries resend it.
+    """
+
+    def __init__(self, fields, name, filename, source, content_type='application/octet-stream'):
+        self.source = source if isinstance(source, UploadSource) else UploadSource(source)
+        boundary = uuid.uuid4().hex
+        parts = [
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{key}"\r\n\r\n{value}\r\n'
+            for key, value in fields.items() if value is not None
+        ]
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+            f'Content-Type: {content_type}\r\n\r\n'
+        )
+        self._head = "".join(parts).encode()
+        self._tail = f"\r\n--{boundary}--\r\n".encode()
+        self.content_type = f"multipart/form-data; boundary={boundary}"
+
+    def __len__(self):
+        return len(self._head) + self.source.size + len(self._tail)
+
+    def __iter__(self):
+        yield self._head
+        yield from self.source.chunks()
+        yield self._tail
+
+
+def request(endpoint, method, url, rewind=None, max_attempts=None, **kwargs):
+    """
+    Sends a request through the shared session with per-endpoint timeouts,
+    retries and circuit breaking.
+
+    Args:
+        endpoint (str): Logical endpoint name ('transcription', 'chat', 'media').
+        method (str): HTTP method.
+        url (str): Request URL.
+        rewind (callable): Called before each retry, e.g. to seek upload files back to 0.
+        max_attempts (int): Overrides HTTP_MAX_ATTEMPTS.
+        **kwargs: Passed to `requests.Session.request`.
+
+    Returns:
+        Response: A successful (non-error) response.
+
+    Raises:
+        requests.RequestException: On non-retryable errors, when retries are
+        exhausted, or with CircuitOpenError while the circuit is open.
+    """
+    breaker = get_breaker(endpoint)
+    if kwargs.get('timeout') is None:
+        kwargs['timeout'] = HTTP_TIMEOUTS.get(endpoint, (5, 30))
+
+    def attempt():
+        if not breaker.allow():
+            raise CircuitOpenError(f"Circuit for {endpoint} is open")
+        try:
+            if rewind is not None and attempt.calls:
+                rewind()
+            attempt.calls += 1
+            response = session.request(method, url, **kwargs)
+        except requests.RequestException:
+            breaker.record_failure()
+            raise
+        except BaseException:
+            breaker.release()
+            raise
+
+        try:
+            return _check_status(breaker, endpoint, response)
+        except RetryableHTTPError:
+            response.close()  # Hand the connection back before retrying
+            raise
+
+    attempt.calls = 0
+    return _retrying(Retrying, endpoint, max_attempts)(attempt)
+
+
+def build_async_client(pool_size=HTTP_POOL_SIZE):
+    """
+    Builds a pooled httpx.AsyncClient for `arequest`. It is bound to the event
+    loop it is used on, so each loop creates (and closes) its own.
+    """
+    return httpx.AsyncClient(limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size))
+
+
+async def arequest(client, endpoint, method, url, max_attempts=None, **kwargs):
+    """
+    Async `request`: sends through `client` (an httpx.AsyncClient) with the
+    same per-endpoint timeouts, retries and circuit breakers, so sync and
+    async callers of an endpoint share its breaker.
+
+    Returns:
+        httpx.Response: A successful (non-error) response.
+
+    Raises:
+        httpx.HTTPError: On non-retryable errors or when retries are exhausted.
+        RetryableHTTPError: When retries of a 429/5xx are exhausted.
+        CircuitOpenError: While the circuit is open.
+    """
+    breaker = get_breaker(endpoint)
+    connect_timeout, read_timeout = kwargs.pop('timeout', None) or HTTP_TIMEOUTS.get(endpoint, (5, 30))
+    kwargs['timeout'] = httpx.Timeout(read_timeout, connect=connect_timeout)
+
+    async def attempt():
+        if not breaker.allow():
+            raise CircuitOpenError(f"Circuit for {endpoint} is open")
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            breaker.record_failure()
+            raise
+        except BaseException:
+            breaker.release()
+            raise
+        return _check_status(breaker, endpoint, response)
+
+    return await _retrying(AsyncRetrying, endpoint, max_attempts)(attempt)
+
+
+def get(endpoint, url, **kwargs):
+    return request(endpoint, 'GET', url, **kwargs)
+
+
+def post(endpoint, url, **kwargs):
+    return request(endpoint, 'POST', url, **kwargs)
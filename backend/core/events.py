@@ -0,0 +1,261 @@
+# core/events.py
+
+import asyncio
+import json
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework.renderers import BaseRenderer
+
+from .models import Product
+
+EVENTS_POLL_INTERVAL = getattr(settings, 'EVENTS_POLL_INTERVAL', 0.5)
+EVENTS_LONG_POLL_TIMEOUT = getattr(settings, 'EVENTS_LONG_POLL_TIMEOUT', 25.0)
+EVENTS_STREAM_TIMEOUT = getattr(settings, 'EVENTS_STREAM_TIMEOUT', 300.0)
+EVENTS_KEEPALIVE = getattr(settings, 'EVENTS_KEEPALIVE', 15.0)
+EVENTS_RETRY_MS = getattr(settings, 'EVENTS_RETRY_MS', 1000)
+
+STATE_FIELDS = ('id', 'version', 'state', 'pending_transcription', 'pending_ner', 'processed', 'processed_at')
+
+# Pipeline stages, in order; a product only moves forward
+STAGE_TRANSCRIPTION, STAGE_NER, STAGE_DONE = 0, 1, 2
+
+# States that end processing whatever the pending flags still say
+TERMINAL_STATES = (Product.STATE_FAILED, Product.STATE_REJECTED)
+
+
+class EventStreamRenderer(BaseRenderer):
+    """
+    Lets `Accept: text/event-stream` through content negotiation; the view
+    answers those requests with a streaming response itself.
+    """
+    media_type = 'text/event-stream'
+    format = 'sse'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return data if isinstance(data, (bytes, str)) else json.dumps(data, cls=DjangoJSONEncoder)
+
+
+class ChangeNotifier:
+    """
+    Wakes waiters in this process as soon as any product is saved. Saves in
+    other processes (the workers) are picked up by polling.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._generation = 0
+
+    def notify(self):
+        with self._condition:
+            self._generation += 1
+            self._condition.notify_all()
+
+    def wait(self, timeout):
+        with self._condition:
+            generation = self._generation
+            self._condition.wait_for(lambda: self._generation != generation, timeout)
+
+
+notifier = ChangeNotifier()
+
+
+def product_state(pk):
+    """
+    Returns the status columns of a product (one primary-key lookup), or None.
+    """
+    return Product.objects.filter(pk=pk).values(*STATE_FIELDS).first()
+
+
+def product_stage(state):
+    if state['state'] in TERMINAL_STATES:
+        return STAGE_DONE
+    if state['pending_transcription']:
+        return STAGE_TRANSCRIPTION
+    if state['pending_ner']:
+        return STAGE_NER
+    return STAGE_DONE
+
+
+def transition_events(before, after, failed=False):
+    """
+    Names the transitions between two stages, e.g. a product saved once with
+    everything extracted passes all of them. A product that ran out of
+    attempts ends with a single 'failed' event instead.
+    """
+    if failed:
+        return ['failed'] if before < STAGE_DONE <= after else []
+    events = []
+    if before < STAGE_NER <= after:
+        events.append('transcription_done')
+    if before < STAGE_DONE <= after:
+        events.extend(['ner_done', 'processed'])
+    return events
+
+
+def format_cursor(version, stage):
+    return f"{version}.{stage}"
+
+
+def parse_cursor(value):
+    """
+    Parses a `<version>.<stage>` cursor (also sent back as Last-Event-ID).
+
+    Returns:
+        tuple: (version, stage); (0, 0) for a missing or malformed cursor.
+    """
+    try:
+        version, _, stage = (value or '').partition('.')
+        return int(version), min(int(stage or 0), STAGE_DONE)
+    except ValueError:
+        return 0, STAGE_TRANSCRIPTION
+
+
+def advance(state, version, stage):
+    """
+    Describes what changed since (`version`, `stage`).
+
+    Returns:
+        dict or None: {"cursor", "state", "events", "done"}, or None if the
+        product has not changed.
+    """
+    if state['version'] <= version:
+        return None
+    new_stage = product_stage(state)
+    return {
+        'cursor': format_cursor(state['version'], new_stage),
+        'state': state,
+        'events': transition_events(stage, new_stage, failed=state['state'] == Product.STATE_FAILED),
+        'done': new_stage == STAGE_DONE,
+    }
+
+
+def already_done(state, version):
+    """
+    Describes a finished product whose last change the client has already
+    seen (e.g. EventSource reconnecting after the stream ended), so the
+    stream can repeat the final event and close instead of waiting for a
+    change that will not come.
+
+    Returns:
+        dict or None: Like `advance`, with only the final event; None if
+        there may still be changes.
+    """
+    if state['version'] > version or product_stage(state) != STAGE_DONE:
+        return None
+    return {
+        'cursor': format_cursor(state['version'], STAGE_DONE),
+        'state': state,
+        'events': ['failed' if state['state'] == Product.STATE_FAILED else 'processed'],
+        'done': True,
+    }
+
+
+def wait_for_change(pk, version, timeout):
+    """
+    Blocks until the product's version passes `version` or `timeout` elapses.
+
+    Returns:
+        dict or None: The latest state, or None if the product does not exist.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        state = product_state(pk)
+        remaining = deadline - time.monotonic()
+        if state is None or state['version'] > version or remaining <= 0:
+            return state
+        notifier.wait(min(EVENTS_POLL_INTERVAL, remaining))
+
+
+async def await_change(pk, version, timeout):
+    """
+    Async `wait_for_change`: polls without holding a thread between checks.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        state = await sync_to_async(product_state)(pk)
+        remaining = deadline - time.monotonic()
+        if state is None or state['version'] > version or remaining <= 0:
+            return state
+        await asyncio.sleep(min(EVENTS_POLL_INTERVAL, remaining))
+
+
+def sse_message(event, data, event_id=None):
+    lines = [f"id: {event_id}"] if event_id is not None else []
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, cls=DjangoJSONEncoder)}")
+    return "\n".join(lines) + "\n\n"
+
+
+def _messages(change):
+    yield sse_message('status', change['state'], change['cursor'])
+    for event in change['events']:
+        yield sse_message(event, change['state'], change['cursor'])
+
+
+def stream_events(pk, cursor, timeout=EVENTS_LONG_POLL_TIMEOUT):
+    """
+    SSE stream for WSGI servers. Each connection holds a worker thread, so it
+    ends after `timeout`; EventSource reconnects with Last-Event-ID, which
+    turns the stream into a long-poll that resumes where it stopped.
+    """
+    version, stage = parse_cursor(cursor)
+    deadline = time.monotonic() + timeout
+    yield f"retry: {EVENTS_RETRY_MS}\n\n"
+    state = product_state(pk)
+    final = state and already_done(state, version)
+    if final:
+        yield from _messages(final)
+        return
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        state = wait_for_change(pk, version, min(EVENTS_KEEPALIVE, remaining))
+        if state is None:
+            yield sse_message('deleted', {'id': pk})
+            return
+        change = advance(state, version, stage)
+        if change is None:
+            yield ": keep-alive\n\n"
+            continue
+        yield from _messages(change)
+        if change['done']:
+            return
+        version, stage = state['version'], product_stage(state)
+
+
+async def astream_events(pk, cursor, timeout=EVENTS_STREAM_TIMEOUT):
+    """
+    SSE stream for ASGI servers; idle connections cost no thread.
+    """
+    version, stage = parse_cursor(cursor)
+    deadline = time.monotonic() + timeout
+    yield f"retry: {EVENTS_RETRY_MS}\n\n"
+    state = await sync_to_async(product_state)(pk)
+    final = state and already_done(state, version)
+    if final:
+        for message in _messages(final):
+            yield message
+        return
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        state = await await_change(pk, version, min(EVENTS_KEEPALIVE, remaining))
+        if state is None:
+            yield sse_message('deleted', {'id': pk})
+            return
+        change = advance(state, version, stage)
+        if change is None:
+            yield ": keep-alive\n\n"
+            continue
+        for message in _messages(change):
+            yield message
+        if change['done']:
+            return
+        version, stage = state['version'], product_stage(state)
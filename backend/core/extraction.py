@@ -0,0 +1,371 @@
+# core/extraction.py
+
+import logging
+import re
+from dataclasses import dataclass, field
+from decimal import Decimal
+
+from django.conf import settings
+
+from .cache import CacheStats
+from .gazetteer import CITIES, DISTRICTS, PRODUCTS
+
+logger = logging.getLogger(__name__)
+
+# Rule-based extraction runs before the LLM, which is only asked when some
+# field scores below the threshold
+NER_FAST_PATH = getattr(settings, 'NER_FAST_PATH', True)
+NER_FAST_PATH_THRESHOLD = getattr(settings, 'NER_FAST_PATH_THRESHOLD', 0.8)
+
+FAST_PATH_FIELDS = ("product_name", "description", "price", "location")
+
+# How often the fast path resolved every field, some, or none
+extraction_stats = CacheStats('extraction')
+
+DEVANAGARI_DIGITS = str.maketrans("०१२३४५६७८९", "0123456789")
+
+# Spoken numbers. Nepali has a word for every number below 100; only the
+# round ones are common in prices, anything else is left to the LLM.
+NUMBER_WORDS = {
+    "एक": 1, "दुई": 2, "तीन": 3, "चार": 4, "पाँच": 5, "सात": 7, "आठ": 8, "नौ": 9, "दस": 10,
+    "बीस": 20, "पच्चीस": 25, "तीस": 30, "चालीस": 40, "पचास": 50, "साठी": 60, "सत्तरी": 70,
+    "असी": 80, "नब्बे": 90, "डेढ": 1.5, "अढाई": 2.5, "दश": 10, "पन्ध्र": 15, "साठ": 60, "सत्तर": 70,
+    "अस्सी": 80, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7, "eight": 8,
+    "nine": 9, "ten": 10, "fifteen": 15, "twenty": 20, "thirty": 30, "forty": 40, "fifty": 50, "sixty": 60,
+    "seventy": 70, "eighty": 80, "ninety": 90,
+}
+# Number words that are also common words ("छ" is "is"); read as numbers
+# only directly before a multiplier ("छ सय")
+MULTIPLIER_ONLY_NUMBER_WORDS = {"छ": 6}
+MULTIPLIERS = {
+    "सय": 100, "सये": 100, "हजार": 1000, "लाख": 100000, "करोड": 10000000,
+    "hundred": 100, "thousand": 1000, "lakh": 100000,
+}
+
+CURRENCY_WORDS = r"रुपैयाँ|रुपैयां|रुपैया|रूपैयाँ|रुपियाँ|रुपिया|rupees|rupee|rupaiya|npr|rs\.?|रु\.?|रू\.?"
+CURRENCY_PREFIXES = r"npr|rs\.?|रु\.?|रू\.?"
+UNITS = {
+    "किलो": "किलो", "केजी": "किलो", "kg": "किलो", "kilo": "किलो",
+    "लिटर": "लिटर", "litre": "लिटर", "liter": "लिटर",
+    "गोटा": "गोटा", "वटा": "गोटा", "piece": "गोटा",
+    "दर्जन": "दर्जन", "dozen": "दर्जन",
+    "मन": "मन", "धार्नी": "धार्नी", "पाथी": "पाथी", "मुरी": "मुरी", "क्विन्टल": "क्विन्टल", "टन": "टन",
+}
+UNIT_WORDS = "|".join(sorted(map(re.escape, UNITS), key=len, reverse=True))
+AMOUNT = r"\d+(?:\.\d+)?"
+# A currency word must end the word, though postpositions may follow it
+WORD_END = r"(?=$|[\s।,!?/)]|मा|को|ले|सम्म)"
+
+CURRENCY_WORD = re.compile(rf"(?:{CURRENCY_WORDS})(?:मा|को|ले)?", re.IGNORECASE)
+PRICE_AFTER_AMOUNT = re.compile(rf"(?P<amount>{AMOUNT})\s*(?:{CURRENCY_WORDS}){WORD_END}", re.IGNORECASE)
+PRICE_BEFORE_AMOUNT = re.compile(rf"(?<![^\s(])(?:{CURRENCY_PREFIXES})\s*(?P<amount>{AMOUNT})", re.IGNORECASE)
+UNIT_BEFORE_PRICE = re.compile(rf"(?:प्रति\s*(?P<per>{UNIT_WORDS})|(?P<of>{UNIT_WORDS})(?:को|का))\s*$", re.IGNORECASE)
+PRICE_RANGE = re.compile(rf"(?P<low>{AMOUNT})\s*(?:-|–|देखि|to)\s*(?P<high>{AMOUNT})", re.IGNORECASE)
+# A number not directly followed by a unit, i.e. not a quantity
+BARE_AMOUNT = re.compile(rf"{AMOUNT}(?!\d|\.\d|\s*(?:{UNIT_WORDS}))", re.IGNORECASE)
+UNIT_AFTER_PRICE = re.compile(rf"^\s*(?:प्रति|per|/)\s*(?P<unit>{UNIT_WORDS})", re.IGNORECASE)
+
+# Currencies other than rupees callers sometimes quote in
+CURRENCY_CODES = (
+    ('USD', re.compile(r"\$|usd|dollars?|डलर", re.IGNORECASE)),
+    ('INR', re.compile(r"inr|भारु|भा\.रु|भारतीय", re.IGNORECASE)),
+)
+DEFAULT_CURRENCY = 'NPR'
+PRICE_QUANTUM = Decimal('0.01')
+# Largest amount the price_amount column holds (12 digits, 2 of them decimals)
+PRICE_LIMIT = Decimal(10) ** 10
+
+TOKEN_SPLIT = re.compile(r"[\s।,!?;:()\"']+")
+# Postpositions and plural markers glued onto names ("चितवनबाट", "आलुहरू")
+SUFFIXES = ("हरूको", "हरुको", "हरू", "हरु", "बाट", "तिर", "नजिक", "सम्म", "मा", "को", "का", "की", "ले")
+# Words around the item that are not part of its description
+FILLER_WORDS = {
+    "म", "मेरो", "मसँग", "मसंग", "मलाई", "हामी", "हाम्रो", "हामीसँग", "नमस्ते", "नमस्कार", "हजुर", "यो", "त्यो",
+    "छ", "छन्", "छु", "छौं", "हो", "र", "पनि", "बेच्नु", "बेच्न", "बेच्ने", "बिक्री", "चाहन्छु", "गर्नु",
+    "गर्न", "भने", "भन्ने", "दर", "मूल्य", "भाउ", "प्रति", "मा", "को", "का", "की", "ले", "लाई", "बाट",
+    "i", "we", "my", "have", "to", "sell", "selling", "is", "are", "the", "at", "for", "from", "in", "per", "and",
+}
+PER_WORDS = {"प्रति", "per", "/"}
+
+
+@dataclass
+class FastExtraction:
+    fields: dict = field(default_factory=lambda: {name: "" for name in FAST_PATH_FIELDS})
+    confidence: dict = field(default_factory=lambda: {name: 0.0 for name in FAST_PATH_FIELDS})
+
+    def confident(self, threshold=NER_FAST_PATH_THRESHOLD):
+        return {name: value for name, value in self.fields.items() if self.confidence[name] >= threshold}
+
+
+def _build_index(*tables):
+    index = {}
+    for table in tables:
+        for canonical, aliases in table.items():
+            for name in (canonical, *aliases):
+                index[name.casefold()] = canonical
+    return index
+
+
+LOCATION_INDEX = _build_index(DISTRICTS, CITIES)
+PRODUCT_INDEX = _build_index(PRODUCTS)
+
+
+def _format_number(value):
+    return str(int(value)) if float(value).is_integer() else f"{value:g}"
+
+
+def _number(word, next_word=None):
+    if re.fullmatch(AMOUNT, word):
+        return float(word)
+    if word in MULTIPLIER_ONLY_NUMBER_WORDS and next_word in MULTIPLIERS:
+        return MULTIPLIER_ONLY_NUMBER_WORDS[word]
+    return NUMBER_WORDS.get(word)
+
+
+def normalize_numerals(text):
+    """
+    Rewrites numbers as plain ASCII digits: Devanagari digits are
+    transliterated, digit grouping ("१,५००", "1,00,000") is dropped and
+    spoken numbers are evaluated ("दुई हजार पाँच सय" -> "2500"). A
+    multiplier only applies to a number read just before it; one that follows
+    an unknown word is left as it is.
+    """
+    text = text.translate(DEVANAGARI_DIGITS)
+    text = re.sub(r"(?<=\d),(?=\d{2,3}(?!\d))", "", text)
+
+    words, output, i = text.split(" "), [], 0
+    while i < len(words):
+        total, current, j = 0, None, i
+        while j < len(words):
+            word = words[j].casefold()
+            value = _number(word, words[j + 1].casefold() if j + 1 < len(words) else None)
+            if value is not None and current is None:
+                current = value
+            elif word in MULTIPLIERS and current is not None:
+                total += (1 if current is None else current) * MULTIPLIERS[word]
+                current = None
+            else:
+                break
+            j += 1
+        if j == i:
+            output.append(words[i])
+            i += 1
+            continue
+        output.append(_format_number(total + (current or 0)))
+        i = j
+    return " ".join(output)
+
+
+def _strip_suffix(token):
+    for suffix in SUFFIXES:
+        if token.endswith(suffix) and len(token) > len(suffix) + 1:
+            return token[:-len(suffix)]
+    return token
+
+
+def _lookup(tokens, index):
+    """
+    Finds gazetteer names among `tokens`, trying two-word names first.
+
+    Returns:
+        list of tuple: (token position, canonical name), in order of appearance.
+    """
+    hits, i = [], 0
+    while i < len(tokens):
+        pair = " ".join(tokens[i:i + 2]).casefold() if i + 1 < len(tokens) else None
+        if pair and (pair in index or _strip_suffix(pair) in index):
+            hits.append((i, index.get(pair) or index[_strip_suffix(pair)]))
+            i += 2
+            continue
+        word = tokens[i].casefold()
+        name = index.get(word) or index.get(_strip_suffix(word))
+        if name:
+            hits.append((i, name))
+        i += 1
+    return hits
+
+
+def _distinct(hits):
+    names = []
+    for _, name in hits:
+        if name not in names:
+            names.append(name)
+    return names
+
+
+def _price_matches(text):
+    """
+    Yields (low, high, unit) for each currency-marked amount in
+    numeral-normalized text; `high` is None unless the amount is a range
+    ("50-60 रुपैयाँ", "रु 50 देखि 60").
+    """
+    ranges = list(PRICE_RANGE.finditer(text))
+    for pattern in (PRICE_AFTER_AMOUNT, PRICE_BEFORE_AMOUNT):
+        for match in pattern.finditer(text):
+            span = next((r for r in ranges if r.start() <= match.start('amount') < r.end()), None)
+            start, end = (min(span.start(), match.start()), max(span.end(), match.end())) if span else match.span()
+            unit = UNIT_BEFORE_PRICE.search(text[:start]) or UNIT_AFTER_PRICE.search(text[end:])
+            unit = unit and UNITS[next(group for group in unit.groups() if group).casefold()]
+            if span:
+                yield span.group('low'), span.group('high'), unit
+            else:
+                yield match.group('amount'), None, unit
+
+
+def extract_price(text):
+    """
+    Finds currency-marked amounts in numeral-normalized text.
+
+    Returns:
+        tuple: (price string such as "रु 50 प्रति किलो", confidence).
+    """
+    prices = []
+    for low, high, unit in _price_matches(text):
+        amount = _format_number(float(low)) + (f"-{_format_number(float(high))}" if high else "")
+        price = f"रु {amount}" + (f" प्रति {unit}" if unit else "")
+        if price not in prices:
+            prices.append(price)
+    if not prices:
+        return "", 0.0
+    # Several different prices: which one is asked is for the LLM to decide.
+    # So is a multiplier left after an unknown number word ("सोह्र सय"),
+    # which may be part of the price.
+    unread = any(word.casefold() in MULTIPLIERS for word in TOKEN_SPLIT.split(text))
+    return prices[0], 0.95 if len(prices) == 1 and not unread else 0.5
+
+
+def parse_price(price):
+    """
+    Parses an extracted price ("रु ५०० प्रति किलो", "1.5 lakh", "५०-६०") into
+    numbers. Currency-marked amounts win over bare numbers, and numbers that
+    are quantities ("१० किलो") are skipped.
+
+    Args:
+        price (str): Extracted price text.
+
+    Returns:
+        tuple: (amount, upper bound of a range or None, currency code); all
+        None when no amount is found. Amounts are Decimals.
+    """
+    text = normalize_numerals((price or "").strip())
+    low, high = next(((low, high) for low, high, _ in _price_matches(text)), (None, None))
+    if low is None:
+        match = PRICE_RANGE.search(text)
+        if match:
+            low, high = match.group('low'), match.group('high')
+        else:
+            amounts = [m.group(0) for m in BARE_AMOUNT.finditer(text)]
+            low = amounts[0] if amounts else None
+    if low is None:
+        return None, None, None
+
+    currency = next((code for code, pattern in CURRENCY_CODES if pattern.search(text)), DEFAULT_CURRENCY)
+    low = Decimal(low).quantize(PRICE_QUANTUM)
+    high = Decimal(high).quantize(PRICE_QUANTUM) if high else None
+    if high is not None and high < low:
+        low, high = high, low
+    if (high or low) >= PRICE_LIMIT:
+        return None, None, None
+    return low, high, currency
+
+
+def extract_location(tokens):
+    """
+    Returns:
+        tuple: (location, confidence); a city named with its district counts
+        as one location.
+    """
+    names = _distinct(_lookup(tokens, LOCATION_INDEX))
+    if not names:
+        return "", 0.0
+    if len(names) == 1:
+        return names[0], 0.95
+    if len(names) == 2 and sum(name in DISTRICTS for name in names) == 1:
+        return ", ".join(names), 0.85
+    return names[0], 0.5
+
+
+def extract_product(tokens):
+    """
+    Returns:
+        tuple: (product name, description, confidence of each). The
+        description is the phrase leading up to the product ("10 किलो ताजा
+        आलु"), so it is only as reliable as the product match.
+    """
+    hits = _lookup(tokens, PRODUCT_INDEX)
+    names = _distinct(hits)
+    if not names:
+        return "", "", 0.0, 0.0
+    if len(names) > 1:
+        return names[0], "", 0.5, 0.0
+
+    position = hits[0][0]
+    start = position
+    while start > 0 and not _ends_phrase(tokens[start - 1]):
+        # Nor the amount after "Rs." or the unit after "per"
+        if start > 1 and (tokens[start - 2].casefold() in PER_WORDS or CURRENCY_WORD.fullmatch(tokens[start - 2])):
+            break
+        start -= 1
+    description = " ".join(tokens[start:position + 1])
+    # A long run-up is more likely a sentence than a description
+    return names[0], description, 0.9, 0.85 if position - start <= 4 else 0.5
+
+
+def _ends_phrase(word):
+    return (
+        word in FILLER_WORDS
+        or _strip_suffix(word.casefold()) in LOCATION_INDEX
+        or CURRENCY_WORD.fullmatch(word) is not None
+    )
+
+
+def extract_fields(transcript):
+    """
+    Extracts the NER fields with rules and the bundled gazetteer, scoring
+    each field's confidence between 0 and 1.
+
+    Args:
+        transcript (str): Transcribed text.
+
+    Returns:
+        FastExtraction: Extracted fields and their confidence.
+    """
+    extraction = FastExtraction()
+    if not transcript or not transcript.strip():
+        return extraction
+
+    text = normalize_numerals(transcript.strip())
+    tokens = [token for token in TOKEN_SPLIT.split(text) if token]
+    fields, confidence = extraction.fields, extraction.confidence
+
+    fields["price"], confidence["price"] = extract_price(text)
+    fields["location"], confidence["location"] = extract_location(tokens)
+    (fields["product_name"], fields["description"],
+     confidence["product_name"], confidence["description"]) = extract_product(tokens)
+    return extraction
+
+
+def confident_fields(transcript, threshold=None):
+    """
+    Runs the fast path and returns only the fields it is sure about, counting
+    whether that covered every field.
+
+    Returns:
+        dict: Field values scoring at least `threshold` (default
+        NER_FAST_PATH_THRESHOLD); empty when the fast path is disabled.
+    """
+    if not NER_FAST_PATH:
+        return {}
+    extraction = extract_fields(transcript)
+    fields = extraction.confident(NER_FAST_PATH_THRESHOLD if threshold is None else threshold)
+    logger.debug(f"Fast-path NER confidence: {extraction.confidence}")
+
+    for name in fields:
+        extraction_stats.incr(f"fast_path_{name}_hits")
+    if len(fields) == len(FAST_PATH_FIELDS):
+        extraction_stats.incr('fast_path_complete')
+    elif fields:
+        extraction_stats.incr('fast_path_partial')
+    else:
+        extraction_stats.incr('fast_path_miss')
+    return fields
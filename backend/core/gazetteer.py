@@ -0,0 +1,189 @@
+# core/gazetteer.py
+#
+# Place and product names recognised by the rule-based extractor. Each entry
+# maps the canonical (Devanagari) name to the other spellings seen in
+# transcripts, including romanized ones.
+
+# The 77 districts, by province
+DISTRICTS = {
+    # Koshi
+    "ताप्लेजुङ": ["ताप्लेजुङ्ग", "Taplejung"],
+    "पाँचथर": ["पाचथर", "Panchthar"],
+    "इलाम": ["Ilam", "Illam"],
+    "झापा": ["Jhapa"],
+    "मोरङ": ["मोरङ्ग", "Morang"],
+    "सुनसरी": ["Sunsari"],
+    "धनकुटा": ["Dhankuta"],
+    "तेह्रथुम": ["तेर्हथुम", "Terhathum", "Tehrathum"],
+    "संखुवासभा": ["सङ्खुवासभा", "Sankhuwasabha"],
+    "भोजपुर": ["Bhojpur"],
+    "सोलुखुम्बु": ["सोलुखुम्बू", "Solukhumbu"],
+    "ओखलढुङ्गा": ["ओखलढुंगा", "Okhaldhunga"],
+    "खोटाङ": ["खोटाङ्ग", "Khotang"],
+    "उदयपुर": ["Udayapur", "Udaypur"],
+    # Madhesh
+    "सप्तरी": ["Saptari"],
+    "सिराहा": ["Siraha"],
+    "धनुषा": ["Dhanusha", "Dhanusa"],
+    "महोत्तरी": ["Mahottari"],
+    "सर्लाही": ["Sarlahi"],
+    "रौतहट": ["Rautahat"],
+    "बारा": ["Bara"],
+    "पर्सा": ["Parsa"],
+    # Bagmati
+    "दोलखा": ["Dolakha"],
+    "सिन्धुपाल्चोक": ["सिन्धुपाल्चौक", "Sindhupalchok", "Sindhupalchowk"],
+    "रसुवा": ["Rasuwa"],
+    "धादिङ": ["धादिङ्ग", "Dhading"],
+    "नुवाकोट": ["Nuwakot"],
+    "काठमाडौं": ["काठमाडौँ", "काठमाण्डौ", "काठमाण्डू", "Kathmandu"],
+    "भक्तपुर": ["Bhaktapur"],
+    "ललितपुर": ["Lalitpur"],
+    "काभ्रेपलाञ्चोक": ["काभ्रे", "काभ्रेपलान्चोक", "Kavrepalanchok", "Kavre", "Kabhre"],
+    "रामेछाप": ["Ramechhap"],
+    "सिन्धुली": ["Sindhuli"],
+    "मकवानपुर": ["मकवानपूर", "Makwanpur", "Makawanpur"],
+    "चितवन": ["Chitwan", "Chitawan"],
+    # Gandaki
+    "गोरखा": ["Gorkha"],
+    "मनाङ": ["मनाङ्ग", "Manang"],
+    "मुस्ताङ": ["मुस्ताङ्ग", "Mustang"],
+    "म्याग्दी": ["Myagdi"],
+    "कास्की": ["Kaski"],
+    "लमजुङ": ["लमजुङ्ग", "Lamjung"],
+    "तनहुँ": ["तनहुं", "Tanahun", "Tanahu"],
+    "नवलपुर": ["Nawalpur"],
+    "स्याङ्जा": ["स्याङजा", "Syangja"],
+    "पर्वत": ["Parbat"],
+    "बागलुङ": ["बागलुङ्ग", "Baglung"],
+    # Lumbini
+    "रुकुम पूर्व": ["पूर्वी रुकुम", "Eastern Rukum", "Rukum East"],
+    "रोल्पा": ["Rolpa"],
+    "प्युठान": ["Pyuthan"],
+    "गुल्मी": ["Gulmi"],
+    "अर्घाखाँची": ["अर्घाखाची", "Arghakhanchi"],
+    "पाल्पा": ["Palpa"],
+    "परासी": ["Parasi"],
+    "रुपन्देही": ["रूपन्देही", "Rupandehi"],
+    "कपिलवस्तु": ["Kapilvastu", "Kapilbastu"],
+    "दाङ": ["दाङ्ग", "Dang"],
+    "बाँके": ["बाके", "Banke"],
+    "बर्दिया": ["Bardiya"],
+    # Karnali
+    "रुकुम पश्चिम": ["पश्चिम रुकुम", "Western Rukum", "Rukum West"],
+    "सल्यान": ["Salyan"],
+    "डोल्पा": ["Dolpa"],
+    "हुम्ला": ["Humla"],
+    "जुम्ला": ["Jumla"],
+    "कालिकोट": ["Kalikot"],
+    "मुगु": ["Mugu"],
+    "सुर्खेत": ["Surkhet"],
+    "दैलेख": ["Dailekh"],
+    "जाजरकोट": ["Jajarkot"],
+    # Sudurpashchim
+    "बाजुरा": ["Bajura"],
+    "बझाङ": ["बझाङ्ग", "Bajhang"],
+    "अछाम": ["Achham"],
+    "डोटी": ["Doti"],
+    "कैलाली": ["Kailali"],
+    "कञ्चनपुर": ["कन्चनपुर", "Kanchanpur"],
+    "डडेलधुरा": ["Dadeldhura"],
+    "बैतडी": ["Baitadi"],
+    "दार्चुला": ["Darchula"],
+}
+
+# Cities and bazaars that callers name instead of their district
+CITIES = {
+    "पोखरा": ["Pokhara"],
+    "विराटनगर": ["बिराटनगर", "Biratnagar"],
+    "धरान": ["Dharan"],
+    "इटहरी": ["Itahari"],
+    "दमक": ["Damak"],
+    "बिर्तामोड": ["Birtamod"],
+    "राजविराज": ["राजबिराज", "Rajbiraj"],
+    "लहान": ["Lahan"],
+    "जनकपुर": ["Janakpur"],
+    "कलैया": ["Kalaiya"],
+    "गौर": ["Gaur"],
+    "मलंगवा": ["मलङ्गवा", "Malangwa"],
+    "वीरगञ्ज": ["बीरगंज", "वीरगंज", "Birgunj"],
+    "हेटौंडा": ["हेटौडा", "Hetauda"],
+    "भरतपुर": ["Bharatpur"],
+    "बनेपा": ["Banepa"],
+    "धुलिखेल": ["Dhulikhel"],
+    "कीर्तिपुर": ["Kirtipur"],
+    "पाटन": ["Patan"],
+    "दमौली": ["Damauli"],
+    "बेसीशहर": ["Besisahar"],
+    "तानसेन": ["Tansen"],
+    "बुटवल": ["Butwal"],
+    "भैरहवा": ["Bhairahawa"],
+    "सिद्धार्थनगर": ["Siddharthanagar"],
+    "घोराही": ["Ghorahi"],
+    "तुलसीपुर": ["Tulsipur"],
+    "नेपालगञ्ज": ["नेपालगंज", "Nepalgunj", "Nepalganj"],
+    "गुलरिया": ["Gulariya"],
+    "वीरेन्द्रनगर": ["बीरेन्द्रनगर", "Birendranagar"],
+    "धनगढी": ["Dhangadhi"],
+    "टीकापुर": ["टिकापुर", "Tikapur"],
+    "महेन्द्रनगर": ["Mahendranagar"],
+}
+
+# Produce and livestock commonly sold over the hotline
+PRODUCTS = {
+    "आलु": ["आलू", "Aalu", "Alu", "potato", "potatoes"],
+    "प्याज": ["Pyaj", "onion", "onions"],
+    "लसुन": ["Lasun", "garlic"],
+    "अदुवा": ["Aduwa", "ginger"],
+    "बेसार": ["Besar", "turmeric"],
+    "खुर्सानी": ["Khursani", "chilli", "chili"],
+    "गोलभेडा": ["गोलभेंडा", "Golbheda", "tomato", "tomatoes"],
+    "काउली": ["Cauli", "cauliflower"],
+    "बन्दा": ["बन्दाकोपी", "Banda", "cabbage"],
+    "रायो": ["रायोको साग", "Rayo"],
+    "साग": ["Saag", "greens"],
+    "मूला": ["मुला", "Mula", "radish"],
+    "गाजर": ["Gajar", "carrot", "carrots"],
+    "भन्टा": ["भण्टा", "Bhanta", "brinjal", "eggplant"],
+    "भिन्डी": ["भिण्डी", "Bhindi", "okra"],
+    "फर्सी": ["Pharsi", "pumpkin"],
+    "काँक्रो": ["काक्रो", "Kakro", "cucumber"],
+    "करेला": ["Karela", "bitter gourd"],
+    "लौका": ["Lauka", "bottle gourd"],
+    "सिमी": ["Simi", "beans"],
+    "केराउ": ["Kerau", "peas"],
+    "च्याउ": ["Chyau", "mushroom", "mushrooms"],
+    "धान": ["Dhan", "paddy"],
+    "चामल": ["Chamal", "rice"],
+    "मकै": ["Makai", "maize", "corn"],
+    "गहुँ": ["गहु", "Gahu", "wheat"],
+    "कोदो": ["Kodo", "millet"],
+    "फापर": ["Phapar", "buckwheat"],
+    "दाल": ["Dal", "lentils"],
+    "भटमास": ["Bhatmas", "soybean", "soybeans"],
+    "तोरी": ["Tori", "mustard"],
+    "केरा": ["Kera", "banana", "bananas"],
+    "सुन्तला": ["Suntala", "orange", "oranges"],
+    "कागती": ["Kagati", "lemon", "lemons"],
+    "स्याउ": ["Syau", "apple", "apples"],
+    "आँप": ["Aanp", "mango", "mangoes"],
+    "मेवा": ["Mewa", "papaya"],
+    "भुइँकटहर": ["Bhuikatahar", "pineapple"],
+    "अलैंची": ["अलैँची", "अलैची", "Alaichi", "cardamom"],
+    "चिया": ["Chiya", "tea"],
+    "कफी": ["Coffee"],
+    "मह": ["Maha", "honey"],
+    "दूध": ["दुध", "Dudh", "milk"],
+    "दही": ["Dahi", "curd", "yogurt"],
+    "घिउ": ["घ्यू", "Ghiu", "ghee"],
+    "छुर्पी": ["Chhurpi"],
+    "अण्डा": ["अन्डा", "Anda", "egg", "eggs"],
+    "कुखुरा": ["Kukhura", "chicken"],
+    "हाँस": ["Hans", "duck"],
+    "बाख्रा": ["Bakhra", "goat"],
+    "खसी": ["Khasi"],
+    "भैंसी": ["भैसी", "Bhainsi", "buffalo"],
+    "गाई": ["Gai", "cow"],
+    "बंगुर": ["बङ्गुर", "Bangur", "pig"],
+    "माछा": ["Machha", "fish"],
+}
@@ -0,0 +1,38 @@
+# core/hashing.py
+
+import hashlib
+
+HASH_CHUNK_SIZE = 64 * 1024
+
+
+def new_audio_hasher():
+    """
+    Returns the incremental hasher used to fingerprint audio content.
+    """
+    return hashlib.blake2b(digest_size=32)
+
+
+def hash_chunks(chunks):
+    """
+    Returns the hex digest of an iterable of byte chunks.
+    """
+    digest = new_audio_hasher()
+    for chunk in chunks:
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hash_file(audio_file):
+    """
+    Hashes a seekable binary file-like object in chunks and rewinds it.
+
+    Args:
+        audio_file (file-like): Seekable binary stream.
+
+    Returns:
+        str: 64-character hex BLAKE2b digest.
+    """
+    audio_file.seek(0)
+    audio_hash = hash_chunks(iter(lambda: audio_file.read(HASH_CHUNK_SIZE), b''))
+    audio_file.seek(0)
+    return audio_hash
@@ -0,0 +1,259 @@
+# core/jobs.py
+
+import logging
+import os
+import socket
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import metrics
+from .models import ProcessingJob, ProcessingRun
+from .utils import NER_BATCH_SIZE, extract_and_save, extract_and_save_batch, save_failed, save_stage_failure
+
+logger = logging.getLogger(__name__)
+
+# Queue configuration
+JOB_VISIBILITY_TIMEOUT = getattr(settings, 'JOB_VISIBILITY_TIMEOUT', 300)
+JOB_MAX_ATTEMPTS = getattr(settings, 'JOB_MAX_ATTEMPTS', 5)
+JOB_RETRY_BACKOFF = getattr(settings, 'JOB_RETRY_BACKOFF', 30)
+
+
+def worker_id():
+    """
+    Returns an identifier for the current worker (host, pid and thread).
+    """
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"[:64]
+
+
+def enqueue_products(products):
+    """
+    Enqueues background processing for the given products in one insert.
+
+    Args:
+        products (iterable of Product): Products to process.
+
+    Returns:
+        list: The created ProcessingJob instances.
+    """
+    jobs = [ProcessingJob(product=product, max_attempts=JOB_MAX_ATTEMPTS) for product in products]
+    if not jobs:
+        return []
+    created = ProcessingJob.objects.bulk_create(jobs)
+    logger.debug(f"Enqueued {len(created)} processing job(s).")
+    return created
+
+
+def enqueue_product(product):
+    """
+    Enqueues background processing for a single product.
+    """
+    return enqueue_products([product])[0]
+
+
+def _claimable(now):
+    """
+    Jobs that are due, or running with an expired lease (crashed worker).
+    """
+    return ProcessingJob.objects.filter(
+        Q(status=ProcessingJob.STATUS_QUEUED, run_after__lte=now)
+        | Q(status=ProcessingJob.STATUS_RUNNING, locked_until__lt=now, attempts__lt=F('max_attempts'))
+    )
+
+
+def _lease_fields(owner, now):
+    return {
+        'status': ProcessingJob.STATUS_RUNNING,
+        'locked_by': owner,
+        'locked_until': now + timedelta(seconds=JOB_VISIBILITY_TIMEOUT),
+        'attempts': F('attempts') + 1,
+        'updated_at': now,
+    }
+
+
+def claim_jobs(limit=1, owner=None):
+    """
+    Claims up to `limit` due jobs for this worker.
+
+    On backends that support it the candidate rows are locked with
+    `SELECT ... FOR UPDATE SKIP LOCKED`. Elsewhere (SQLite) each job is claimed
+    with a conditional UPDATE that only succeeds if the row is still claimable,
+    so two workers can never lease the same job.
+
+    Args:
+        limit (int): Maximum number of jobs to claim.
+        owner (str): Worker identifier stored in `locked_by`.
+
+    Returns:
+        list: Claimed ProcessingJob instances.
+    """
+    owner = owner or worker_id()
+    now = timezone.now()
+    lease = _lease_fields(owner, now)
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            ids = list(
+                _claimable(now)
+                .select_for_update(skip_locked=True)
+                .order_by('run_after', 'id')
+                .values_list('id', flat=True)[:limit]
+            )
+            if ids:
+                ProcessingJob.objects.filter(id__in=ids).update(**lease)
+    else:
+        ids = []
+        candidates = _claimable(now).order_by('run_after', 'id').values_list('id', flat=True)[:limit * 2]
+        for job_id in candidates:
+            if _claimable(now).filter(id=job_id).update(**lease):
+                ids.append(job_id)
+            if len(ids) >= limit:
+                break
+
+    if not ids:
+        return []
+    return list(ProcessingJob.objects.filter(id__in=ids, locked_by=owner).select_related('product'))
+
+
+def complete_job(job):
+    """
+    Marks a claimed job as done.
+    """
+    ProcessingJob.objects.filter(id=job.id, locked_by=job.locked_by).update(
+        status=ProcessingJob.STATUS_DONE,
+        locked_until=None,
+        last_error=None,
+        updated_at=timezone.now(),
+    )
+
+
+def fail_job(job, error):
+    """
+    Records a failed attempt. The job is re-queued with linear backoff until it
+    runs out of attempts, after which it and its product are marked failed.
+    """
+    now = timezone.now()
+    if job.attempts >= job.max_attempts:
+        status, run_after = ProcessingJob.STATUS_FAILED, now
+    else:
+        status, run_after = ProcessingJob.STATUS_QUEUED, now + timedelta(seconds=JOB_RETRY_BACKOFF * job.attempts)
+
+    ProcessingJob.objects.filter(id=job.id, locked_by=job.locked_by).update(
+        status=status,
+        run_after=run_after,
+        locked_until=None,
+        last_error=str(error)[:2000],
+        updated_at=now,
+    )
+    logger.warning(f"Job {job.id} attempt {job.attempts}/{job.max_attempts} failed: {error}")
+    if status == ProcessingJob.STATUS_FAILED:
+        save_failed(job.product_id)
+
+
+def recover_expired_jobs():
+    """
+    Moves jobs whose lease expired after their last allowed attempt to failed.
+    Other expired jobs stay `running` and are picked up again by `claim_jobs`.
+
+    Returns:
+        int: Number of jobs marked as failed.
+    """
+    now = timezone.now()
+    expired = ProcessingJob.objects.filter(
+        status=ProcessingJob.STATUS_RUNNING,
+        locked_until__lt=now,
+        attempts__gte=F('max_attempts'),
+    )
+    product_ids = list(expired.values_list('product_id', flat=True))
+    count = expired.update(status=ProcessingJob.STATUS_FAILED, last_error='Lease expired', updated_at=now)
+    for product_id in product_ids:
+        save_failed(product_id)
+    return count
+
+
+def queue_depth():
+    """
+    Returns the number of jobs waiting to run.
+    """
+    return ProcessingJob.objects.filter(status=ProcessingJob.STATUS_QUEUED).count()
+
+
+def run_job(job):
+    """
+    Runs the processing pipeline for a claimed job and records the outcome,
+    along with a ProcessingRun holding its stage timings.
+
+    Returns:
+        bool: True if the product was processed successfully.
+    """
+    with metrics.recording() as run:
+        try:
+            success = extract_and_save(job.product)
+        except Exception as e:
+            logger.exception(f"Job {job.id} raised during processing")
+            record_exception(job, run, e)
+            return False
+
+    finish_job(job, run, success)
+    return success
+
+
+def record_exception(job, run, error):
+    """
+    Books an attempt that raised against the product's current stage, its
+    processing run and the job.
+    """
+    try:
+        save_stage_failure(job.product, error)
+    except Exception:
+        logger.exception(f"Could not record the failure of Product {job.product_id}")
+    metrics.save_run(run, job.product, job, ProcessingRun.OUTCOME_ERROR, error)
+    fail_job(job, error)
+
+
+def finish_job(job, run, success):
+    """
+    Stores the run and marks the job done, or failed for another attempt.
+    """
+    if success:
+        metrics.save_run(run, job.product, job, ProcessingRun.OUTCOME_SUCCESS)
+        complete_job(job)
+    else:
+        metrics.save_run(run, job.product, job, ProcessingRun.OUTCOME_FAILED, "Processing did not complete")
+        fail_job(job, "Processing did not complete")
+
+
+def claim_size():
+    """
+    Returns how many jobs a worker should claim at once: a full NER batch when
+    the queue is deep enough to fill one, otherwise a single job.
+    """
+    if NER_BATCH_SIZE > 1 and queue_depth() >= NER_BATCH_SIZE:
+        return NER_BATCH_SIZE
+    return 1
+
+
+def run_jobs(jobs):
+    """
+    Runs several claimed jobs, sharing batched NER requests between them.
+
+    Returns:
+        int: Number of jobs that completed successfully.
+    """
+    if len(jobs) == 1:
+        return int(run_job(jobs[0]))
+
+    runs = {job.product_id: metrics.RunRecorder() for job in jobs}
+    try:
+        outcomes = extract_and_save_batch([job.product for job in jobs], runs=runs)
+    except Exception:
+        logger.exception("Batch processing raised; retrying jobs individually")
+        return sum(int(run_job(job)) for job in jobs)
+
+    for job in jobs:
+        finish_job(job, runs[job.product_id], outcomes.get(job.product_id, False))
+    return sum(1 for job in jobs if outcomes.get(job.product_id))
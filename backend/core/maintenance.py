@@ -0,0 +1,25 @@
+# core/maintenance.py
+
+from . import metrics
+from .cache import purge_expired_ner_cache
+from .jobs import recover_expired_jobs
+from .uploads import purge_expired_uploads
+
+
+def run_maintenance(idle=False):
+    """
+    Housekeeping shared by the thread and asyncio worker loops, run after
+    each claim. Jobs whose lease expired on their last attempt are failed
+    every time; expired NER cache rows, upload sessions and old processing
+    runs are purged only while the queue is idle. The process's cache and
+    pipeline counters are flushed to the /metrics totals as they go.
+
+    Args:
+        idle (bool): The claim found no work.
+    """
+    recover_expired_jobs()
+    metrics.flush_stats(metrics.METRICS_STATS_FLUSH_INTERVAL)
+    if idle:
+        purge_expired_ner_cache()
+        purge_expired_uploads()
+        metrics.purge_old_runs()
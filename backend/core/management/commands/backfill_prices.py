@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from core.models import Product
+from core.utils import PRICE_FIELDS, set_price
+
+
+class Command(BaseCommand):
+    help = (
+        "Parse `extracted_price` into the numeric price fields for products extracted before they existed. "
+        "Rows are saved one by one, so ETags and the change feed pick the new values up."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help="Rows read and saved per transaction.")
+        parser.add_argument('--all', action='store_true',
+                            help="Re-parse rows that already have a price (e.g. after parser changes).")
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options['batch_size'])
+        queryset = Product.objects.exclude(Q(extracted_price__isnull=True) | Q(extracted_price=''))
+        if not options['all']:
+            queryset = queryset.filter(price_amount__isnull=True)
+        queryset = queryset.only('id', 'version', 'extracted_price', *PRICE_FIELDS).order_by('id')
+
+        seen = updated = 0
+        last_id = 0
+        while True:
+            batch = list(queryset.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                break
+            with transaction.atomic():
+                for product in batch:
+                    if set_price(product):
+                        product.save(update_fields=PRICE_FIELDS)
+                        updated += 1
+            seen += len(batch)
+            last_id = batch[-1].id
+            self.stdout.write(f"Checked {seen} product(s), updated {updated}...")
+
+        self.stdout.write(self.style.SUCCESS(f"Done: {updated} of {seen} product(s) updated."))
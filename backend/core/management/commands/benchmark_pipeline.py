@@ -0,0 +1,97 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+from core.benchmark import LATENCY_DISTRIBUTIONS, MockAIServer, run_benchmark
+from core.management.commands.run_workers import work_loop
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the upload and processing pipeline offline: uploads synthetic recordings through the "
+        "create endpoint while workers process them against a local mock Whisper/chat server. Runs on a "
+        "throwaway database and media directory."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--uploads', type=int, default=50, help="Number of recordings to upload.")
+        parser.add_argument('--concurrency', type=int, default=10, help="Parallel upload clients.")
+        parser.add_argument('--workers', type=int, default=4, help="Worker threads processing the queue.")
+        parser.add_argument('--transcription-latency', type=float, default=0.5,
+                            help="Mean mock Whisper latency in seconds.")
+        parser.add_argument('--chat-latency', type=float, default=0.5,
+                            help="Mean mock chat-completion latency in seconds.")
+        parser.add_argument('--latency-distribution', choices=LATENCY_DISTRIBUTIONS, default='lognormal',
+                            help="How mock latencies are spread around their mean.")
+        parser.add_argument('--error-rate', type=float, default=0.0,
+                            help="Fraction of mock API calls answered with a 503.")
+        parser.add_argument('--seed', type=int, default=None, help="Seed for the mock server's randomness.")
+        parser.add_argument('--timeout', type=float, default=300.0,
+                            help="Seconds to wait for processing to finish.")
+        parser.add_argument('--json', action='store_true', help="Print the report as JSON.")
+
+    def handle(self, *args, **options):
+        workdir = tempfile.mkdtemp(prefix='ringsewa-bench-')
+        server = MockAIServer(
+            transcription_latency=options['transcription_latency'],
+            chat_latency=options['chat_latency'],
+            distribution=options['latency_distribution'],
+            error_rate=options['error_rate'],
+            seed=options['seed'],
+        )
+        # A file database, so upload and worker threads share it like separate processes would
+        connection.settings_dict.setdefault('TEST', {})['NAME'] = os.path.join(workdir, 'benchmark.sqlite3')
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        stop_event = threading.Event()
+        try:
+            with server, override_settings(
+                MEDIA_ROOT=os.path.join(workdir, 'media'),
+                AI_PROVIDERS={'mock': {'BACKEND': 'core.providers.OpenAICompatibleProvider', 'API_BASE': server.api_base}},
+                AI_TRANSCRIPTION_PROVIDERS=['mock'],
+                AI_CHAT_PROVIDERS=['mock'],
+            ):
+                workers = [
+                    threading.Thread(target=work_loop, args=(stop_event, 0.1), daemon=True)
+                    for _ in range(max(1, options['workers']))
+                ]
+                for worker in workers:
+                    worker.start()
+                report = run_benchmark(options['uploads'], max(1, options['concurrency']), options['timeout'])
+                stop_event.set()
+                for worker in workers:
+                    worker.join()
+                report['mock_requests'] = dict(server.requests)
+        finally:
+            stop_event.set()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+        self.stdout.write(self.format_report(report))
+
+    def format_report(self, report):
+        def seconds(stats):
+            return "  ".join(f"{name} {value:.3f}s" for name, value in stats.items()) or "n/a"
+
+        lines = [
+            f"Uploads:           {report['created']}/{report['uploads']} created, {report['processed']} processed, "
+            f"{report['failed']} failed, {report['retries']} job retries{' (timed out)' if report['timed_out'] else ''}",
+            f"Upload latency:    {seconds(report['upload_latency'])}",
+            f"Time to processed: {seconds(report['time_to_processed'])}",
+            f"Throughput:        {report['upload_throughput']:.1f} uploads/s, {report['throughput']:.2f} processed/s "
+            f"over {report['elapsed']:.1f}s",
+            f"Peak RSS:          {report['peak_rss_mb']:.1f} MB",
+            f"Mock API calls:    {report['mock_requests']['transcription']} transcription, "
+            f"{report['mock_requests']['chat']} chat, {report['mock_requests']['errors']} errors",
+        ]
+        return "\n".join(lines)
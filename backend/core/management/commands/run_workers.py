@@ -0,0 +1,141 @@
+import logging
+import multiprocessing
+import signal
+import threading
+import time
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+
+from core.jobs import claim_jobs, claim_size, run_jobs, worker_id
+from core.maintenance import run_maintenance
+from core.pipeline import async_work_loop
+
+logger = logging.getLogger(__name__)
+
+WORKER_POLL_INTERVAL = getattr(settings, 'WORKER_POLL_INTERVAL', 1.0)
+
+
+def work_loop(stop_event, poll_interval=WORKER_POLL_INTERVAL, once=False):
+    """
+    Claims and runs jobs until `stop_event` is set.
+
+    Args:
+        stop_event (Event): Signals the loop to exit after the current job.
+        poll_interval (float): Seconds to sleep when the queue is empty.
+        once (bool): Exit as soon as the queue is empty.
+
+    Returns:
+        int: Number of jobs processed by this loop.
+    """
+    owner = worker_id()
+    processed = 0
+    try:
+        while not stop_event.is_set():
+            close_old_connections()
+            # Claim a whole NER batch when there is a backlog
+            jobs = claim_jobs(limit=claim_size(), owner=owner)
+            run_maintenance(idle=not jobs)
+            if not jobs:
+                if once:
+                    break
+                stop_event.wait(poll_interval)
+                continue
+            run_jobs(jobs)
+            processed += len(jobs)
+    finally:
+        connections.close_all()
+    return processed
+
+
+def _process_main(poll_interval, once):
+    stop_event = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *args: stop_event.set())
+    signal.signal(signal.SIGINT, lambda *args: stop_event.set())
+    work_loop(stop_event, poll_interval, once)
+
+
+class Command(BaseCommand):
+    help = "Run background workers that transcribe and extract fields for queued products."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=getattr(settings, 'WORKER_CONCURRENCY', 2),
+                            help="Number of worker threads (or processes with --processes).")
+        parser.add_argument('--processes', action='store_true',
+                            help="Run workers as separate processes instead of threads.")
+        parser.add_argument('--poll-interval', type=float, default=WORKER_POLL_INTERVAL,
+                            help="Seconds to wait between polls when the queue is empty.")
+        parser.add_argument('--async', action='store_true', dest='use_async',
+                            help="Run one asyncio worker that keeps --concurrency jobs in flight.")
+        parser.add_argument('--concurrency', type=int, default=getattr(settings, 'ASYNC_PIPELINE_CONCURRENCY', 100),
+                            help="Jobs in flight per asyncio worker (with --async).")
+        parser.add_argument('--once', action='store_true',
+                            help="Drain the queue and exit instead of polling forever.")
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'])
+        poll_interval = options['poll_interval']
+        once = options['once']
+
+        if options['use_async']:
+            self.stdout.write(f"Starting asyncio worker with {options['concurrency']} jobs in flight...")
+            self._run_async(options['concurrency'], poll_interval, once)
+            self.stdout.write("Workers stopped.")
+            return
+
+        self.stdout.write(f"Starting {workers} worker {'process' if options['processes'] else 'thread'}(s)...")
+
+        if options['processes']:
+            self._run_processes(workers, poll_interval, once)
+        else:
+            self._run_threads(workers, poll_interval, once)
+
+        self.stdout.write("Workers stopped.")
+
+    def _run_threads(self, workers, poll_interval, once):
+        stop_event = threading.Event()
+        signal.signal(signal.SIGTERM, lambda *args: stop_event.set())
+
+        threads = [
+            threading.Thread(target=work_loop, args=(stop_event, poll_interval, once), daemon=True)
+            for _ in range(workers)
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            while any(thread.is_alive() for thread in threads):
+                time.sleep(0.5)
+        except KeyboardInterrupt:
+            logger.info("Shutting down workers...")
+            stop_event.set()
+            for thread in threads:
+                thread.join()
+
+    def _run_async(self, concurrency, poll_interval, once):
+        stop_event = threading.Event()
+        signal.signal(signal.SIGTERM, lambda *args: stop_event.set())
+        try:
+            async_to_sync(async_work_loop)(stop_event, max(1, concurrency), poll_interval, once)
+        except KeyboardInterrupt:
+            logger.info("Shutting down workers...")
+
+    def _run_processes(self, workers, poll_interval, once):
+        # Forked children must not share the parent's database connections.
+        connections.close_all()
+        processes = [
+            multiprocessing.Process(target=_process_main, args=(poll_interval, once))
+            for _ in range(workers)
+        ]
+        for process in processes:
+            process.start()
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            logger.info("Shutting down workers...")
+            for process in processes:
+                process.terminate()
+            for process in processes:
+                process.join()
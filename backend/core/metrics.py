@@ -0,0 +1,322 @@
+# core/metrics.py
+
+import contextvars
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from .cache import CacheStats
+from .models import MetricTotal, ProcessingJob, ProcessingRun
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the latency histogram buckets
+METRICS_LATENCY_BUCKETS = getattr(
+    settings, 'METRICS_LATENCY_BUCKETS', (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300),
+)
+
+# Runs older than this (seconds) are deleted by the workers. The exported
+# counters and histograms live in MetricTotal and are not affected.
+METRICS_RUN_RETENTION = getattr(settings, 'METRICS_RUN_RETENTION', 7 * 24 * 60 * 60)
+
+# Seconds between flushes of the in-process CacheStats counters to
+# MetricTotal from workers and requests (a /metrics scrape always flushes)
+METRICS_STATS_FLUSH_INTERVAL = getattr(settings, 'METRICS_STATS_FLUSH_INTERVAL', 10)
+
+_last_stats_flush = time.monotonic()
+_stats_flush_lock = threading.Lock()
+
+# The run being recorded by the current thread or task, if any
+_current_run = contextvars.ContextVar('processing_run', default=None)
+
+
+class RunRecorder:
+    """
+    Collects stage timings and counters for one processing run. Safe to update
+    from helper threads started with a copy of the recording context.
+    """
+
+    def __init__(self):
+        self.started_at = timezone.now()
+        self._started = time.monotonic()
+        self.timings = defaultdict(float)
+        self.counts = Counter()
+        self.outcome = None
+        self._lock = threading.Lock()
+
+    @property
+    def duration(self):
+        return time.monotonic() - self._started
+
+    def add_time(self, stage, seconds):
+        with self._lock:
+            self.timings[stage] += seconds
+
+    def add(self, name, amount):
+        with self._lock:
+            self.counts[name] += amount
+
+    def absorb(self, other, share):
+        """
+        Adds a run shared by `share` products (a batched NER request): its
+        timings in full, since each product waited for it, and its counters
+        split evenly.
+        """
+        for stage, seconds in other.timings.items():
+            self.add_time(stage, seconds)
+        for name, amount in other.counts.items():
+            self.add(name, amount // max(1, share))
+
+
+@contextmanager
+def recording(recorder=None):
+    """
+    Makes `recorder` (or a new one) the current run for the enclosed code.
+    """
+    recorder = recorder or RunRecorder()
+    token = _current_run.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _current_run.reset(token)
+
+
+@contextmanager
+def stage(name):
+    """
+    Times the enclosed code (or decorated function) as `name` in the current
+    run. Does nothing outside a recording.
+    """
+    recorder = _current_run.get()
+    started = time.monotonic()
+    try:
+        yield
+    finally:
+        if recorder is not None:
+            recorder.add_time(name, time.monotonic() - started)
+
+
+def record(name, amount):
+    recorder = _current_run.get()
+    if recorder is not None and amount:
+        recorder.add(name, amount)
+
+
+def record_usage(usage):
+    """
+    Records the token usage of a chat completion (the `usage` dict of the API response).
+    """
+    if not isinstance(usage, dict):
+        return
+    for name in ('prompt_tokens', 'completion_tokens'):
+        value = usage.get(name)
+        if isinstance(value, int):
+            record(name, value)
+
+
+def set_outcome(outcome):
+    recorder = _current_run.get()
+    if recorder is not None:
+        recorder.outcome = outcome
+
+
+def save_run(recorder, product, job=None, outcome=None, error=None):
+    """
+    Stores a finished run. Never raises: losing a metrics row must not fail
+    the job it describes.
+
+    Args:
+        recorder (RunRecorder): The recorded run.
+        product (Product): The processed product.
+        job (ProcessingJob): The job that ran, if any.
+        outcome (str): ProcessingRun.OUTCOME_*; an outcome set during the run
+            (e.g. a rejection) takes precedence over success.
+        error: Exception or message for failed runs.
+    """
+    if outcome == ProcessingRun.OUTCOME_SUCCESS and recorder.outcome:
+        outcome = recorder.outcome
+    try:
+        with transaction.atomic():
+            run = ProcessingRun.objects.create(
+                product_id=product.pk,
+                job=job,
+                worker=(job.locked_by if job else '') or '',
+                outcome=outcome,
+                error=str(error)[:2000] if error else None,
+                started_at=recorder.started_at,
+                duration=recorder.duration,
+                bytes_in=recorder.counts['bytes_in'],
+                bytes_out=recorder.counts['bytes_out'],
+                prompt_tokens=recorder.counts['prompt_tokens'],
+                completion_tokens=recorder.counts['completion_tokens'],
+                **{f"{name}_seconds": recorder.timings[name] for name in ProcessingRun.STAGES},
+            )
+            add_run_totals(run)
+        return run
+    except Exception:
+        logger.exception(f"Could not record processing run for Product {product.pk}")
+        return None
+
+
+RUN_TOTAL_FIELDS = ('bytes_in', 'bytes_out', 'prompt_tokens', 'completion_tokens')
+
+
+def _histogram_fields():
+    return ['duration'] + [f"{name}_seconds" for name in ProcessingRun.STAGES]
+
+
+def run_totals(run, buckets=METRICS_LATENCY_BUCKETS):
+    """
+    The MetricTotal amounts one finished run adds: its outcome, byte and
+    token counts, and for each timing its sum, count and (non-cumulative)
+    histogram bucket.
+
+    Returns:
+        dict: MetricTotal name -> amount.
+    """
+    amounts = {f"runs:{run.outcome}": 1}
+    for field in RUN_TOTAL_FIELDS:
+        amounts[field] = getattr(run, field)
+    for field in _histogram_fields():
+        seconds = getattr(run, field)
+        # Stages that did not run are stored as 0 and left out of their histogram
+        if seconds > 0:
+            bound = next((bound for bound in buckets if seconds <= bound), '+Inf')
+            amounts[f"{field}:le={bound}"] = 1
+            amounts[f"{field}:count"] = 1
+            amounts[f"{field}:sum"] = seconds
+    return amounts
+
+
+def add_run_totals(run):
+    """
+    Adds a finished run to the /metrics totals. Must run in a transaction.
+    """
+    MetricTotal.add(run_totals(run))
+
+
+def flush_stats(min_interval=0):
+    """
+    Adds what this process's registered CacheStats counted since the last
+    flush to MetricTotal, so every worker's cache hits, fast-path results,
+    hedges and audio savings are exported and survive restarts. Never raises;
+    counts that fail to save are dropped.
+
+    Args:
+        min_interval (float): Skip the flush if the last one was more recent.
+    """
+    global _last_stats_flush
+    with _stats_flush_lock:
+        if time.monotonic() - _last_stats_flush < min_interval:
+            return
+        _last_stats_flush = time.monotonic()
+        amounts = {}
+        for component, stats in CacheStats.registry.items():
+            for name, amount in stats.drain().items():
+                amounts[f"stats:{component}:{name}"] = amount
+    if not amounts:
+        return
+    try:
+        with transaction.atomic():
+            MetricTotal.add(amounts)
+    except Exception:
+        logger.exception("Could not save cache and pipeline counters")
+
+
+def _labels(**labels):
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels.items()) + "}" if labels else ""
+
+
+def _number(value):
+    return int(value) if float(value).is_integer() else value
+
+
+def _histogram(lines, name, field, buckets, totals, **labels):
+    cumulative = 0
+    for bound in buckets:
+        cumulative += totals.get(f"{field}:le={bound}", 0)
+        lines.append(f"{name}_bucket{_labels(**labels, le=bound)} {_number(cumulative)}")
+    count = totals.get(f"{field}:count", 0)
+    lines.append(f"{name}_bucket{_labels(**labels, le='+Inf')} {_number(count)}")
+    lines.append(f"{name}_sum{_labels(**labels)} {totals.get(f'{field}:sum', 0)}")
+    lines.append(f"{name}_count{_labels(**labels)} {_number(count)}")
+
+
+def purge_old_runs(retention=METRICS_RUN_RETENTION):
+    """
+    Deletes processing runs that started more than `retention` seconds ago.
+    Their contribution to /metrics is kept in MetricTotal.
+
+    Returns:
+        int: Number of rows deleted.
+    """
+    deleted, _ = ProcessingRun.objects.filter(started_at__lt=timezone.now() - timedelta(seconds=retention)).delete()
+    if deleted:
+        logger.debug(f"Deleted {deleted} processing run(s) past retention.")
+    return deleted
+
+
+def render_metrics(buckets=METRICS_LATENCY_BUCKETS):
+    """
+    Renders processing metrics in the Prometheus text exposition format.
+    Everything is read from the database, so runs from every worker process
+    are included; counters and histograms come from MetricTotal, which only
+    grows, and survive the purge of old runs.
+
+    Returns:
+        str: The exposition body.
+    """
+    totals = dict(MetricTotal.objects.values_list('name', 'value'))
+
+    lines = [
+        "# HELP ringsewa_processing_duration_seconds End-to-end processing time per run.",
+        "# TYPE ringsewa_processing_duration_seconds histogram",
+    ]
+    _histogram(lines, 'ringsewa_processing_duration_seconds', 'duration', buckets, totals)
+
+    lines.append("# HELP ringsewa_processing_stage_seconds Time spent per pipeline stage.")
+    lines.append("# TYPE ringsewa_processing_stage_seconds histogram")
+    for name in ProcessingRun.STAGES:
+        _histogram(lines, 'ringsewa_processing_stage_seconds', f"{name}_seconds", buckets, totals, stage=name)
+
+    lines.append("# HELP ringsewa_processing_runs_total Processing runs by outcome.")
+    lines.append("# TYPE ringsewa_processing_runs_total counter")
+    for outcome, _ in ProcessingRun.OUTCOME_CHOICES:
+        lines.append(f"ringsewa_processing_runs_total{_labels(outcome=outcome)} {_number(totals.get(f'runs:{outcome}', 0))}")
+
+    lines.append("# HELP ringsewa_processing_bytes_total Audio bytes read from storage (in) and sent for transcription (out).")
+    lines.append("# TYPE ringsewa_processing_bytes_total counter")
+    lines.append(f"ringsewa_processing_bytes_total{_labels(direction='in')} {_number(totals.get('bytes_in', 0))}")
+    lines.append(f"ringsewa_processing_bytes_total{_labels(direction='out')} {_number(totals.get('bytes_out', 0))}")
+
+    lines.append("# HELP ringsewa_ai_tokens_total Chat-completion tokens used.")
+    lines.append("# TYPE ringsewa_ai_tokens_total counter")
+    lines.append(f"ringsewa_ai_tokens_total{_labels(type='prompt')} {_number(totals.get('prompt_tokens', 0))}")
+    lines.append(f"ringsewa_ai_tokens_total{_labels(type='completion')} {_number(totals.get('completion_tokens', 0))}")
+
+    lines.append("# HELP ringsewa_component_events_total Cache hits and misses, fast-path results, provider "
+                 "hedges and fallbacks, and audio preprocessing savings, summed over all processes.")
+    lines.append("# TYPE ringsewa_component_events_total counter")
+    for name, value in sorted(totals.items()):
+        if name.startswith('stats:'):
+            _, component, event = name.split(':', 2)
+            lines.append(f"ringsewa_component_events_total{_labels(component=component, event=event)} {_number(value)}")
+
+    jobs = dict(ProcessingJob.objects.values_list('status').annotate(count=Count('id')))
+    lines.append("# HELP ringsewa_jobs Processing jobs by status.")
+    lines.append("# TYPE ringsewa_jobs gauge")
+    for status, _ in ProcessingJob.STATUS_CHOICES:
+        lines.append(f"ringsewa_jobs{_labels(status=status)} {jobs.get(status, 0)}")
+
+    lines.append("# HELP ringsewa_queue_depth Jobs waiting to run.")
+    lines.append("# TYPE ringsewa_queue_depth gauge")
+    lines.append(f"ringsewa_queue_depth {jobs.get(ProcessingJob.STATUS_QUEUED, 0)}")
+    return "\n".join(lines) + "\n"
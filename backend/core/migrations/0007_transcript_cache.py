@@ -0,0 +1,35 @@
+# Generated by Django 4.2 on 2026-10-17 00:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_processingjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TranscriptCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('audio_hash', models.CharField(max_length=64)),
+                ('model', models.CharField(max_length=64)),
+                ('language', models.CharField(max_length=16)),
+                ('transcript', models.TextField()),
+                ('hits', models.PositiveIntegerField(default=0)),
+                ('last_hit_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='audio_hash',
+            field=models.CharField(blank=True, db_index=True, max_length=64, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='transcriptcache',
+            constraint=models.UniqueConstraint(fields=('audio_hash', 'model', 'language'), name='unique_transcript_cache_key'),
+        ),
+    ]
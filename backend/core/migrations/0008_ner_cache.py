@@ -0,0 +1,28 @@
+# Generated by Django 4.2 on 2026-10-17 00:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_transcript_cache'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NERCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('transcript_hash', models.CharField(max_length=64)),
+                ('model', models.CharField(max_length=64)),
+                ('prompt_version', models.CharField(max_length=32)),
+                ('temperature', models.FloatField(default=0)),
+                ('result', models.JSONField()),
+                ('hits', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+            ],
+        ),
+    ]
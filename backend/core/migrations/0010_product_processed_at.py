@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-17 00:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_product_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='processed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2 on 2026-10-17 00:34
+
+from django.db import migrations, models
+
+
+def backfill_change_seq(apps, schema_editor):
+    """
+    Numbers existing products in modification order and seeds the counter.
+    """
+    Product = apps.get_model('core', 'Product')
+    ChangeSequence = apps.get_model('core', 'ChangeSequence')
+    seq = 0
+    for pk in Product.objects.order_by('updated_at', 'id').values_list('id', flat=True).iterator():
+        seq += 1
+        Product.objects.filter(pk=pk).update(change_seq=seq)
+    ChangeSequence.objects.update_or_create(name='products', defaults={'value': seq})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_product_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeSequence',
+            fields=[
+                ('name', models.CharField(max_length=32, primary_key=True, serialize=False)),
+                ('value', models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='change_seq',
+            field=models.PositiveBigIntegerField(db_index=True, default=0),
+        ),
+        migrations.RunPython(backfill_change_seq, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2 on 2026-10-17 00:49
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_upload_session'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProcessingRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('worker', models.CharField(blank=True, max_length=64)),
+                ('outcome', models.CharField(choices=[('success', 'Success'), ('rejected', 'Audio rejected'), ('failed', 'Failed'), ('error', 'Error')], max_length=16)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('started_at', models.DateTimeField(db_index=True)),
+                ('duration', models.FloatField()),
+                ('read_seconds', models.FloatField(default=0)),
+                ('preprocess_seconds', models.FloatField(default=0)),
+                ('transcribe_seconds', models.FloatField(default=0)),
+                ('ner_seconds', models.FloatField(default=0)),
+                ('db_seconds', models.FloatField(default=0)),
+                ('bytes_in', models.PositiveBigIntegerField(default=0)),
+                ('bytes_out', models.PositiveBigIntegerField(default=0)),
+                ('prompt_tokens', models.PositiveIntegerField(default=0)),
+                ('completion_tokens', models.PositiveIntegerField(default=0)),
+                ('job', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='runs', to='core.processingjob')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='runs', to='core.product')),
+            ],
+        ),
+    ]
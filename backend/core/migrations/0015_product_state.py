@@ -0,0 +1,67 @@
+# Generated by Django 4.2 on 2026-10-17 00:52
+
+from django.db import migrations, models
+from django.db.models import Q
+
+
+def backfill_state(apps, schema_editor):
+    """
+    Derives the state of existing products from their status flags. Finished
+    products without a transcript were rejected before transcription.
+    """
+    Product = apps.get_model('core', 'Product')
+    Product.objects.filter(pending_transcription=True).update(state='pending')
+    Product.objects.filter(pending_transcription=False, pending_ner=True).update(state='transcribed')
+    finished = Product.objects.filter(pending_transcription=False, pending_ner=False)
+    finished.filter(Q(audio_transcription='') | Q(audio_transcription__isnull=True)).update(
+        state='rejected', processed=True,
+    )
+    finished.exclude(Q(audio_transcription='') | Q(audio_transcription__isnull=True)).update(
+        state='processed', processed=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_processing_run'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='failed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='ner_attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='ner_error',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='state',
+            field=models.CharField(choices=[('pending', 'Pending transcription'), ('transcribed', 'Pending NER'), ('processed', 'Processed'), ('rejected', 'Audio rejected'), ('failed', 'Failed')], db_index=True, default='pending', max_length=16),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='transcribed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='transcription_attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='transcription_error',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_state, migrations.RunPython.noop),
+    ]
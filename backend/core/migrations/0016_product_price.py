@@ -0,0 +1,32 @@
+# Generated by Django 4.2 on 2026-10-17 01:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_product_state'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='price_amount',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='price_amount_max',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='price_currency',
+            field=models.CharField(blank=True, max_length=3, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('price_amount__isnull', False)), fields=['price_currency', 'price_amount'], name='product_price_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2 on 2026-10-17 01:20
+
+from django.db import migrations
+
+
+def install(apps, schema_editor):
+    from core.search import install_search_index
+    install_search_index(schema_editor)
+
+
+def remove(apps, schema_editor):
+    from core.search import remove_search_index
+    remove_search_index(schema_editor)
+
+
+class Migration(migrations.Migration):
+    """
+    Full-text index over products: an FTS5 table kept in sync by triggers on
+    SQLite, a generated tsvector column with a GIN index on PostgreSQL.
+    """
+
+    dependencies = [
+        ('core', '0016_product_price'),
+    ]
+
+    operations = [
+        migrations.RunPython(install, remove),
+    ]
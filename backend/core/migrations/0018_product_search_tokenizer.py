@@ -0,0 +1,22 @@
+# Generated by Django 4.2 on 2026-10-17 09:40
+
+from django.db import migrations
+
+
+def rebuild(apps, schema_editor):
+    from core.search import rebuild_search_index
+    rebuild_search_index(schema_editor)
+
+
+class Migration(migrations.Migration):
+    """
+    Re-indexes products with a tokenizer that keeps Devanagari words whole.
+    """
+
+    dependencies = [
+        ('core', '0017_product_search'),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild, migrations.RunPython.noop),
+    ]
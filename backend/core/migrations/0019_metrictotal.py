@@ -0,0 +1,35 @@
+# Generated by Django 4.2 on 2026-10-17 01:25
+
+from django.db import migrations, models
+
+
+def backfill_totals(apps, schema_editor):
+    """
+    Starts the totals from the runs still in the table, so the exported
+    counters carry on from their last values.
+    """
+    from core.metrics import run_totals
+    ProcessingRun = apps.get_model('core', 'ProcessingRun')
+    MetricTotal = apps.get_model('core', 'MetricTotal')
+    totals = {}
+    for run in ProcessingRun.objects.order_by('id').iterator():
+        for name, amount in run_totals(run).items():
+            totals[name] = totals.get(name, 0) + amount
+    MetricTotal.objects.bulk_create(MetricTotal(name=name, value=value) for name, value in totals.items() if value)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_product_search_tokenizer'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MetricTotal',
+            fields=[
+                ('name', models.CharField(max_length=128, primary_key=True, serialize=False)),
+                ('value', models.FloatField(default=0)),
+            ],
+        ),
+        migrations.RunPython(backfill_totals, migrations.RunPython.noop),
+    ]
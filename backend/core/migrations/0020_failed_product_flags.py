@@ -0,0 +1,35 @@
+# Generated by Django 4.2 on 2026-10-17 10:05
+
+from django.db import migrations
+from django.db.models import F
+
+
+def clear_pending_flags(apps, schema_editor):
+    """
+    Clears the pending flags of products that failed while `save_failed`
+    still left them set. Each row gets a new version and change sequence
+    number, so cached payloads and /product/changes/ pick the change up.
+    """
+    Product = apps.get_model('core', 'Product')
+    ChangeSequence = apps.get_model('core', 'ChangeSequence')
+    counter, _ = ChangeSequence.objects.get_or_create(name='products')
+    seq = counter.value
+    failed = Product.objects.filter(state='failed').exclude(pending_transcription=False, pending_ner=False)
+    for pk in failed.order_by('id').values_list('id', flat=True).iterator():
+        seq += 1
+        Product.objects.filter(pk=pk).update(
+            pending_transcription=False, pending_ner=False, version=F('version') + 1, change_seq=seq,
+        )
+    counter.value = seq
+    counter.save(update_fields=['value'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_metrictotal'),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_pending_flags, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2 on 2026-10-17 10:40
+
+from django.conf import settings
+from django.db import migrations
+from django.db.models import Exists, OuterRef, Q
+
+
+def enqueue_pending(apps, schema_editor):
+    """
+    Queues products still pending from before the job queue existed (0006);
+    the post_save signal that used to process them no longer does, and
+    nothing else ever created a job for them.
+    """
+    Product = apps.get_model('core', 'Product')
+    ProcessingJob = apps.get_model('core', 'ProcessingJob')
+    max_attempts = getattr(settings, 'JOB_MAX_ATTEMPTS', 5)
+    pending = Product.objects.filter(Q(pending_transcription=True) | Q(pending_ner=True)).exclude(
+        Exists(ProcessingJob.objects.filter(product=OuterRef('pk'))),
+    )
+    ProcessingJob.objects.bulk_create(
+        (ProcessingJob(product_id=pk, max_attempts=max_attempts)
+         for pk in pending.order_by('id').values_list('id', flat=True)),
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_failed_product_flags'),
+    ]
+
+    operations = [
+        migrations.RunPython(enqueue_pending, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2 on 2026-10-17 10:45
+
+from django.db import migrations
+from django.db.models import F
+
+
+def bump_versions(apps, schema_editor):
+    """
+    0015 backfilled `state` (and `processed`) with a queryset update, which
+    left every row's version and change sequence number as they were: cached
+    payloads and ETags kept answering without the new field and
+    /product/changes/ never reported the rows. Each product gets a new
+    version and change sequence number now.
+    """
+    Product = apps.get_model('core', 'Product')
+    ChangeSequence = apps.get_model('core', 'ChangeSequence')
+    counter, _ = ChangeSequence.objects.get_or_create(name='products')
+    seq = counter.value
+    for pk in Product.objects.order_by('id').values_list('id', flat=True).iterator():
+        seq += 1
+        Product.objects.filter(pk=pk).update(version=F('version') + 1, change_seq=seq)
+    counter.value = seq
+    counter.save(update_fields=['value'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_enqueue_pending_products'),
+    ]
+
+    operations = [
+        migrations.RunPython(bump_versions, migrations.RunPython.noop),
+    ]
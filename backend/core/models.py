@@ -1,15 +1,37 @@
-from django.db import models
+from django.db import models, transaction
+from django.utils import timezone
 import uuid
 
+from .hashing import hash_chunks
+
 def product_audio_upload_to(instance, filename):
     # Create a dynamic path based on instance's `call_sid` and `id`
     return f'audio/{instance.call_sid}/{uuid.uuid4()}/{filename}'
 
 class Product(models.Model):
+    # Processing states. A product moves pending -> transcribed -> processed
+    # (or -> rejected); `failed` is entered once its job runs out of attempts.
+    STATE_PENDING = 'pending'
+    STATE_TRANSCRIBED = 'transcribed'
+    STATE_PROCESSED = 'processed'
+    STATE_REJECTED = 'rejected'
+    STATE_FAILED = 'failed'
+    STATE_CHOICES = [
+        (STATE_PENDING, 'Pending transcription'),
+        (STATE_TRANSCRIBED, 'Pending NER'),
+        (STATE_PROCESSED, 'Processed'),
+        (STATE_REJECTED, 'Audio rejected'),
+        (STATE_FAILED, 'Failed'),
+    ]
+    STAGE_TRANSCRIPTION = 'transcription'
+    STAGE_NER = 'ner'
+
     call_sid = models.CharField(max_length=34, unique=False)
 
     # Audio File
     audio_url = models.FileField(upload_to=product_audio_upload_to, blank=False, null=False)
+    # BLAKE2b digest of the audio bytes, used to reuse transcripts of identical uploads
+    audio_hash = models.CharField(max_length=64, blank=True, null=True, db_index=True)
 
     # Transcribed Text Fields
     audio_transcription = models.TextField(blank=True, null=True)
@@ -19,6 +41,22 @@ class Product(models.Model):
     extracted_description = models.TextField(blank=True, null=True)
     extracted_price = models.CharField(max_length=255, blank=True, null=True)
     extracted_location = models.CharField(max_length=255, blank=True, null=True)
+    # `extracted_price` parsed into a number for filtering and statistics; a
+    # quoted range ("५०-६०") keeps its upper bound in `price_amount_max`
+    price_amount = models.DecimalField(max_digits=12, decimal_places=2, blank=True, null=True)
+    price_amount_max = models.DecimalField(max_digits=12, decimal_places=2, blank=True, null=True)
+    price_currency = models.CharField(max_length=3, blank=True, null=True)
+
+    # Processing state; the flags below are kept in step with it for existing clients
+    state = models.CharField(max_length=16, choices=STATE_CHOICES, default=STATE_PENDING, db_index=True)
+    # Per-stage attempts and the last error of each stage; retries resume at
+    # the first stage that has not completed
+    transcription_attempts = models.PositiveSmallIntegerField(default=0)
+    transcription_error = models.TextField(blank=True, null=True)
+    ner_attempts = models.PositiveSmallIntegerField(default=0)
+    ner_error = models.TextField(blank=True, null=True)
+    transcribed_at = models.DateTimeField(blank=True, null=True)
+    failed_at = models.DateTimeField(blank=True, null=True)
 
     # Status Flags
     pending_transcription = models.BooleanField(default=True)
@@ -26,9 +64,255 @@ class Product(models.Model):
     processed = models.BooleanField(default=False)
 
     created_at = models.DateTimeField(auto_now_add=True)
+    # When the pipeline finished with this product (drives latency statistics)
+    processed_at = models.DateTimeField(blank=True, null=True)
+    # Bumped on every save; drives ETags and the serialized-payload cache
+    updated_at = models.DateTimeField(auto_now=True)
+    version = models.PositiveIntegerField(default=0)
+    # Position in the global change feed (`/product/changes/`); unique and
+    # assigned in commit order
+    change_seq = models.PositiveBigIntegerField(default=0, db_index=True)
+
+    class Meta:
+        indexes = [
+            # Webhook/status lookups by call
+            models.Index(fields=['call_sid'], name='product_call_sid_idx'),
+            # Keyset pagination, `created_at` ordering and dashboard date ranges
+            models.Index(fields=['created_at', 'id'], name='product_created_id_idx'),
+            # Pending-work scans only touch the (small) pending subset
+            models.Index(fields=['created_at'], condition=models.Q(pending_transcription=True),
+                         name='product_pending_transcr_idx'),
+            models.Index(fields=['created_at'], condition=models.Q(pending_ner=True),
+                         name='product_pending_ner_idx'),
+            models.Index(fields=['created_at'], condition=models.Q(processed=False),
+                         name='product_unprocessed_idx'),
+            # Price range filters and statistics over priced products
+            models.Index(fields=['price_currency', 'price_amount'], condition=models.Q(price_amount__isnull=False),
+                         name='product_price_idx'),
+        ]
 
     def __str__(self):
-        return f"Product {self.id} - {'Processed' if self.processed else 'Pending'}"
+        return f"Product {self.id} - {self.get_state_display()}"
     
     def save(self, *args, **kwargs):
-        super(Product, self).save(*args, **kwargs)
+        # Fingerprint newly uploaded audio. The hashing upload handlers already
+        # computed the digest while the request streamed in; otherwise hash it here.
+        if self.audio_url and not self.audio_url._committed and not self.audio_hash:
+            uploaded = self.audio_url.file
+            self.audio_hash = getattr(uploaded, 'content_hash', None) or hash_chunks(uploaded.chunks())
+        self.version = (self.version or 0) + 1
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | {'version', 'updated_at', 'change_seq'}
+        with transaction.atomic():
+            self.change_seq = ChangeSequence.next_value(ChangeSequence.PRODUCTS)
+            super(Product, self).save(*args, **kwargs)
+
+
+class ProcessingJob(models.Model):
+    """
+    A unit of background work (transcription + NER) for a single Product.
+
+    Rows are claimed by `manage.py run_workers` with a lease (`locked_until`);
+    a job whose lease expires while `running` is treated as crashed and becomes
+    claimable again.
+    """
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='jobs')
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+
+    # Retry / lease bookkeeping
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_until = models.DateTimeField(blank=True, null=True)
+    locked_by = models.CharField(max_length=64, blank=True, null=True)
+    last_error = models.TextField(blank=True, null=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='job_status_run_after_idx'),
+            models.Index(fields=['status', 'locked_until'], name='job_status_locked_idx'),
+        ]
+
+    def __str__(self):
+        return f"Job {self.id} for Product {self.product_id} - {self.status}"
+
+
+class ProcessingRun(models.Model):
+    """
+    One attempt at processing a Product: how long each stage took, how much
+    data and how many tokens it moved, and how it ended. Rows are append-only;
+    /metrics aggregates them.
+    """
+    OUTCOME_SUCCESS = 'success'
+    OUTCOME_REJECTED = 'rejected'
+    OUTCOME_FAILED = 'failed'
+    OUTCOME_ERROR = 'error'
+    OUTCOME_CHOICES = [
+        (OUTCOME_SUCCESS, 'Success'),
+        (OUTCOME_REJECTED, 'Audio rejected'),
+        (OUTCOME_FAILED, 'Failed'),
+        (OUTCOME_ERROR, 'Error'),
+    ]
+    STAGES = ('read', 'preprocess', 'transcribe', 'ner', 'db')
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='runs')
+    job = models.ForeignKey(ProcessingJob, on_delete=models.SET_NULL, blank=True, null=True, related_name='runs')
+    worker = models.CharField(max_length=64, blank=True)
+    outcome = models.CharField(max_length=16, choices=OUTCOME_CHOICES)
+    error = models.TextField(blank=True, null=True)
+
+    started_at = models.DateTimeField(db_index=True)
+    duration = models.FloatField()
+    # Seconds spent per stage; stages that did not run stay 0
+    read_seconds = models.FloatField(default=0)
+    preprocess_seconds = models.FloatField(default=0)
+    transcribe_seconds = models.FloatField(default=0)
+    ner_seconds = models.FloatField(default=0)
+    db_seconds = models.FloatField(default=0)
+
+    bytes_in = models.PositiveBigIntegerField(default=0)  # Stored audio read
+    bytes_out = models.PositiveBigIntegerField(default=0)  # Audio uploaded for transcription
+    prompt_tokens = models.PositiveIntegerField(default=0)
+    completion_tokens = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"Run {self.id} for Product {self.product_id} - {self.outcome} in {self.duration:.2f}s"
+
+
+class TranscriptCache(models.Model):
+    """
+    Whisper transcripts keyed by the audio content hash, so re-uploads of the
+    same recording skip the API call.
+    """
+    audio_hash = models.CharField(max_length=64)
+    model = models.CharField(max_length=64)
+    language = models.CharField(max_length=16)
+    transcript = models.TextField()
+
+    hits = models.PositiveIntegerField(default=0)
+    last_hit_at = models.DateTimeField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['audio_hash', 'model', 'language'], name='unique_transcript_cache_key'),
+        ]
+
+    def __str__(self):
+        return f"Transcript {self.audio_hash[:12]} ({self.model}/{self.language})"
+
+
+class NERCache(models.Model):
+    """
+    Memoized NER results keyed on (normalized transcript hash, model, prompt
+    version, temperature). Rows past `expires_at` are ignored and evicted.
+    """
+    key = models.CharField(max_length=64, unique=True)
+    transcript_hash = models.CharField(max_length=64)
+    model = models.CharField(max_length=64)
+    prompt_version = models.CharField(max_length=32)
+    temperature = models.FloatField(default=0)
+    result = models.JSONField()
+
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"NER {self.transcript_hash[:12]} ({self.model}/{self.prompt_version})"
+
+
+
+class UploadSession(models.Model):
+    """
+    A resumable upload. Chunks are written straight into `storage_name`, the
+    file's final location; finalizing creates the Product pointing at it.
+    """
+    STATUS_OPEN = 'open'
+    STATUS_COMPLETE = 'complete'
+    STATUS_CHOICES = [
+        (STATUS_OPEN, 'Open'),
+        (STATUS_COMPLETE, 'Complete'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    call_sid = models.CharField(max_length=34)
+    filename = models.CharField(max_length=255)
+    storage_name = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    # Bytes received so far; the next chunk must start here
+    received = models.PositiveBigIntegerField(default=0)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_OPEN)
+    product = models.OneToOneField(Product, on_delete=models.SET_NULL, blank=True, null=True,
+                                   related_name='upload_session')
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Open sessions untouched until then are deleted along with their bytes
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"Upload {self.id} ({self.received}/{self.size} bytes) - {self.status}"
+
+class ChangeSequence(models.Model):
+    """
+    Named monotonic counters. Taking the next value locks the counter row
+    until the transaction commits, so values become visible in order and a
+    reader that has seen value N can never later find a row below N.
+    """
+    PRODUCTS = 'products'
+
+    name = models.CharField(max_length=32, primary_key=True)
+    value = models.PositiveBigIntegerField(default=0)
+
+    @classmethod
+    def next_value(cls, name, count=1):
+        """
+        Reserves `count` values and returns the last one. Must run in a transaction.
+        """
+        if not cls.objects.filter(name=name).update(value=models.F('value') + count):
+            cls.objects.get_or_create(name=name)
+            cls.objects.filter(name=name).update(value=models.F('value') + count)
+        return cls.objects.filter(name=name).values_list('value', flat=True).get()
+
+    def __str__(self):
+        return f"{self.name} = {self.value}"
+
+
+class MetricTotal(models.Model):
+    """
+    A cumulative /metrics series, added to as processing runs finish. Unlike
+    ProcessingRun rows these are never purged, so exported counters only go up.
+    """
+    name = models.CharField(max_length=128, primary_key=True)
+    value = models.FloatField(default=0)
+
+    @classmethod
+    def add(cls, amounts):
+        """
+        Adds each of `amounts` ({name: amount}) to its total. Must run in a transaction.
+        """
+        for name, amount in amounts.items():
+            if not amount:
+                continue
+            if not cls.objects.filter(name=name).update(value=models.F('value') + amount):
+                cls.objects.get_or_create(name=name)
+                cls.objects.filter(name=name).update(value=models.F('value') + amount)
+
+    def __str__(self):
+        return f"{self.name} = {self.value}"
@@ -0,0 +1,110 @@
+# core/pagination.py
+
+import base64
+import json
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (cursor) pagination on (`created_at`, `id`).
+
+    Each page is a single indexed range scan, so the cost of a page does not
+    grow with its position in the table. `?order=asc` walks oldest-first,
+    which lets clients resume from the last row they have seen.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    order_query_param = 'order'
+    page_size = getattr(settings, 'PRODUCT_PAGE_SIZE', 100)
+    max_page_size = getattr(settings, 'PRODUCT_MAX_PAGE_SIZE', 1000)
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_page_size(self, request):
+        value = request.query_params.get(self.page_size_query_param)
+        if value is None:
+            return self.page_size
+        try:
+            size = int(value)
+        except ValueError:
+            raise ValidationError({self.page_size_query_param: 'Must be an integer.'})
+        return max(1, min(size, self.max_page_size))
+
+    def get_descending(self, request):
+        order = request.query_params.get(self.order_query_param, 'desc')
+        if order not in ('asc', 'desc'):
+            raise ValidationError({self.order_query_param: "Must be 'asc' or 'desc'."})
+        return order == 'desc'
+
+    def encode_cursor(self, obj):
+        payload = json.dumps([obj.created_at.isoformat(), obj.pk]).encode()
+        return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            created_at, pk = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            created_at = parse_datetime(created_at)
+            if created_at is None:
+                raise ValueError
+            return created_at, int(pk)
+        except (TypeError, ValueError, json.JSONDecodeError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size_value = self.get_page_size(request)
+        descending = self.get_descending(request)
+
+        if descending:
+            queryset = queryset.order_by('-created_at', '-id')
+        else:
+            queryset = queryset.order_by('created_at', 'id')
+
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            created_at, pk = self.decode_cursor(cursor)
+            if descending:
+                queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+            else:
+                queryset = queryset.filter(Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk))
+
+        # Fetch one extra row to know whether another page exists
+        rows = list(queryset[:self.page_size_value + 1])
+        self.has_next = len(rows) > self.page_size_value
+        self.page = rows[:self.page_size_value]
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
+
+    def get_last_cursor(self):
+        return self.encode_cursor(self.page[-1]) if self.page else self.request.query_params.get(self.cursor_query_param)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('cursor', self.get_last_cursor()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'cursor': {'type': 'string', 'nullable': True},
+                'results': schema,
+            },
+        }
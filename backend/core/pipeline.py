@@ -0,0 +1,264 @@
+# core/pipeline.py
+
+import asyncio
+import logging
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+
+from . import metrics, providers
+from .audio import AudioRejected
+from .cache import get_cached_ner, ner_cache_key, store_ner, store_transcript
+from .clients import build_async_client
+from .extraction import confident_fields
+from .jobs import claim_jobs, finish_job, record_exception, worker_id
+from .maintenance import run_maintenance
+from .models import Product
+from .utils import (
+    NER_FIELDS, NER_MODEL, NER_PROMPT_TEMPLATE, NER_PROMPT_VERSION, NER_SYSTEM_PROMPT, NER_TEMPERATURE,
+    TRANSCRIBE_CHUNK_RETRIES, WHISPER_LANGUAGE, WHISPER_MODEL, clean_ner_data, current_stage, open_audio,
+    parse_ner_content, prepare_transcription, save_extraction, save_rejection, save_stage_failure,
+    save_transcription, stitch_transcripts,
+)
+
+logger = logging.getLogger(__name__)
+
+ASYNC_PIPELINE_CONCURRENCY = getattr(settings, 'ASYNC_PIPELINE_CONCURRENCY', 100)
+
+
+def _prepare(product_instance):
+    """
+    Opens the audio and runs the local pre-transcription steps in a thread.
+    Chunk files are read into memory so they can be uploaded from the event loop.
+    """
+    audio_file = open_audio(product_instance.audio_url)
+    if audio_file is None:
+        return None, None, None
+    with audio_file:
+        audio_hash, transcript, uploads = prepare_transcription(product_instance, audio_file)
+        return audio_hash, transcript, [(filename, upload.read()) for filename, upload in uploads]
+
+
+class AsyncPipeline:
+    """
+    Runs the transcription + NER pipeline for many products concurrently on one
+    event loop. Network calls go to the configured AI backends (with the same
+    fallback, hedging and circuit breakers as the synchronous path) over one
+    pooled httpx.AsyncClient; file, CPU and database work runs in threads via
+    `sync_to_async`.
+    """
+
+    def __init__(self, concurrency=ASYNC_PIPELINE_CONCURRENCY, client=None):
+        self.concurrency = concurrency
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.client = client or build_async_client(concurrency)
+
+    async def aclose(self):
+        await self.client.aclose()
+
+    async def transcribe(self, filename, data):
+        """
+        Transcribes one upload.
+
+        Returns:
+            str: Transcribed text or empty string on failure.
+        """
+        if not providers.providers_for(providers.TRANSCRIPTION):
+            logger.error("No transcription backend is configured.")
+            return ""
+        metrics.record('bytes_out', len(data))
+        try:
+            return await providers.atranscribe(self.client, data, filename, WHISPER_LANGUAGE)
+        except providers.ProviderError as e:
+            logger.error(f"Transcription failed for {filename}: {e}")
+            return ""
+
+    async def transcribe_chunk(self, filename, data, attempts=TRANSCRIBE_CHUNK_RETRIES + 1):
+        for attempt in range(1, attempts + 1):
+            transcript = await self.transcribe(filename, data)
+            if transcript:
+                return transcript
+            logger.warning(f"Chunk {filename} attempt {attempt}/{attempts} failed")
+        return None
+
+    async def ner(self, transcript):
+        """
+        Performs NER, memoized through the same cache as `perform_ner`. Like
+        it, the rule-based fast path runs first and the model is only asked
+        when some field is uncertain.
+
+        Returns:
+            dict or None: Extracted fields, or None if the request or parsing failed.
+        """
+        fast = confident_fields(transcript)
+        if len(fast) == len(NER_FIELDS):
+            return clean_ner_data(fast)
+
+        cache_key = ner_cache_key(transcript, NER_MODEL, NER_PROMPT_VERSION, NER_TEMPERATURE)
+        ner_data = await sync_to_async(get_cached_ner)(cache_key)
+        if ner_data is not None:
+            return dict(ner_data, **fast)
+
+        if not providers.providers_for(providers.CHAT):
+            logger.error("No chat backend is configured.")
+            return None
+        messages = [
+            {"role": "system", "content": NER_SYSTEM_PROMPT},
+            {"role": "user", "content": NER_PROMPT_TEMPLATE.format(transcript=transcript)},
+        ]
+        try:
+            content = await providers.achat(self.client, messages, NER_TEMPERATURE)
+        except providers.ProviderError as e:
+            logger.error(f"NER request failed: {e}")
+            return None
+
+        ner_data = parse_ner_content(content or "")
+        if not isinstance(ner_data, dict):
+            return None
+        ner_data = clean_ner_data(ner_data)
+        await sync_to_async(store_ner)(cache_key, ner_data)
+        return dict(ner_data, **fast)
+
+    async def transcribe_product(self, product_instance):
+        """
+        Reads, preprocesses and transcribes a product's audio.
+
+        Returns:
+            str: Transcribed text or empty string on failure.
+
+        Raises:
+            AudioRejected: If preprocessing finds nothing worth transcribing.
+        """
+        audio_hash, transcript, uploads = await sync_to_async(_prepare)(product_instance)
+        if transcript is None and uploads is None:
+            logger.error(f"Failed to read audio for Product {product_instance.id}.")
+            return ""
+
+        if transcript is None:
+            with metrics.stage('transcribe'):
+                if len(uploads) == 1:
+                    transcript = await self.transcribe(*uploads[0])
+                else:
+                    parts = await asyncio.gather(*(self.transcribe_chunk(name, data) for name, data in uploads))
+                    transcript = "" if any(part is None for part in parts) else stitch_transcripts(parts)
+            if transcript and audio_hash:
+                await sync_to_async(store_transcript)(audio_hash, WHISPER_MODEL, WHISPER_LANGUAGE, transcript)
+        return transcript
+
+    async def process(self, product_instance):
+        """
+        Async equivalent of `extract_and_save`, including resuming at NER when
+        a previous attempt already stored the transcript.
+
+        Returns:
+            bool: True if the product was transcribed (or rejected) and updated.
+        """
+        async with self.semaphore:
+            if current_stage(product_instance) == Product.STAGE_NER:
+                transcript = product_instance.audio_transcription
+            else:
+                try:
+                    transcript = await self.transcribe_product(product_instance)
+                except AudioRejected as e:
+                    await sync_to_async(save_rejection)(product_instance, e)
+                    return True
+                if not transcript:
+                    await sync_to_async(save_stage_failure)(
+                        product_instance, "Transcription failed", Product.STAGE_TRANSCRIPTION,
+                    )
+                    return False
+                await sync_to_async(save_transcription)(product_instance, transcript)
+
+            with metrics.stage('ner'):
+                ner_data = await self.ner(transcript)
+            if ner_data is None:
+                await sync_to_async(save_stage_failure)(product_instance, "NER failed", Product.STAGE_NER)
+                return False
+            await sync_to_async(save_extraction)(product_instance, transcript, ner_data)
+            return True
+
+    async def run(self, products):
+        """
+        Processes products concurrently (bounded by `concurrency`).
+
+        Returns:
+            dict: Product id -> success flag.
+        """
+        results = await asyncio.gather(*(self.process(product) for product in products), return_exceptions=True)
+        outcomes = {}
+        for product, result in zip(products, results):
+            if isinstance(result, Exception):
+                logger.error(f"Async pipeline raised for Product {product.id}: {result}")
+                result = False
+            outcomes[product.id] = result
+        return outcomes
+
+
+def run_pipeline(products, concurrency=ASYNC_PIPELINE_CONCURRENCY):
+    """
+    Synchronous entry point: processes `products` on an event loop while
+    thread-sensitive database calls run back on the calling thread.
+    """
+    async def main():
+        pipeline = AsyncPipeline(concurrency)
+        try:
+            return await pipeline.run(list(products))
+        finally:
+            await pipeline.aclose()
+
+    return async_to_sync(main)()
+
+
+async def _run_claimed_job(pipeline, job):
+    # Each job runs in its own task, so its recording does not see the others
+    with metrics.recording() as run:
+        try:
+            success = await pipeline.process(job.product)
+        except Exception as e:
+            logger.exception(f"Job {job.id} raised during async processing")
+            await sync_to_async(record_exception)(job, run, e)
+            return
+    await sync_to_async(finish_job)(job, run, success)
+
+
+async def async_work_loop(stop_event, concurrency=ASYNC_PIPELINE_CONCURRENCY, poll_interval=1.0, once=False):
+    """
+    Keeps up to `concurrency` queued jobs in flight on one event loop.
+
+    Args:
+        stop_event (threading.Event): Stops claiming new jobs when set.
+        concurrency (int): Maximum jobs processed at once.
+        poll_interval (float): Seconds between claims when the queue is empty.
+        once (bool): Exit once the queue is empty and all jobs have finished.
+
+    Returns:
+        int: Number of jobs processed.
+    """
+    pipeline = AsyncPipeline(concurrency)
+    owner = worker_id()
+    in_flight = set()
+    processed = 0
+    try:
+        while True:
+            free = concurrency - len(in_flight)
+            jobs = []
+            if free > 0 and not stop_event.is_set():
+                jobs = await sync_to_async(claim_jobs)(limit=free, owner=owner)
+                await sync_to_async(run_maintenance)(idle=not jobs and not in_flight)
+                for job in jobs:
+                    in_flight.add(asyncio.create_task(_run_claimed_job(pipeline, job)))
+
+            if not in_flight:
+                if stop_event.is_set() or (once and not jobs):
+                    break
+                await asyncio.sleep(poll_interval)
+                continue
+
+            done, in_flight = await asyncio.wait(in_flight, timeout=poll_interval, return_when=asyncio.FIRST_COMPLETED)
+            processed += len(done)
+    finally:
+        if in_flight:
+            await asyncio.gather(*in_flight, return_exceptions=True)
+            processed += len(in_flight)
+        await pipeline.aclose()
+    return processed
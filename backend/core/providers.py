@@ -0,0 +1,485 @@
+# core/providers.py
+
+import asyncio
+import contextvars
+import json
+import logging
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import httpx
+import requests
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.dispatch import receiver
+from django.test.signals import setting_changed
+from django.utils.module_loading import import_string
+
+from . import clients, metrics
+from .cache import CacheStats
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TRANSCRIPTION_MODEL = getattr(settings, 'WHISPER_MODEL', 'whisper-1')
+DEFAULT_CHAT_MODEL = getattr(settings, 'NER_MODEL', 'gpt-4-turbo')
+
+AI_HEDGE_ENABLED = getattr(settings, 'AI_HEDGE_ENABLED', True)
+AI_HEDGE_PERCENTILE = getattr(settings, 'AI_HEDGE_PERCENTILE', 95)
+AI_HEDGE_DEFAULT_DELAY = getattr(settings, 'AI_HEDGE_DEFAULT_DELAY', 10.0)
+AI_HEDGE_MIN_DELAY = getattr(settings, 'AI_HEDGE_MIN_DELAY', 0.5)
+AI_HEDGE_MIN_SAMPLES = getattr(settings, 'AI_HEDGE_MIN_SAMPLES', 20)
+AI_LATENCY_WINDOW = getattr(settings, 'AI_LATENCY_WINDOW', 200)
+AI_PROVIDER_POOL_SIZE = getattr(settings, 'AI_PROVIDER_POOL_SIZE', 32)
+
+TRANSCRIPTION = 'transcription'
+CHAT = 'chat'
+
+# Hedges fired/won and per-backend failures
+provider_stats = CacheStats('providers')
+
+# Attempts run here so a hedge can start while the first is still waiting
+_executor = ThreadPoolExecutor(max_workers=AI_PROVIDER_POOL_SIZE, thread_name_prefix='ai-provider')
+
+
+class ProviderError(Exception):
+    """
+    Raised when a backend (or every configured backend) fails a request.
+    """
+
+
+class Provider:
+    """
+    A transcription/chat-completion backend.
+
+    Args:
+        name (str): Key of the backend in AI_PROVIDERS.
+        options (dict): Its settings entry.
+    """
+
+    def __init__(self, name, options):
+        self.name = name
+        self.options = options
+        self.transcription_model = options.get('TRANSCRIPTION_MODEL', DEFAULT_TRANSCRIPTION_MODEL)
+        self.chat_model = options.get('CHAT_MODEL', DEFAULT_CHAT_MODEL)
+
+    def available(self):
+        return True
+
+    def transcribe(self, data, filename, language):
+        """
+        Args:
+            data (bytes or clients.UploadSource): The audio; `data.read()`
+                gives the bytes of an UploadSource.
+
+        Returns:
+            str: The transcript.
+        """
+        raise NotImplementedError
+
+    def chat(self, messages, temperature, timeout=None):
+        """
+        Returns:
+            str: The assistant message content.
+        """
+        raise NotImplementedError
+
+    async def atranscribe(self, client, data, filename, language):
+        """
+        Async `transcribe`. `client` is the caller's httpx.AsyncClient;
+        backends without a native implementation run `transcribe` in a thread.
+        """
+        return await sync_to_async(self.transcribe, thread_sensitive=False)(data, filename, language)
+
+    async def achat(self, client, messages, temperature, timeout=None):
+        """
+        Async `chat`, like `atranscribe`.
+        """
+        return await sync_to_async(self.chat, thread_sensitive=False)(messages, temperature, timeout)
+
+    def __repr__(self):
+        return f"<{type(self).__name__} {self.name}>"
+
+
+class OpenAIProvider(Provider):
+    """
+    The OpenAI API, called through the pooled, retrying client.
+    """
+    requires_key = True
+
+    def __init__(self, name, options):
+        super().__init__(name, options)
+        self.api_base = options.get('API_BASE', 'https://api.openai.com/v1').rstrip('/')
+        self.api_key = options.get('API_KEY')
+        self.timeouts = {**clients.HTTP_TIMEOUTS, **options.get('TIMEOUTS', {})}
+
+    def available(self):
+        return bool(self.api_key) or not self.requires_key
+
+    def _headers(self):
+        return {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+
+    def _endpoint(self, operation):
+        # Breakers are per backend, so one failing server doesn't block the other
+        return f"{self.name}.{operation}"
+
+    def _transcription_request(self, data, filename, language, stream=False):
+        fields = {"model": self.transcription_model, "language": language}
+        request = {
+            'url': f"{self.api_base}/audio/transcriptions",
+            'headers': self._headers(),
+            'timeout': self.timeouts[TRANSCRIPTION],
+        }
+        if stream:
+            # requests would build a `files=` body in memory
+            body = clients.MultipartBody(fields, "file", filename, data)
+            request['headers'] = {**request['headers'], "Content-Type": body.content_type}
+            request['data'] = body
+        else:
+            request.update(data=fields, files={"file": (filename, data)})
+        return request
+
+    def _chat_request(self, messages, temperature, timeout):
+        return {
+            'url': f"{self.api_base}/chat/completions",
+            'headers': {**self._headers(), "Content-Type": "application/json"},
+            'json': {"model": self.chat_model, "messages": messages, "temperature": temperature},
+            'timeout': timeout or self.timeouts[CHAT],
+        }
+
+    def _transcript(self, response):
+        try:
+            transcript = response.json().get('text')
+        except (ValueError, AttributeError) as e:
+            raise ProviderError(f"{self.name} transcription failed: {e}") from e
+        if not isinstance(transcript, str):
+            raise ProviderError(f"{self.name} returned no transcript: {response.text[:200]}")
+        return transcript.strip()
+
+    def _chat_content(self, response):
+        try:
+            payload = response.json()
+            metrics.record_usage(payload.get('usage'))
+            return payload['choices'][0]['message']['content']
+        except (ValueError, KeyError, IndexError, TypeError, AttributeError) as e:
+            raise ProviderError(f"{self.name} chat completion failed: {e}") from e
+
+    def transcribe(self, data, filename, language):
+        try:
+            response = clients.post(
+                self._endpoint(TRANSCRIPTION), **self._transcription_request(data, filename, language, stream=True),
+            )
+        except (requests.RequestException, OSError) as e:
+            raise ProviderError(f"{self.name} transcription failed: {e}") from e
+        return self._transcript(response)
+
+    def chat(self, messages, temperature, timeout=None):
+        try:
+            response = clients.post(self._endpoint(CHAT), **self._chat_request(messages, temperature, timeout))
+        except requests.RequestException as e:
+            raise ProviderError(f"{self.name} chat completion failed: {e}") from e
+        return self._chat_content(response)
+
+    async def atranscribe(self, client, data, filename, language):
+        try:
+            response = await clients.arequest(
+                client, self._endpoint(TRANSCRIPTION), 'POST', **self._transcription_request(data, filename, language),
+            )
+        except (httpx.HTTPError, requests.RequestException) as e:
+            raise ProviderError(f"{self.name} transcription failed: {e}") from e
+        return self._transcript(response)
+
+    async def achat(self, client, messages, temperature, timeout=None):
+        try:
+            response = await clients.arequest(
+                client, self._endpoint(CHAT), 'POST', **self._chat_request(messages, temperature, timeout),
+            )
+        except (httpx.HTTPError, requests.RequestException) as e:
+            raise ProviderError(f"{self.name} chat completion failed: {e}") from e
+        return self._chat_content(response)
+
+
+class OpenAICompatibleProvider(OpenAIProvider):
+    """
+    Any server exposing the OpenAI audio/chat routes (e.g. a local Whisper or
+    LLM server). The API key is optional.
+    """
+    requires_key = False
+
+
+class FakeProvider(Provider):
+    """
+    Canned responses for development and tests; never touches the network.
+
+    Options: TRANSCRIPT, CHAT_RESPONSE (str or dict), LATENCY (seconds or
+    [min, max]) and FAILURE_RATE (0-1).
+    """
+
+    def _simulate(self, operation):
+        latency = self.options.get('LATENCY', 0)
+        if isinstance(latency, (list, tuple)):
+            latency = random.uniform(*latency)
+        if latency:
+            time.sleep(latency)
+        if random.random() < self.options.get('FAILURE_RATE', 0):
+            raise ProviderError(f"{self.name} simulated {operation} failure")
+
+    def transcribe(self, data, filename, language):
+        self._simulate(TRANSCRIPTION)
+        return self.options.get('TRANSCRIPT', "")
+
+    def chat(self, messages, temperature, timeout=None):
+        self._simulate(CHAT)
+        response = self.options.get('CHAT_RESPONSE', {})
+        return response if isinstance(response, str) else json.dumps(response, ensure_ascii=False)
+
+
+class LatencyTracker:
+    """
+    Sliding window of successful request latencies for one backend/operation.
+    """
+
+    def __init__(self, window=AI_LATENCY_WINDOW):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, p, min_samples=AI_HEDGE_MIN_SAMPLES):
+        """
+        Returns the nearest-rank percentile, or None with too few samples.
+        """
+        with self._lock:
+            samples = sorted(self._samples)
+        if len(samples) < max(1, min_samples):
+            return None
+        index = min(len(samples) - 1, max(0, -(-p * len(samples) // 100) - 1))
+        return samples[index]
+
+
+_providers = {}
+_trackers = {}
+_registry_lock = threading.Lock()
+
+
+def get_provider(name):
+    with _registry_lock:
+        if name not in _providers:
+            options = settings.AI_PROVIDERS[name]
+            _providers[name] = import_string(options['BACKEND'])(name, options)
+        return _providers[name]
+
+
+def providers_for(operation):
+    """
+    Returns the usable backends for 'transcription' or 'chat', primary first.
+    """
+    names = settings.AI_TRANSCRIPTION_PROVIDERS if operation == TRANSCRIPTION else settings.AI_CHAT_PROVIDERS
+    return [provider for provider in map(get_provider, names) if provider.available()]
+
+
+def latency_tracker(provider, operation):
+    key = (provider.name, operation)
+    with _registry_lock:
+        if key not in _trackers:
+            _trackers[key] = LatencyTracker()
+        return _trackers[key]
+
+
+def reset_providers():
+    with _registry_lock:
+        _providers.clear()
+        _trackers.clear()
+
+
+@receiver(setting_changed)
+def _reset_on_setting_change(setting, **kwargs):
+    if setting.startswith('AI_'):
+        reset_providers()
+
+
+def hedge_delay(provider, operation):
+    """
+    How long to wait for `provider` before asking the next backend: its recent
+    p95 latency, or AI_HEDGE_DEFAULT_DELAY until enough samples exist.
+    """
+    observed = latency_tracker(provider, operation).percentile(AI_HEDGE_PERCENTILE)
+    if observed is None:
+        return AI_HEDGE_DEFAULT_DELAY
+    return max(AI_HEDGE_MIN_DELAY, observed)
+
+
+def _timed(provider, operation, call):
+    started = time.monotonic()
+    try:
+        result = call(provider)
+    except ProviderError:
+        provider_stats.incr(f"{provider.name}_{operation}_failures")
+        raise
+    latency_tracker(provider, operation).record(time.monotonic() - started)
+    return result
+
+
+def hedged(operation, call, providers=None):
+    """
+    Runs `call(provider)` on the primary backend. If it has not answered within
+    its p95 latency, the same call also goes to the next backend and the first
+    success wins; a failure moves on to the next backend at once. The slower
+    attempt is left to finish in the background (it still feeds the latency
+    window) and its result is discarded.
+
+    Args:
+        operation (str): 'transcription' or 'chat'.
+        call (callable): Takes a Provider and returns its result or raises ProviderError.
+        providers (list): Overrides the configured backends.
+
+    Returns:
+        The first successful result.
+
+    Raises:
+        ProviderError: If no backend is configured or every backend failed.
+    """
+    remaining = list(providers if providers is not None else providers_for(operation))
+    if not remaining:
+        raise ProviderError(f"No {operation} provider is configured")
+
+    pending = {}
+    errors = []
+
+    def launch():
+        provider = remaining.pop(0)
+        # Run in a copy of the caller's context so usage is counted in its processing run
+        pending[_executor.submit(contextvars.copy_context().run, _timed, provider, operation, call)] = provider
+        return provider
+
+    primary = latest = launch()
+    while pending:
+        timeout = hedge_delay(latest, operation) if AI_HEDGE_ENABLED and remaining else None
+        done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+        if not done:
+            logger.info(f"{latest.name} {operation} slower than {timeout:.2f}s; hedging to {remaining[0].name}")
+            provider_stats.incr('hedges')
+            latest = launch()
+            continue
+
+        for future in done:
+            provider = pending.pop(future)
+            try:
+                result = future.result()
+            except ProviderError as e:
+                logger.warning(str(e))
+                errors.append(str(e))
+                continue
+            if provider is not primary:
+                provider_stats.incr(f"{provider.name}_{operation}_fallback_wins")
+            return result
+
+        if not pending and remaining:
+            latest = launch()
+
+    raise ProviderError(f"All {operation} providers failed: {'; '.join(errors)}")
+
+
+async def _atimed(provider, operation, call):
+    started = time.monotonic()
+    try:
+        result = await call(provider)
+    except ProviderError:
+        provider_stats.incr(f"{provider.name}_{operation}_failures")
+        raise
+    latency_tracker(provider, operation).record(time.monotonic() - started)
+    return result
+
+
+async def ahedged(operation, call, providers=None):
+    """
+    Async `hedged`: the same primary, hedge and fallback order, with attempts
+    run as tasks on the caller's event loop. Attempts still running once one
+    succeeds are cancelled, since the loop may close right after.
+
+    Args:
+        operation (str): 'transcription' or 'chat'.
+        call (callable): Takes a Provider and returns an awaitable of its
+            result, which raises ProviderError on failure.
+        providers (list): Overrides the configured backends.
+
+    Raises:
+        ProviderError: If no backend is configured or every backend failed.
+    """
+    remaining = list(providers if providers is not None else providers_for(operation))
+    if not remaining:
+        raise ProviderError(f"No {operation} provider is configured")
+
+    pending = {}
+    errors = []
+
+    def launch():
+        provider = remaining.pop(0)
+        pending[asyncio.ensure_future(_atimed(provider, operation, call))] = provider
+        return provider
+
+    primary = latest = launch()
+    try:
+        while pending:
+            timeout = hedge_delay(latest, operation) if AI_HEDGE_ENABLED and remaining else None
+            done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                logger.info(f"{latest.name} {operation} slower than {timeout:.2f}s; hedging to {remaining[0].name}")
+                provider_stats.incr('hedges')
+                latest = launch()
+                continue
+
+            for task in done:
+                provider = pending.pop(task)
+                try:
+                    result = task.result()
+                except ProviderError as e:
+                    logger.warning(str(e))
+                    errors.append(str(e))
+                    continue
+                if provider is not primary:
+                    provider_stats.incr(f"{provider.name}_{operation}_fallback_wins")
+                return result
+
+            if not pending and remaining:
+                latest = launch()
+    finally:
+        for task in pending:
+            task.cancel()
+
+    raise ProviderError(f"All {operation} providers failed: {'; '.join(errors)}")
+
+
+def transcribe(data, filename, language):
+    """
+    Transcribes audio on the configured backends. `data` is bytes or a
+    seekable binary file, which HTTP backends stream from disk; hedged
+    attempts share it through one UploadSource.
+    """
+    data = data if isinstance(data, clients.UploadSource) else clients.UploadSource(data)
+    return hedged(TRANSCRIPTION, lambda provider: provider.transcribe(data, filename, language))
+
+
+def chat(messages, temperature, timeout=None):
+    """
+    Runs a chat completion on the configured backends.
+    """
+    return hedged(CHAT, lambda provider: provider.chat(messages, temperature, timeout))
+
+
+async def atranscribe(client, data, filename, language):
+    """
+    Async `transcribe`; HTTP backends send through `client` (an httpx.AsyncClient).
+    """
+    return await ahedged(TRANSCRIPTION, lambda provider: provider.atranscribe(client, data, filename, language))
+
+
+async def achat(client, messages, temperature, timeout=None):
+    """
+    Async `chat`; HTTP backends send through `client` (an httpx.AsyncClient).
+    """
+    return await ahedged(CHAT, lambda provider: provider.achat(client, messages, temperature, timeout))
@@ -0,0 +1,264 @@
+# core/search.py
+
+import logging
+import re
+import unicodedata
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connection, connections, transaction
+from django.db.models import Q
+
+from .extraction import DEVANAGARI_DIGITS, SUFFIXES
+from .models import Product
+
+logger = logging.getLogger(__name__)
+
+SEARCH_TABLE = 'core_product_search'
+SEARCH_TRIGGERS = ('core_product_search_ai', 'core_product_search_ad', 'core_product_search_au')
+# unicode61 splits words on anything outside its token categories; the
+# default leaves out combining marks (M*), which cut Devanagari words apart
+# at every vowel sign and virama
+SEARCH_TOKENIZER = "unicode61 remove_diacritics 0 categories 'L* N* M* Co'"
+
+# Indexed columns and their bm25 / ts_rank weight
+SEARCH_COLUMNS = (
+    ('extracted_product_name', 10.0),
+    ('extracted_description', 4.0),
+    ('extracted_location', 4.0),
+    ('extracted_price', 2.0),
+    ('audio_transcription', 1.0),
+    ('call_sid', 1.0),
+)
+# Postgres only has four weight classes
+SEARCH_PG_WEIGHTS = {
+    'extracted_product_name': 'A',
+    'extracted_description': 'B',
+    'extracted_location': 'B',
+    'extracted_price': 'C',
+    'audio_transcription': 'D',
+    'call_sid': 'D',
+}
+
+# Terms beyond this are ignored; each one is a separate index lookup
+SEARCH_MAX_TERMS = getattr(settings, 'SEARCH_MAX_TERMS', 8)
+
+ASCII_TO_DEVANAGARI = str.maketrans("0123456789", "०१२३४५६७८९")
+QUERY_TERM_SPLIT = re.compile(r"[^\wऀ-ॿ]+")
+
+
+def search_terms(text):
+    """
+    Splits a query into index terms. Text is NFC-normalized and postpositions
+    glued onto a word are dropped ("चितवनबाट" -> "चितवन"); every term is then
+    matched as a prefix, so "चितवन" also finds "चितवनमा".
+
+    Returns:
+        list of list: One entry per term, holding its spellings; numbers are
+        searched in both Devanagari and ASCII digits.
+    """
+    text = unicodedata.normalize('NFC', text or '')
+    terms = []
+    for word in QUERY_TERM_SPLIT.split(text):
+        if not word:
+            continue
+        for suffix in SUFFIXES:
+            if word.endswith(suffix) and len(word) > len(suffix) + 1:
+                word = word[:-len(suffix)]
+                break
+        ascii_word = word.translate(DEVANAGARI_DIGITS)
+        spellings = [word]
+        if any(char.isdigit() for char in ascii_word):
+            spellings = list(dict.fromkeys([ascii_word, ascii_word.translate(ASCII_TO_DEVANAGARI)]))
+        if spellings not in terms:
+            terms.append(spellings)
+    return terms[:SEARCH_MAX_TERMS]
+
+
+def fts5_query(terms):
+    """
+    Builds an FTS5 MATCH expression requiring every term (as a prefix).
+    """
+    def phrase(spelling):
+        return '"' + spelling.replace('"', '""') + '"*'
+
+    parts = []
+    for spellings in terms:
+        alternatives = [phrase(spelling) for spelling in spellings]
+        parts.append(alternatives[0] if len(alternatives) == 1 else f"({' OR '.join(alternatives)})")
+    return " AND ".join(parts)
+
+
+def tsquery(terms):
+    """
+    Builds a `to_tsquery('simple', ...)` expression requiring every term (as a prefix).
+    """
+    def lexeme(spelling):
+        return "'" + spelling.lower().replace("'", "''").replace("\\", "") + "':*"
+
+    parts = []
+    for spellings in terms:
+        alternatives = [lexeme(spelling) for spelling in spellings]
+        parts.append(alternatives[0] if len(alternatives) == 1 else f"({' | '.join(alternatives)})")
+    return " & ".join(parts)
+
+
+def search_products(text, limit, offset=0):
+    """
+    Full-text searches products, best match first.
+
+    Args:
+        text (str): The user's query.
+        limit (int): Maximum number of results.
+        offset (int): Results to skip.
+
+    Returns:
+        list of int: Matching product ids in rank order.
+    """
+    terms = search_terms(text)
+    if not terms:
+        return []
+
+    if connection.vendor == 'sqlite':
+        weights = ", ".join(str(weight) for _, weight in SEARCH_COLUMNS)
+        sql = (
+            f"SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s "
+            f"ORDER BY bm25({SEARCH_TABLE}, {weights}), rowid LIMIT %s OFFSET %s"
+        )
+        params = [fts5_query(terms), limit, offset]
+    elif connection.vendor == 'postgresql':
+        sql = (
+            "SELECT id FROM core_product, to_tsquery('simple', %s) query WHERE search_vector @@ query "
+            "ORDER BY ts_rank(search_vector, query) DESC, id LIMIT %s OFFSET %s"
+        )
+        params = [tsquery(terms), limit, offset]
+    else:
+        logger.warning(f"No full-text index on {connection.vendor}; falling back to a table scan")
+        matches = Product.objects.filter(search_fallback_q(terms)).order_by('-created_at', '-id')
+        return list(matches.values_list('id', flat=True)[offset:offset + limit])
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def search_filter(queryset, text):
+    """
+    Restricts a Product queryset to full-text matches, without ranking (for
+    the admin).
+    """
+    terms = search_terms(text)
+    if not terms:
+        return queryset
+    if connection.vendor == 'sqlite':
+        return queryset.extra(
+            where=[f"core_product.id IN (SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s)"],
+            params=[fts5_query(terms)],
+        )
+    if connection.vendor == 'postgresql':
+        return queryset.extra(where=["core_product.search_vector @@ to_tsquery('simple', %s)"], params=[tsquery(terms)])
+    return queryset.filter(search_fallback_q(terms))
+
+
+def search_fallback_q(terms):
+    condition = Q()
+    for spellings in terms:
+        term = Q()
+        for spelling in spellings:
+            for column, _ in SEARCH_COLUMNS:
+                term |= Q(**{f"{column}__icontains": spelling})
+        condition &= term
+    return condition
+
+
+def _sqlite_install_sql():
+    columns = ", ".join(column for column, _ in SEARCH_COLUMNS)
+    new = ", ".join(f"new.{column}" for column, _ in SEARCH_COLUMNS)
+    old = ", ".join(f"old.{column}" for column, _ in SEARCH_COLUMNS)
+    changed = " OR ".join(f"old.{column} IS NOT new.{column}" for column, _ in SEARCH_COLUMNS)
+    return [
+        # External content: the index stores tokens only, rows are read from core_product
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5({columns}, content='core_product', "
+        f"content_rowid='id', tokenize=\"{SEARCH_TOKENIZER}\")",
+        f"CREATE TRIGGER IF NOT EXISTS core_product_search_ai AFTER INSERT ON core_product BEGIN "
+        f"INSERT INTO {SEARCH_TABLE}(rowid, {columns}) VALUES (new.id, {new}); END",
+        f"CREATE TRIGGER IF NOT EXISTS core_product_search_ad AFTER DELETE ON core_product BEGIN "
+        f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, {columns}) VALUES ('delete', old.id, {old}); END",
+        # Most saves only touch status and version columns; skip those
+        f"CREATE TRIGGER IF NOT EXISTS core_product_search_au AFTER UPDATE ON core_product WHEN {changed} BEGIN "
+        f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, {columns}) VALUES ('delete', old.id, {old}); "
+        f"INSERT INTO {SEARCH_TABLE}(rowid, {columns}) VALUES (new.id, {new}); END",
+    ]
+
+
+def _postgres_install_sql():
+    document = " || ".join(
+        f"setweight(to_tsvector('simple'::regconfig, coalesce({column}, '')), '{SEARCH_PG_WEIGHTS[column]}')"
+        for column, _ in SEARCH_COLUMNS
+    )
+    return [
+        f"ALTER TABLE core_product ADD COLUMN IF NOT EXISTS search_vector tsvector "
+        f"GENERATED ALWAYS AS ({document}) STORED",
+        "CREATE INDEX IF NOT EXISTS product_search_vector_idx ON core_product USING GIN (search_vector)",
+    ]
+
+
+def _install(execute, vendor):
+    if vendor == 'sqlite':
+        for sql in _sqlite_install_sql():
+            execute(sql)
+        execute(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('rebuild')")
+    elif vendor == 'postgresql':
+        # The generated column is computed for existing rows as it is added
+        for sql in _postgres_install_sql():
+            execute(sql)
+    else:
+        logger.warning(f"Full-text search is not supported on {vendor}; search will scan the table")
+
+
+def install_search_index(schema_editor):
+    """
+    Creates the full-text index for the connection's database and fills it
+    from existing rows. Safe to run again.
+    """
+    _install(schema_editor.execute, schema_editor.connection.vendor)
+
+
+def remove_search_index(schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        for trigger in SEARCH_TRIGGERS:
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        schema_editor.execute(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")
+    elif vendor == 'postgresql':
+        schema_editor.execute("DROP INDEX IF EXISTS product_search_vector_idx")
+        schema_editor.execute("ALTER TABLE core_product DROP COLUMN IF EXISTS search_vector")
+
+
+def rebuild_search_index(schema_editor):
+    """
+    Drops and re-creates the SQLite index, e.g. after a tokenizer change.
+    """
+    if schema_editor.connection.vendor == 'sqlite':
+        remove_search_index(schema_editor)
+        install_search_index(schema_editor)
+
+
+def ensure_search_triggers(using=DEFAULT_DB_ALIAS):
+    """
+    Re-creates the SQLite triggers if a migration rebuilt core_product
+    (SQLite alters tables by copying them, which drops their triggers), and
+    re-indexes since writes in between were missed.
+    """
+    db = connections[using]
+    if db.vendor != 'sqlite':
+        return
+    with transaction.atomic(using=using), db.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger') AND name IN (%s, %s, %s, %s)",
+            [SEARCH_TABLE, *SEARCH_TRIGGERS],
+        )
+        present = {row[0] for row in cursor.fetchall()}
+        if SEARCH_TABLE not in present or present == {SEARCH_TABLE, *SEARCH_TRIGGERS}:
+            return
+        logger.warning("Full-text search triggers were missing; re-creating them and rebuilding the index")
+        _install(cursor.execute, db.vendor)
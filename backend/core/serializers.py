@@ -1,7 +1,16 @@
 # core/serializers.py
 
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 from rest_framework import serializers
-from .models import Product
+from .models import Product, UploadSession
+
+SEARCH_PAGE_SIZE = getattr(settings, 'SEARCH_PAGE_SIZE', 20)
+SEARCH_MAX_PAGE_SIZE = getattr(settings, 'SEARCH_MAX_PAGE_SIZE', 100)
 
 class ProductCreateSerializer(serializers.ModelSerializer):
     """
@@ -13,7 +22,53 @@ class ProductCreateSerializer(serializers.ModelSerializer):
         model = Product
         fields = ['call_sid', 'audio_url']
 
-class ProductRetrieveSerializer(serializers.ModelSerializer):
+class UploadSessionSerializer(serializers.ModelSerializer):
+    """
+    Serializer for resumable upload sessions. `received` is the offset the
+    next chunk must start at.
+    """
+    call_sid = serializers.CharField(max_length=34)
+    filename = serializers.CharField(max_length=255)
+    size = serializers.IntegerField(min_value=1)
+
+    class Meta:
+        model = UploadSession
+        fields = ['id', 'call_sid', 'filename', 'size', 'received', 'status', 'product', 'expires_at']
+        read_only_fields = ['id', 'received', 'status', 'product', 'expires_at']
+
+    def validate_size(self, value):
+        limit = self.context.get('max_size')
+        if limit and value > limit:
+            raise serializers.ValidationError(f"Uploads are limited to {limit} bytes.")
+        return value
+
+class SparseFieldsMixin:
+    """
+    Lets clients request a subset of fields with `?fields=id,processed,...`.
+    Unknown names are ignored; an empty selection returns all fields.
+    """
+    fields_query_param = 'fields'
+
+    @classmethod
+    def requested_fields(cls, request):
+        if request is None:
+            return None
+        value = request.query_params.get(cls.fields_query_param)
+        if not value:
+            return None
+        requested = [name.strip() for name in value.split(',') if name.strip()]
+        known = [name for name in requested if name in cls.Meta.fields]
+        return known or None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        requested = self.requested_fields(self.context.get('request'))
+        if requested:
+            for name in set(self.fields) - set(requested):
+                self.fields.pop(name)
+
+
+class ProductRetrieveSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
     Serializer for retrieving Product information (with transcribed text and extracted fields).
     """
@@ -27,10 +82,75 @@ class ProductRetrieveSerializer(serializers.ModelSerializer):
             'extracted_product_name',
             'extracted_description',
             'extracted_price',
+            'price_amount',
+            'price_amount_max',
+            'price_currency',
             'extracted_location',
             'created_at',
+            'updated_at',
+            'state',
             'processed',
             'pending_transcription',
             'pending_ner',
         ]
-        read_only_fields = ['id', 'created_at', 'processed']
+        read_only_fields = [
+            'id', 'created_at', 'updated_at', 'processed', 'price_amount', 'price_amount_max', 'price_currency',
+        ]
+
+
+class ProductListQuerySerializer(serializers.Serializer):
+    """
+    Price filters for the product list. Bounds are inclusive, compare against
+    `price_amount` (the lower end of a quoted range) and are in `currency`,
+    which defaults to NPR when a bound is given.
+    """
+    min_price = serializers.DecimalField(max_digits=12, decimal_places=2, required=False, min_value=Decimal(0))
+    max_price = serializers.DecimalField(max_digits=12, decimal_places=2, required=False, min_value=Decimal(0))
+    currency = serializers.RegexField(r'^[A-Za-z]{3}$', required=False)
+
+    def validate(self, attrs):
+        if 'min_price' in attrs and 'max_price' in attrs and attrs['min_price'] > attrs['max_price']:
+            raise serializers.ValidationError({'max_price': "Must not be below min_price."})
+        if 'currency' in attrs:
+            attrs['currency'] = attrs['currency'].upper()
+        return attrs
+
+
+class ProductSearchQuerySerializer(serializers.Serializer):
+    """
+    Query parameters for full-text search. Results are ranked, so pages are
+    numbered rather than keyset-based.
+    """
+    q = serializers.CharField(max_length=200)
+    page = serializers.IntegerField(min_value=1, default=1)
+    page_size = serializers.IntegerField(min_value=1, max_value=SEARCH_MAX_PAGE_SIZE, default=SEARCH_PAGE_SIZE)
+
+
+class ProductStatsQuerySerializer(serializers.Serializer):
+    """
+    Query parameters for the product statistics endpoint. `start` and `end`
+    accept ISO dates or datetimes; a plain `end` date includes that whole day.
+    """
+    start = serializers.CharField(required=False)
+    end = serializers.CharField(required=False)
+    bucket = serializers.ChoiceField(choices=['hour', 'day', 'week'], default='day')
+
+    def _parse(self, value, end_of_day=False):
+        try:
+            day = parse_date(value)
+            parsed = None if day else parse_datetime(value)
+        except ValueError:
+            day = parsed = None
+        if day is not None:
+            parsed = datetime.combine(day, time.min) + (timedelta(days=1) if end_of_day else timedelta())
+        if parsed is None:
+            raise serializers.ValidationError("Use YYYY-MM-DD or an ISO 8601 datetime.")
+        if timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed)
+        return parsed
+
+    def validate_start(self, value):
+        return self._parse(value)
+
+    def validate_end(self, value):
+        return self._parse(value, end_of_day=True)
@@ -1,14 +1,50 @@
-from django.db.models.signals import post_save
+import logging
+
+from django.core.signals import request_started
+from django.db.models.signals import post_delete, post_migrate, post_save
 from django.dispatch import receiver
+from .cache import invalidate_product
+from .events import notifier
+from .metrics import METRICS_STATS_FLUSH_INTERVAL, flush_stats
 from .models import Product
-from .utils import extract_and_save
+from .jobs import enqueue_product
+from .search import ensure_search_triggers
 from django.conf import settings
 
+logger = logging.getLogger(__name__)
+
 @receiver(post_save, sender=Product)
 def handle_product_creation(sender, instance, created, **kwargs):
     if created:
-        # Trigger transcription task
-        
-        print(f"New Product created using Signals: {instance.call_sid}")
-    
-        extract_and_save(instance)
+        # Queue transcription and NER for the background workers
+        # (`manage.py run_workers`). The job row is written in the same
+        # transaction as the product, so the request only pays for the insert.
+        logger.debug(f"New Product created using Signals: {instance.call_sid}")
+
+        enqueue_product(instance)
+
+
+@receiver(post_save, sender=Product)
+def invalidate_product_payload(sender, instance, created, **kwargs):
+    # `save()` already bumped the version; the previous one is now stale
+    if not created:
+        invalidate_product(instance.pk, instance.version - 1)
+    # Wake status subscribers waiting in this process
+    notifier.notify()
+
+
+@receiver(post_delete, sender=Product)
+def drop_product_payload(sender, instance, **kwargs):
+    invalidate_product(instance.pk, instance.version)
+
+
+@receiver(post_migrate)
+def restore_search_triggers(sender, using, **kwargs):
+    if sender.name == 'core':
+        ensure_search_triggers(using)
+
+
+@receiver(request_started)
+def flush_request_stats(sender, **kwargs):
+    # API processes count product cache hits; save them every so often
+    flush_stats(METRICS_STATS_FLUSH_INTERVAL)
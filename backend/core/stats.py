@@ -0,0 +1,139 @@
+# core/stats.py
+
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db.models import Avg, Count, DurationField, ExpressionWrapper, F, Max, Min, Q
+from django.db.models.functions import TruncDay, TruncHour, TruncWeek
+
+from .extraction import PRICE_QUANTUM
+from .models import Product
+
+BUCKET_FUNCTIONS = {
+    'hour': TruncHour,
+    'day': TruncDay,
+    'week': TruncWeek,
+}
+
+LATENCY_PERCENTILES = (50, 90, 95, 99)
+
+
+def status_counts(queryset):
+    """
+    Returns total and per-status product counts in one aggregate query.
+    """
+    return queryset.aggregate(
+        total=Count('id'),
+        processed=Count('id', filter=Q(processed=True)),
+        pending_transcription=Count('id', filter=Q(pending_transcription=True)),
+        pending_ner=Count('id', filter=Q(pending_ner=True)),
+        failed=Count('id', filter=Q(state=Product.STATE_FAILED)),
+    )
+
+
+def creation_buckets(queryset, bucket='day'):
+    """
+    Returns the number of products created per hour/day/week.
+
+    Returns:
+        list of dict: [{"bucket": datetime, "count": int}, ...] in time order.
+    """
+    trunc = BUCKET_FUNCTIONS[bucket]
+    return list(
+        queryset.annotate(bucket=trunc('created_at'))
+        .values('bucket')
+        .annotate(count=Count('id'))
+        .order_by('bucket')
+    )
+
+
+def latency_percentiles(queryset, percentiles=LATENCY_PERCENTILES):
+    """
+    Returns processing latency (created_at -> processed_at) statistics in seconds.
+
+    Each percentile is read with one ORDER BY ... OFFSET query (nearest-rank),
+    so no rows are transferred to Python.
+
+    Returns:
+        dict: {"count", "avg", "p50", ...}; values are None when nothing has
+        been processed.
+    """
+    latency = ExpressionWrapper(F('processed_at') - F('created_at'), output_field=DurationField())
+    finished = queryset.filter(processed_at__isnull=False).annotate(latency=latency)
+
+    summary = finished.aggregate(count=Count('id'), avg=Avg('latency'))
+    count = summary['count']
+    result = {
+        'count': count,
+        'avg': summary['avg'].total_seconds() if summary['avg'] is not None else None,
+    }
+
+    ordered = finished.order_by('latency').values_list('latency', flat=True)
+    for p in percentiles:
+        if not count:
+            result[f'p{p}'] = None
+            continue
+        index = min(count - 1, max(0, -(-p * count // 100) - 1))
+        result[f'p{p}'] = ordered[index].total_seconds()
+    return result
+
+
+def _amount(value):
+    return str(Decimal(value).quantize(PRICE_QUANTUM, rounding=ROUND_HALF_UP))
+
+
+def price_stats(queryset):
+    """
+    Returns price statistics per currency over products with a parsed price,
+    in one grouped aggregate plus one indexed OFFSET query per currency for
+    the median.
+
+    Returns:
+        dict: {"NPR": {"count", "min", "max", "avg", "median"}, ...}; amounts
+        are strings so no precision is lost.
+    """
+    priced = queryset.filter(price_amount__isnull=False)
+    summaries = (
+        priced.values('price_currency')
+        .annotate(count=Count('id'), min=Min('price_amount'), max=Max('price_amount'), avg=Avg('price_amount'))
+        .order_by('price_currency')
+    )
+    result = {}
+    for summary in summaries:
+        currency, count = summary['price_currency'], summary['count']
+        ordered = priced.filter(price_currency=currency).order_by('price_amount').values_list('price_amount', flat=True)
+        result[currency] = {
+            'count': count,
+            'min': _amount(summary['min']),
+            'max': _amount(summary['max']),
+            'avg': _amount(summary['avg']),
+            'median': _amount(ordered[(count - 1) // 2]),
+        }
+    return result
+
+
+def product_stats(start=None, end=None, bucket='day'):
+    """
+    Computes the dashboard statistics for products created in [start, end).
+
+    Args:
+        start (datetime, optional): Inclusive lower bound on created_at.
+        end (datetime, optional): Exclusive upper bound on created_at.
+        bucket (str): 'hour', 'day' or 'week'.
+
+    Returns:
+        dict: Status counts, per-bucket creation counts, latency percentiles
+        and price statistics.
+    """
+    queryset = Product.objects.all()
+    if start is not None:
+        queryset = queryset.filter(created_at__gte=start)
+    if end is not None:
+        queryset = queryset.filter(created_at__lt=end)
+
+    return {
+        **status_counts(queryset),
+        'bucket': bucket,
+        'buckets': creation_buckets(queryset, bucket),
+        'latency_seconds': latency_percentiles(queryset),
+        'price': price_stats(queryset),
+    }
@@ -1,3 +1,1414 @@
-from django.test import TestCase
+import asyncio
+import json
+import shutil
+import tempfile
+import threading
+import time
+import wave
+from io import BytesIO, StringIO
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+import httpx
+import numpy as np
+import requests
+from asgiref.sync import async_to_sync
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Q
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .audio import AudioRejected, audio_stats, decode_wav, preprocess_audio, split_on_silence
+from . import clients, providers
+from .benchmark import MockAIServer, percentiles
+from .cache import cache_stats, ner_memory_cache, product_cache, purge_expired_ner_cache, transcript_memory_cache
+from .events import astream_events
+from .extraction import extract_fields, extraction_stats, normalize_numerals, parse_price
+from .hashing import hash_chunks
+from .jobs import claim_jobs, fail_job, recover_expired_jobs, run_job, run_jobs
+from .metrics import add_run_totals, flush_stats, purge_old_runs
+from .models import NERCache, Product, ProcessingJob, ProcessingRun, TranscriptCache, UploadSession
+from .pipeline import async_work_loop, run_pipeline
+from .search import SEARCH_TRIGGERS, ensure_search_triggers, search_filter, search_products
+from .stats import status_counts
+from .uploads import UploadConflict, _session_hashers, purge_expired_uploads, write_upload_chunk
+from .utils import (
+    extract_and_save, open_audio, perform_ner, perform_ner_batch, save_extraction, save_failed, save_transcription,
+    stitch_transcripts, transcribe_audio, transcribe_chunked, transcribe_with_cache,
+)
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def http_response(status_code=200, json_data=None, headers=None, chunks=()):
+    response = mock.MagicMock(status_code=status_code, headers=headers or {})
+    response.__enter__.return_value = response
+    response.json.return_value = json_data
+    response.iter_content.return_value = list(chunks)
+    return response
+
+
+def chat_response(content):
+    return http_response(json_data={'choices': [{'message': {'content': content}}]})
+
+
+TEST_AI_PROVIDERS = {
+    'openai': {'BACKEND': 'core.providers.OpenAIProvider', 'API_BASE': 'http://ai', 'API_KEY': 'test-key'},
+}
+
+
+def make_wav(segments, rate=44100, channels=2):
+    """
+    Builds 16-bit PCM WAV bytes from (seconds, amplitude) segments of a 440 Hz tone.
+    """
+    parts = []
+    for seconds, amplitude in segments:
+        t = np.arange(int(seconds * rate)) / rate
+        parts.append(amplitude * np.sin(2 * np.pi * 440 * t))
+    samples = np.concatenate(parts) if parts else np.zeros(0)
+    pcm = (np.repeat(samples[:, None], channels, axis=1) * 32767).astype('<i2')
+    buffer = BytesIO()
+    with wave.open(buffer, 'wb') as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(pcm.tobytes())
+    return buffer.getvalue()
+
+
+def make_audio(name='call.wav', content=b'RIFF....WAVE'):
+    return SimpleUploadedFile(name, content, content_type='audio/wav')
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class MediaTestCase(TestCase):
+    def setUp(self):
+        transcript_memory_cache.clear()
+        ner_memory_cache.clear()
+        product_cache().clear()
+        cache_stats.reset()
+        # Restarts the flush interval, so requests in the test do not flush counters
+        flush_stats()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+
+class ProcessingQueueTests(MediaTestCase):
+    def test_create_enqueues_instead_of_processing(self):
+        with mock.patch('core.jobs.extract_and_save') as extract:
+            response = self.client.post(reverse('product-create'), {'call_sid': 'CA1', 'audio_url': make_audio()})
+
+        self.assertEqual(response.status_code, 201)
+        extract.assert_not_called()
+        job = ProcessingJob.objects.get()
+        self.assertEqual(job.status, ProcessingJob.STATUS_QUEUED)
+        self.assertEqual(job.product.call_sid, 'CA1')
+
+    def test_claimed_job_is_not_claimed_twice(self):
+        Product.objects.create(call_sid='CA1', audio_url=make_audio())
+
+        first = claim_jobs(limit=5, owner='worker-a')
+        second = claim_jobs(limit=5, owner='worker-b')
+
+        self.assertEqual(len(first), 1)
+        self.assertEqual(second, [])
+        self.assertEqual(first[0].status, ProcessingJob.STATUS_RUNNING)
+        self.assertEqual(first[0].attempts, 1)
+
+    def test_expired_lease_is_reclaimed(self):
+        Product.objects.create(call_sid='CA1', audio_url=make_audio())
+        job = claim_jobs(owner='crashed')[0]
+        ProcessingJob.objects.filter(id=job.id).update(locked_until=timezone.now() - timedelta(seconds=1))
+
+        reclaimed = claim_jobs(owner='worker-b')
+
+        self.assertEqual([j.id for j in reclaimed], [job.id])
+        self.assertEqual(reclaimed[0].attempts, 2)
+
+    def test_expired_lease_on_last_attempt_fails_job(self):
+        Product.objects.create(call_sid='CA1', audio_url=make_audio())
+        job = claim_jobs(owner='crashed')[0]
+        ProcessingJob.objects.filter(id=job.id).update(
+            attempts=job.max_attempts, locked_until=timezone.now() - timedelta(seconds=1)
+        )
+
+        self.assertEqual(claim_jobs(owner='worker-b'), [])
+        self.assertEqual(recover_expired_jobs(), 1)
+        self.assertEqual(ProcessingJob.objects.get(id=job.id).status, ProcessingJob.STATUS_FAILED)
+
+    def test_async_worker_fails_jobs_that_expired_on_their_last_attempt(self):
+        product = Product.objects.create(call_sid='CA1', audio_url=make_audio())
+        job = claim_jobs(owner='crashed')[0]
+        ProcessingJob.objects.filter(id=job.id).update(
+            attempts=job.max_attempts, locked_until=timezone.now() - timedelta(seconds=1)
+        )
+
+        self.assertEqual(async_to_sync(async_work_loop)(threading.Event(), concurrency=2, once=True), 0)
+        self.assertEqual(ProcessingJob.objects.get(id=job.id).status, ProcessingJob.STATUS_FAILED)
+        product.refresh_from_db()
+        self.assertEqual(product.state, Product.STATE_FAILED)
+
+    def test_failed_attempt_is_requeued_with_backoff(self):
+        Product.objects.create(call_sid='CA1', audio_url=make_audio())
+        job = claim_jobs(owner='worker-a')[0]
+
+        fail_job(job, 'boom')
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, ProcessingJob.STATUS_QUEUED)
+        self.assertEqual(job.last_error, 'boom')
+        self.assertGreater(job.run_after, timezone.now())
+
+    def test_run_job_marks_done(self):
+        Product.objects.create(call_sid='CA1', audio_url=make_audio())
+        job = claim_jobs(owner='worker-a')[0]
+
+        with mock.patch('core.jobs.extract_and_save', return_value=True):
+            self.assertTrue(run_job(job))
+
+        self.assertEqual(ProcessingJob.objects.get(id=job.id).status, ProcessingJob.STATUS_DONE)
+
+
+class BulkUploadTests(MediaTestCase):
+    def test_creates_valid_items_in_bulk(self):
+        Product.objects.create(call_sid='CA0', audio_url=make_audio())
+        data = {
+            'call_sid': ['CA1', '', 'CA3'],
+            'audio_url': [make_audio('a.wav', b'one'), make_audio('b.wav', b'two'), make_audio('c.wav', b'three')],
+        }
+        # One transaction: sequence update + read, one product insert, one job insert
+        with self.assertNumQueries(6):
+            response = self.client.post(reverse('product-bulk-create'), data)
+
+        self.assertEqual(response.status_code, 207)
+        results = response.json()['results']
+        self.assertEqual([result['status'] for result in results], ['created', 'rejected', 'created'])
+
+        created = Product.objects.filter(pk__in=[results[0]['id'], results[2]['id']]).order_by('pk')
+        self.assertEqual([product.call_sid for product in created], ['CA1', 'CA3'])
+        self.assertEqual(created[1].audio_hash, hash_chunks([b'three']))
+        self.assertTrue(created[1].audio_url.storage.exists(created[1].audio_url.name))
+        self.assertEqual(len({product.change_seq for product in Product.objects.all()}), 3)
+        self.assertEqual(ProcessingJob.objects.filter(product__in=created).count(), 2)
+
+    def test_rejects_empty_batch(self):
+        self.assertEqual(self.client.post(reverse('product-bulk-create'), {}).status_code, 400)
+
+
+class ResumableUploadTests(MediaTestCase):
+    content = bytes(range(256)) * 40
+
+    def open_session(self):
+        response = self.client.post(
+            reverse('upload-create'), {'call_sid': 'CA1', 'filename': 'call.wav', 'size': len(self.content)},
+        )
+        self.assertEqual(response.status_code, 201)
+        return response.json()['id']
+
+    def put(self, session_id, start, end):
+        return self.client.put(
+            reverse('upload-detail', args=[session_id]), self.content[start:end + 1],
+            content_type='application/octet-stream',
+            HTTP_CONTENT_RANGE=f'bytes {start}-{end}/{len(self.content)}',
+        )
+
+    def test_resume_after_interruption(self):
+        session_id = self.open_session()
+        self.assertEqual(self.put(session_id, 0, 4095).json()['received'], 4096)
+
+        # A gap is refused with the offset to resume from
+        conflict = self.put(session_id, 8000, 9000)
+        self.assertEqual((conflict.status_code, conflict.json()['received']), (409, 4096))
+
+        # Another process picks up the upload; a retransmitted range is skipped
+        _session_hashers.clear()
+        self.assertEqual(self.put(session_id, 4000, len(self.content) - 1).json()['received'], len(self.content))
+        self.assertEqual(self.client.get(reverse('upload-detail', args=[session_id])).json()['status'], 'open')
+
+        response = self.client.post(reverse('upload-finalize', args=[session_id]))
+        self.assertEqual(response.status_code, 201)
+        product = Product.objects.get(pk=response.json()['id'])
+        self.assertEqual(product.audio_hash, hash_chunks([self.content]))
+        with product.audio_url.open('rb') as stored:
+            self.assertEqual(stored.read(), self.content)
+        self.assertTrue(ProcessingJob.objects.filter(product=product).exists())
+
+        # Finalizing again returns the same product
+        self.assertEqual(self.client.post(reverse('upload-finalize', args=[session_id])).json()['id'], product.pk)
+
+    def test_interrupted_chunk_does_not_corrupt_the_hash(self):
+        session_id = self.open_session()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.put(session_id, 0, 4095)
+
+        # The client disconnects after garbage bytes were written and hashed
+        stream = mock.Mock(read=mock.Mock(side_effect=[b'\xff' * 100, OSError('disconnected')]))
+        with self.assertRaises(OSError):
+            write_upload_chunk(session_id, 4096, 8191, stream)
+        self.assertEqual(UploadSession.objects.get(pk=session_id).received, 4096)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.put(session_id, 4096, len(self.content) - 1)
+        product_id = self.client.post(reverse('upload-finalize', args=[session_id])).json()['id']
+        self.assertEqual(Product.objects.get(pk=product_id).audio_hash, hash_chunks([self.content]))
+
+    def test_chunk_is_written_under_the_session_lock(self):
+        session_id = self.open_session()
+        locked = []
+
+        def read(size):
+            # SQLite has no row locks; the session update before streaming holds the write lock
+            locked.append(any(
+                query['sql'].startswith('UPDATE "core_uploadsession"') for query in queries.captured_queries
+            ))
+            return self.content[:size]
+
+        with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks(execute=True):
+            write_upload_chunk(session_id, 0, 99, mock.Mock(read=read))
+        self.assertEqual(locked, [True])
+        self.assertEqual(UploadSession.objects.get(pk=session_id).received, 100)
+
+    def test_storage_without_local_files_is_refused(self):
+        # Remote storages implement exists() but not path()
+        with mock.patch('django.core.files.storage.FileSystemStorage.exists', return_value=False), \
+                mock.patch('django.core.files.storage.FileSystemStorage.path', side_effect=NotImplementedError):
+            response = self.client.post(
+                reverse('upload-create'), {'call_sid': 'CA1', 'filename': 'call.wav', 'size': len(self.content)},
+            )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('local file storage', response.json()['detail'])
+        self.assertFalse(UploadSession.objects.exists())
+
+    def test_finalize_requires_every_byte(self):
+        session_id = self.open_session()
+        self.put(session_id, 0, 99)
+
+        response = self.client.post(reverse('upload-finalize', args=[session_id]))
+        self.assertEqual((response.status_code, response.json()['received']), (409, 100))
+
+    def test_expired_sessions_are_purged(self):
+        session_id = self.open_session()
+        session = UploadSession.objects.get(pk=session_id)
+        UploadSession.objects.filter(pk=session_id).update(expires_at=timezone.now())
+
+        self.assertEqual(purge_expired_uploads(), 1)
+        self.assertFalse(session.product or UploadSession.objects.filter(pk=session_id).exists())
+        self.assertFalse(Product._meta.get_field('audio_url').storage.exists(session.storage_name))
+        self.assertEqual(self.put(session_id, 0, 9).status_code, 404)
+
+
+class AudioStorageTests(MediaTestCase):
+    def test_open_audio_reads_from_storage(self):
+        product = Product.objects.create(call_sid='CA1', audio_url=make_audio(content=b'abc123'))
+
+        with mock.patch('core.clients.session.request') as request:
+            with open_audio(product.audio_url) as audio_file:
+                self.assertEqual(audio_file.read(), b'abc123')
+        request.assert_not_called()
+
+    @override_settings(MEDIA_ROOT=tempfile.gettempdir())
+    def test_open_audio_falls_back_to_http(self):
+        product = Product(call_sid='CA1', audio_url='audio/missing.wav')
+
+        with mock.patch('core.utils.BASE_MEDIA_URL', 'http://media/'), \
+                mock.patch('core.clients.session.request', return_value=http_response(chunks=[b'ab', b'c'])) as request:
+            audio_file = open_audio(product.audio_url)
+
+        self.assertEqual(request.call_args.args, ('GET', 'http://media/audio/missing.wav'))
+        self.assertEqual(audio_file.read(), b'abc')
+
+    def test_extract_and_save_streams_file_to_transcriber(self):
+        product = Product.objects.create(call_sid='CA1', audio_url=make_audio(content=b'abc123'))
+        ner = {'product_name': 'आलु', 'description': '', 'price': '50', 'location': 'काठमाडौं'}
+
+        def transcribe(audio_file, filename):
+            self.assertEqual(audio_file.read(), b'abc123')
+            self.assertEqual(filename, 'call.wav')
+            return 'आलु ५० रुपैयाँ'
+
+        with mock.patch('core.utils.transcribe_audio', side_effect=transcribe), \
+                mock.patch('core.utils.perform_ner', return_value=ner):
+            self.assertTrue(extract_and_save(product))
+
+        product.refresh_from_db()
+        self.assertEqual(product.extracted_product_name, 'आलु')
+        self.assertFalse(product.pending_transcription)
+
+
+class TranscriptCacheTests(MediaTestCase):
+    def test_upload_is_hashed_at_ingest(self):
+        self.client.post(reverse('product-create'), {'call_sid': 'CA1', 'audio_url': make_audio(content=b'same')})
+
+        self.assertEqual(Product.objects.get().audio_hash, hash_chunks([b'same']))
+
+    def test_identical_audio_is_transcribed_once(self):
+        first = Product.objects.create(call_sid='CA1', audio_url=make_audio(content=b'same'))
+        second = Product.objects.create(call_sid='CA2', audio_url=make_audio(content=b'same'))
+
+        with mock.patch('core.utils.transcribe_audio', return_value='नमस्ते') as transcribe:
+            with open_audio(first.audio_url) as audio_file:
+                self.assertEqual(transcribe_with_cache(first, audio_file), 'नमस्ते')
+            transcript_memory_cache.clear()
+            with open_audio(second.audio_url) as audio_file:
+                self.assertEqual(transcribe_with_cache(second, audio_file), 'नमस्ते')
+            with open_audio(second.audio_url) as audio_file:
+                self.assertEqual(transcribe_with_cache(second, audio_file), 'नमस्ते')
+
+        transcribe.assert_called_once()
+        self.assertEqual(TranscriptCache.objects.get().hits, 1)
+        self.assertEqual(cache_stats.snapshot(), {
+            'transcript_misses': 1, 'transcript_db_hits': 1, 'transcript_memory_hits': 1,
+        })
+
+    def test_legacy_rows_are_hashed_on_read(self):
+        product = Product.objects.create(call_sid='CA1', audio_url=make_audio(content=b'old'))
+        Product.objects.filter(pk=product.pk).update(audio_hash=None)
+        product.refresh_from_db()
+
+        with mock.patch('core.utils.transcribe_audio', return_value='पुरानो'):
+            with open_audio(product.audio_url) as audio_file:
+                transcribe_with_cache(product, audio_file)
+
+        product.refresh_from_db()
+        self.assertEqual(product.audio_hash, hash_chunks([b'old']))
+
+
+@override_settings(AI_PROVIDERS=TEST_AI_PROVIDERS, AI_CHAT_PROVIDERS=['openai'])
+class NERCacheTests(MediaTestCase):
+    NER_JSON = '{"product_name": "आलु", "description": "", "price": "५०", "location": "पोखरा"}'
+
+    def test_same_transcript_calls_model_once(self):
+        with mock.patch('core.clients.session.request', return_value=chat_response(self.NER_JSON)) as post:
+            first = perform_ner('आलु  पोखरा')
+            ner_memory_cache.clear()
+            second = perform_ner(' आलु पोखरा ')
+
+        post.assert_called_once()
+        self.assertEqual(first, second)
+        self.assertEqual(cache_stats.snapshot(), {'ner_misses': 1, 'ner_db_hits': 1})
+
+    def test_prompt_version_change_misses(self):
+        with mock.patch('core.clients.session.request', return_value=chat_response(self.NER_JSON)) as post:
+            perform_ner('आलु')
+            with mock.patch('core.utils.NER_PROMPT_VERSION', 'v-next'):
+                perform_ner('आलु')
+
+        self.assertEqual(post.call_count, 2)
+
+    def test_failures_are_not_cached(self):
+        with mock.patch('core.clients.session.request', return_value=chat_response('not json')):
+            self.assertEqual(perform_ner('नमस्ते')['product_name'], '')
+
+        self.assertFalse(NERCache.objects.exists())
+
+    def test_expired_entries_are_ignored_and_purged(self):
+        with mock.patch('core.clients.session.request', return_value=chat_response(self.NER_JSON)):
+            perform_ner('आलु')
+        NERCache.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        ner_memory_cache.clear()
+
+        with mock.patch('core.clients.session.request', return_value=chat_response(self.NER_JSON)) as post:
+            perform_ner('आलु')
+        post.assert_called_once()
+
+        NERCache.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(purge_expired_ner_cache(), 1)
+
+
+@override_settings(AI_PROVIDERS=TEST_AI_PROVIDERS, AI_CHAT_PROVIDERS=['openai'])
+class FastPathNERTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        extraction_stats.reset()
+
+    def test_numerals_are_normalized(self):
+        self.assertEqual(normalize_numerals('१,५०० रुपैयाँ'), '1500 रुपैयाँ')
+        self.assertEqual(normalize_numerals('दुई हजार पाँच सय रुपैयाँ'), '2500 रुपैयाँ')
+        self.assertEqual(normalize_numerals('1,00,000 र डेढ लाख'), '100000 र 150000')
+        self.assertEqual(normalize_numerals('छ सय रुपैयाँ'), '600 रुपैयाँ')
+        self.assertEqual(normalize_numerals('two thousand rupees'), '2000 rupees')
+        self.assertEqual(normalize_numerals('आलु छ 50 रुपैयाँ'), 'आलु छ 50 रुपैयाँ')
+
+    def test_multiplier_after_an_unknown_number_is_left_to_the_model(self):
+        self.assertEqual(normalize_numerals('सोह्र सय रुपैयाँ'), 'सोह्र सय रुपैयाँ')
+        self.assertEqual(extract_fields('सोह्र सय रुपैयाँ').confidence['price'], 0.0)
+        self.assertLess(extract_fields('रु 100 सोह्र सय').confidence['price'], 0.8)
+
+    def test_spoken_prices_are_read_in_full(self):
+        self.assertEqual(extract_fields('छ सय रुपैयाँ').fields['price'], 'रु 600')
+        self.assertEqual(extract_fields('two thousand rupees').fields['price'], 'रु 2000')
+
+    def test_formulaic_call_is_extracted_with_confidence(self):
+        extraction = extract_fields('मेरो १० किलो ताजा आलु छ, किलोको ५० रुपैयाँ, चितवनबाट')
+
+        self.assertEqual(extraction.fields, {
+            'product_name': 'आलु', 'description': '10 किलो ताजा आलु', 'price': 'रु 50 प्रति किलो', 'location': 'चितवन',
+        })
+        self.assertTrue(all(score >= 0.8 for score in extraction.confidence.values()))
+
+    def test_ambiguous_fields_score_low(self):
+        extraction = extract_fields('आलु ५० रुपैयाँ वा ६० रुपैयाँ')
+
+        self.assertEqual(extraction.confidence['location'], 0.0)
+        self.assertLess(extraction.confidence['price'], 0.8)
+
+    def test_confident_call_skips_the_model(self):
+        with mock.patch('core.clients.session.request') as post:
+            ner_data = perform_ner('Rs. 1,500 per kg organic honey from Ilam')
+
+        post.assert_not_called()
+        self.assertEqual((ner_data['product_name'], ner_data['location']), ('मह', 'इलाम'))
+        self.assertEqual(extraction_stats.snapshot()['fast_path_complete'], 1)
+        self.assertIn('ringsewa_component_events_total{component="extraction",event="fast_path_complete"} 1',
+                      self.client.get('/metrics').content.decode())
+
+    def test_model_only_fills_uncertain_fields(self):
+        content = '{"product_name": "potato", "description": "fresh", "price": "50", "location": "Pokhara"}'
+        with mock.patch('core.clients.session.request', return_value=chat_response(content)) as post:
+            ner_data = perform_ner('मेरो ३ किलो आलु बेच्नु छ')
+
+        post.assert_called_once()
+        self.assertEqual(ner_data, {
+            'product_name': 'आलु', 'description': '3 किलो आलु', 'price': '50', 'location': 'Pokhara',
+        })
+        self.assertEqual(extraction_stats.snapshot()['fast_path_partial'], 1)
+
+
+@override_settings(AI_PROVIDERS=TEST_AI_PROVIDERS, AI_CHAT_PROVIDERS=['openai'])
+class BatchNERTests(MediaTestCase):
+    def test_batch_packs_transcripts_into_one_request(self):
+        content = json.dumps([
+            {'id': '2', 'product_name': 'प्याज', 'description': '', 'price': '', 'location': ''},
+            {'id': '1', 'product_name': 'आलु', 'description': '', 'price': '', 'location': ''},
+        ], ensure_ascii=False)
+        with mock.patch('core.clients.session.request', return_value=chat_response(content)) as post:
+            results = perform_ner_batch(['आलु', 'प्याज'])
+
+        post.assert_called_once()
+        self.assertEqual([r['product_name'] for r in results], ['आलु', 'प्याज'])
+
+    def test_missing_items_fall_back_to_single_requests(self):
+        batch = '```json\n[{"id": "1", "product_name": "आलु"}, {"id": "x"}]\n```'
+        with mock.patch('core.clients.session.request', side_effect=[
+            chat_response(batch),
+            chat_response('{"product_name": "प्याज"}'),
+        ]) as post:
+            results = perform_ner_batch(['आलु', 'प्याज'])
+
+        self.assertEqual(post.call_count, 2)
+        self.assertEqual([r['product_name'] for r in results], ['आलु', 'प्याज'])
+
+    def test_cached_items_are_not_resent(self):
+        with mock.patch('core.clients.session.request', return_value=chat_response('{"product_name": "आलु"}')):
+            perform_ner('आलु')
+        with mock.patch('core.clients.session.request', return_value=chat_response('{"product_name": "प्याज"}')) as post:
+            results = perform_ner_batch(['आलु', 'प्याज'])
+
+        post.assert_called_once()
+        self.assertEqual([r['product_name'] for r in results], ['आलु', 'प्याज'])
+
+    def test_worker_runs_claimed_jobs_as_batch(self):
+        for sid in ('CA1', 'CA2'):
+            Product.objects.create(call_sid=sid, audio_url=make_audio(content=sid.encode()))
+        jobs = claim_jobs(limit=2, owner='worker-a')
+
+        with mock.patch('core.utils.transcribe_with_cache', side_effect=['आलु', '']), \
+                mock.patch('core.utils.perform_ner_batch', return_value=[{'product_name': 'आलु'}]) as batch:
+            self.assertEqual(run_jobs(jobs), 1)
+
+        batch.assert_called_once_with(['आलु'], strict=True)
+        statuses = dict(ProcessingJob.objects.values_list('product__call_sid', 'status'))
+        self.assertEqual(statuses, {'CA1': ProcessingJob.STATUS_DONE, 'CA2': ProcessingJob.STATUS_QUEUED})
+
+
+class AudioPreprocessingTests(MediaTestCase):
+    def test_truncated_wav_drops_the_partial_frame(self):
+        raw = make_wav([(0.1, 0.5)], rate=8000)
+        # Cut one byte off the last stereo 16-bit frame
+        samples, rate = decode_wav(BytesIO(raw[:-1]))
+
+        self.assertEqual((samples.shape, rate), ((799, 2), 8000))
+
+    def test_wav_is_downmixed_resampled_and_trimmed(self):
+        raw = make_wav([(1.0, 0.0), (2.0, 0.5), (1.0, 0.0)])
+        audio_stats.reset()
+
+        result = preprocess_audio(BytesIO(raw), 'call.WAV')
+
+        samples, rate = decode_wav(result.file)
+        self.assertEqual((samples.shape[1], rate), (1, 16000))
+        self.assertAlmostEqual(result.seconds_in, 4.0, places=2)
+        self.assertAlmostEqual(result.seconds_out, 2.4, delta=0.05)
+        self.assertLess(result.bytes_out, len(raw) / 8)
+        self.assertEqual(result.filename, 'call.wav')
+        body = self.client.get('/metrics').content.decode()
+        self.assertIn('ringsewa_component_events_total{component="audio",event="processed"} 1', body)
+        self.assertIn(f'ringsewa_component_events_total{{component="audio",event="bytes_saved"}} {len(raw) - result.bytes_out}', body)
+
+    def test_silent_and_short_audio_is_rejected(self):
+        with self.assertRaises(AudioRejected):
+            preprocess_audio(BytesIO(make_wav([(3.0, 0.0)])), 'silent.wav')
+        with self.assertRaises(AudioRejected):
+            preprocess_audio(BytesIO(make_wav([(0.3, 0.5)])), 'short.wav')
+
+    def test_non_wav_is_passed_through(self):
+        self.assertIsNone(preprocess_audio(BytesIO(b'ID3 not a wav'), 'call.mp3'))
+
+    def test_rejected_audio_skips_api_and_closes_product(self):
+        product = Product.objects.create(call_sid='CA1', audio_url=make_audio(content=make_wav([(2.0, 0.0)])))
+
+        with mock.patch('core.utils.transcribe_audio') as transcribe:
+            self.assertTrue(extract_and_save(product))
+
+        transcribe.assert_not_called()
+        product.refresh_from_db()
+        self.assertFalse(product.pending_transcription)
+
+
+class ChunkedTranscriptionTests(TestCase):
+    def test_split_cuts_at_silence_with_overlap(self):
+        rate = 1000
+        t = np.arange(10 * rate) / rate
+        samples = (0.5 * np.sin(2 * np.pi * 50 * t)).astype(np.float32)
+        samples[int(3.5 * rate):int(3.7 * rate)] = 0  # pause inside the search window
+
+        bounds = split_on_silence(samples, rate, chunk_seconds=4, overlap_seconds=0.5, search_seconds=1)
+
+        self.assertEqual(bounds[0][0], 0)
+        self.assertTrue(3.5 * rate <= bounds[0][1] < 3.7 * rate)
+        self.assertEqual(bounds[1][0], bounds[0][1] - 500)
+        self.assertEqual(bounds[-1][1], samples.size)
+
+    def test_stitch_removes_overlap_text(self):
+        self.assertEqual(
+            stitch_transcripts(['आलु पचास रुपैयाँ किलो', 'रुपैयाँ किलो पोखरामा', 'पोखरामा पाइन्छ']),
+            'आलु पचास रुपैयाँ किलो पोखरामा पाइन्छ',
+        )
+
+    def test_chunks_are_transcribed_in_order_and_retried_individually(self):
+        rate = 1000
+        samples = np.full(10 * rate, 0.5, dtype=np.float32)
+        calls = []
+
+        def transcribe(audio_file, filename):
+            calls.append(filename)
+            if filename == 'call.part1.wav' and calls.count(filename) == 1:
+                return ""
+            return filename.split('.')[1]
+
+        with mock.patch('core.audio.TRANSCRIBE_CHUNK_SECONDS', 4), \
+                mock.patch('core.audio.TRANSCRIBE_CHUNK_OVERLAP', 0), \
+                mock.patch('core.utils.transcribe_audio', side_effect=transcribe):
+            transcript = transcribe_chunked(samples, rate, 'call.wav')
+
+        self.assertEqual(transcript, 'part0 part1 part2')
+        self.assertEqual(calls.count('call.part1.wav'), 2)
+        self.assertEqual(calls.count('call.part0.wav'), 1)
+
+
+@mock.patch('core.clients.time.monotonic', return_value=1000.0)
+@mock.patch('core.clients.backoff_wait', return_value=0)
+class HTTPClientTests(TestCase):
+    def setUp(self):
+        clients._breakers.clear()
+
+    def test_retries_server_errors_then_succeeds(self, wait, monotonic):
+        responses = [http_response(503), http_response(429, headers={'Retry-After': '2'}), http_response(200)]
+        with mock.patch('core.clients.session.request', side_effect=responses) as request:
+            response = clients.post('chat', 'http://ai/chat')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(request.call_count, 3)
+        self.assertEqual(request.call_args.kwargs['timeout'], clients.HTTP_TIMEOUTS['chat'])
+
+    def test_client_errors_are_not_retried(self, wait, monotonic):
+        response = http_response(400)
+        response.raise_for_status.side_effect = requests.HTTPError('400')
+        with mock.patch('core.clients.session.request', return_value=response) as request:
+            with self.assertRaises(requests.HTTPError):
+                clients.post('chat', 'http://ai/chat')
+        request.assert_called_once()
+
+    def test_rewind_runs_before_each_retry(self, wait, monotonic):
+        rewind = mock.Mock()
+        with mock.patch('core.clients.session.request', side_effect=[requests.ConnectionError(), http_response()]):
+            clients.post('transcription', 'http://ai/audio', rewind=rewind)
+        rewind.assert_called_once_with()
+
+    def test_circuit_opens_and_fails_fast(self, wait, monotonic):
+        with mock.patch('core.clients.session.request', return_value=http_response(500)) as request:
+            for _ in range(2):
+                with self.assertRaises(requests.RequestException):
+                    clients.post('chat', 'http://ai/chat', max_attempts=3)
+            self.assertEqual(request.call_count, clients.CIRCUIT_BREAKER_THRESHOLD)
+
+            with self.assertRaises(clients.CircuitOpenError):
+                clients.post('chat', 'http://ai/chat')
+
+        monotonic.return_value += clients.CIRCUIT_BREAKER_RESET
+        with mock.patch('core.clients.session.request', return_value=http_response()):
+            clients.post('chat', 'http://ai/chat')
+        self.assertEqual(clients.get_breaker('chat').state, 'closed')
+
+    def test_async_request_shares_the_breaker_and_releases_its_trial(self, wait, monotonic):
+        breaker = clients.get_breaker('chat')
+
+        async def send(handler):
+            async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+                return await clients.arequest(client, 'chat', 'POST', 'http://ai/chat')
+
+        def cancelled(request):
+            raise asyncio.CancelledError()
+
+        for _ in range(clients.CIRCUIT_BREAKER_THRESHOLD):
+            breaker.record_failure()
+        monotonic.return_value += clients.CIRCUIT_BREAKER_RESET
+        # A 4xx means the server answered, so the trial closes the circuit
+        with self.assertRaises(httpx.HTTPStatusError):
+            async_to_sync(send)(lambda request: httpx.Response(400))
+        self.assertEqual(breaker.state, 'closed')
+
+        for _ in range(clients.CIRCUIT_BREAKER_THRESHOLD):
+            breaker.record_failure()
+        monotonic.return_value += clients.CIRCUIT_BREAKER_RESET
+        with self.assertRaises(asyncio.CancelledError):
+            async_to_sync(send)(cancelled)
+        self.assertEqual(async_to_sync(send)(lambda request: httpx.Response(200)).status_code, 200)
+        self.assertEqual(breaker.state, 'closed')
+
+    def test_half_open_trial_is_released_on_any_error(self, wait, monotonic):
+        breaker = clients.get_breaker('chat')
+        for _ in range(clients.CIRCUIT_BREAKER_THRESHOLD):
+            breaker.record_failure()
+        monotonic.return_value += clients.CIRCUIT_BREAKER_RESET
+
+        # Not retryable, but still a failed trial: the circuit re-opens
+        with mock.patch('core.clients.session.request', side_effect=requests.exceptions.ChunkedEncodingError()):
+            with self.assertRaises(requests.exceptions.ChunkedEncodingError):
+                clients.post('chat', 'http://ai/chat')
+        self.assertEqual(breaker.state, 'open')
+
+        monotonic.return_value += clients.CIRCUIT_BREAKER_RESET
+        with mock.patch('core.clients.session.request', side_effect=RuntimeError('interrupted')):
+            with self.assertRaises(RuntimeError):
+                clients.post('chat', 'http://ai/chat')
+        with mock.patch('core.clients.session.request', return_value=http_response()):
+            clients.post('chat', 'http://ai/chat')
+        self.assertEqual(breaker.state, 'closed')
+
+
+class BackoffTests(TestCase):
+    def test_retry_after_header_overrides_jittered_backoff(self):
+        state = mock.Mock(attempt_number=3)
+        state.outcome.exception.return_value = clients.RetryableHTTPError(retry_after=clients.parse_retry_after('3'))
+        self.assertEqual(clients.backoff_wait(state), 3.0)
+
+        state.outcome.exception.return_value = requests.ConnectionError()
+        self.assertLessEqual(clients.backoff_wait(state), clients.HTTP_BACKOFF_BASE * 4)
+
+
+class ProviderTests(TestCase):
+    def setUp(self):
+        providers.reset_providers()
+
+    def fake(self, name, **options):
+        return providers.FakeProvider(name, {'TRANSCRIPT': name, 'CHAT_RESPONSE': name, **options})
+
+    def test_fake_backend_is_configurable(self):
+        with self.settings(AI_PROVIDERS={'fake': {'BACKEND': 'core.providers.FakeProvider', 'TRANSCRIPT': 'नमस्ते'}},
+                           AI_TRANSCRIPTION_PROVIDERS=['fake']):
+            self.assertEqual(providers.transcribe(b'RIFF', 'call.wav', 'ne'), 'नमस्ते')
+
+    @override_settings(AI_PROVIDERS=TEST_AI_PROVIDERS, AI_TRANSCRIPTION_PROVIDERS=['openai'])
+    def test_upload_is_streamed_from_the_file(self):
+        audio = BytesIO(b'RIFF' + bytes(range(256)) * 1024)
+        audio.seek(4)
+        reads, read = [], audio.read
+        audio.read = lambda size=-1: reads.append(size) or read(size)
+        sent = []
+
+        def send(method, url, **kwargs):
+            body = kwargs['data']
+            sent.append((kwargs['headers']['Content-Type'], len(body), b''.join(body), b''.join(body)))
+            return http_response(json_data={'text': 'नमस्ते'})
+
+        with mock.patch('core.clients.session.request', side_effect=send):
+            self.assertEqual(transcribe_audio(audio, 'call.wav'), 'नमस्ते')
+
+        content_type, length, first, second = sent[0]
+        self.assertEqual(first, second)
+        self.assertEqual(len(first), length)
+        self.assertIn(bytes(range(256)) * 1024, first)
+        self.assertNotIn(b'RIFF', first)
+        self.assertIn(b'name="model"', first)
+        self.assertTrue(first.endswith(f"--{content_type.split('boundary=')[1]}--\r\n".encode()))
+        self.assertTrue(reads and all(0 < size <= clients.UPLOAD_CHUNK_SIZE for size in reads))
+
+    def test_concurrent_reads_of_one_upload_do_not_interleave(self):
+        source = clients.UploadSource(BytesIO(bytes(range(256)) * 1024))
+        first, second = source.chunks(chunk_size=1000), source.chunks(chunk_size=1000)
+        head = next(first)
+
+        self.assertEqual(b''.join(second), bytes(range(256)) * 1024)
+        self.assertEqual(head + b''.join(first), bytes(range(256)) * 1024)
+
+    @mock.patch('core.providers.AI_HEDGE_DEFAULT_DELAY', 0.05)
+    def test_slow_primary_is_hedged_and_faster_backend_wins(self):
+        slow, fast = self.fake('slow', LATENCY=0.5), self.fake('fast')
+        providers.provider_stats.reset()
+
+        self.assertEqual(providers.hedged('chat', lambda p: p.chat([], 0), providers=[slow, fast]), 'fast')
+        self.assertEqual(providers.provider_stats.snapshot()['hedges'], 1)
+        self.assertIn('ringsewa_component_events_total{component="providers",event="hedges"} 1',
+                      self.client.get('/metrics').content.decode())
+
+    @mock.patch('core.providers.AI_HEDGE_DEFAULT_DELAY', 0.05)
+    def test_async_hedge(self):
+        slow, fast = self.fake('slow', LATENCY=0.5), self.fake('fast')
+        providers.provider_stats.reset()
+
+        result = async_to_sync(providers.ahedged)('chat', lambda p: p.achat(None, [], 0), providers=[slow, fast])
+        self.assertEqual(result, 'fast')
+        self.assertEqual(providers.provider_stats.snapshot()['hedges'], 1)
+
+    def test_hedge_waits_for_observed_p95(self):
+        primary = self.fake('primary')
+        tracker = providers.latency_tracker(primary, 'chat')
+        for seconds in [1.0] * 19 + [3.0]:
+            tracker.record(seconds)
+        self.assertEqual(providers.hedge_delay(primary, 'chat'), 1.0)
+        tracker.record(3.0)
+        self.assertEqual(providers.hedge_delay(primary, 'chat'), 3.0)
+
+    def test_failure_falls_over_to_next_backend(self):
+        broken, backup = self.fake('broken', FAILURE_RATE=1), self.fake('backup')
+        self.assertEqual(providers.hedged('chat', lambda p: p.chat([], 0), providers=[broken, backup]), 'backup')
+
+        with self.assertRaises(providers.ProviderError):
+            providers.hedged('chat', lambda p: p.chat([], 0), providers=[broken])
+
+
+def fake_ai_request(method, url, **kwargs):
+    if url.endswith('/audio/transcriptions'):
+        return http_response(json_data={'text': 'आलु बेच्नु छ'})
+    return http_response(json_data={
+        'choices': [{'message': {'content': '{"product_name": "आलु"}'}}],
+        'usage': {'prompt_tokens': 120, 'completion_tokens': 30},
+    })
+
+
+@override_settings(AI_PROVIDERS=TEST_AI_PROVIDERS, AI_TRANSCRIPTION_PROVIDERS=['openai'], AI_CHAT_PROVIDERS=['openai'])
+class ProcessingRunTests(MediaTestCase):
+    def test_run_records_stage_timings_bytes_and_tokens(self):
+        content = make_wav([(0.5, 0.0), (2.0, 0.5), (0.5, 0.0)])
+        Product.objects.create(call_sid='CA1', audio_url=make_audio(content=content))
+        job = claim_jobs(owner='worker-a')[0]
+
+        with mock.patch('core.clients.session.request', side_effect=fake_ai_request):
+            self.assertTrue(run_job(job))
+
+        run = ProcessingRun.objects.get()
+        self.assertEqual((run.outcome, run.job_id, run.worker), (ProcessingRun.OUTCOME_SUCCESS, job.id, 'worker-a'))
+        self.assertEqual(run.bytes_in, len(content))
+        self.assertGreater(run.bytes_out, 0)
+        self.assertEqual((run.prompt_tokens, run.completion_tokens), (120, 30))
+        for stage in ProcessingRun.STAGES:
+            self.assertGreater(getattr(run, f"{stage}_seconds"), 0, stage)
+
+    def test_run_that_raises_is_recorded_as_error(self):
+        Product.objects.create(call_sid='CA1', audio_url=make_audio())
+        job = claim_jobs(owner='worker-a')[0]
+
+        with mock.patch('core.jobs.extract_and_save', side_effect=RuntimeError('boom')):
+            self.assertFalse(run_job(job))
+
+        run = ProcessingRun.objects.get()
+        self.assertEqual((run.outcome, run.error), (ProcessingRun.OUTCOME_ERROR, 'boom'))
+        self.assertIn('ringsewa_processing_runs_total{outcome="error"} 1', self.client.get('/metrics').content.decode())
+
+    def test_metrics_endpoint_exposes_histograms_and_queue(self):
+        product = Product.objects.create(call_sid='CA1', audio_url=make_audio())
+        add_run_totals(ProcessingRun.objects.create(
+            product=product, outcome=ProcessingRun.OUTCOME_SUCCESS, started_at=timezone.now(),
+            duration=3.0, transcribe_seconds=2.0, ner_seconds=0.75, prompt_tokens=100,
+        ))
+
+        response = self.client.get('/metrics')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        body = response.content.decode()
+        self.assertIn('ringsewa_processing_stage_seconds_bucket{stage="transcribe",le="1"} 0', body)
+        self.assertIn('ringsewa_processing_stage_seconds_bucket{stage="transcribe",le="2.5"} 1', body)
+        self.assertIn('ringsewa_processing_stage_seconds_count{stage="read"} 0', body)
+        self.assertIn('ringsewa_processing_runs_total{outcome="success"} 1', body)
+        self.assertIn('ringsewa_ai_tokens_total{type="prompt"} 100', body)
+        self.assertIn('ringsewa_queue_depth 1', body)
+
+    def test_metrics_endpoint_exports_component_counters(self):
+        cache_stats.incr('transcript_db_hits', 2)
+        series = 'ringsewa_component_events_total{component="cache",event="transcript_db_hits"}'
+
+        self.assertIn(f'{series} 2', self.client.get('/metrics').content.decode())
+        # Flushed counts are added once, and kept after the process forgets them
+        cache_stats.reset()
+        self.assertIn(f'{series} 2', self.client.get('/metrics').content.decode())
+
+
+    def test_old_runs_are_purged(self):
+        product = Product.objects.create(call_sid='CA1', audio_url=make_audio())
+        now = timezone.now()
+        for age in (timedelta(days=8), timedelta(days=1)):
+            add_run_totals(ProcessingRun.objects.create(
+                product=product, outcome=ProcessingRun.OUTCOME_SUCCESS, started_at=now - age, duration=1.0,
+            ))
+
+        self.assertEqual(purge_old_runs(retention=7 * 24 * 60 * 60), 1)
+        self.assertEqual(ProcessingRun.objects.get().started_at, now - timedelta(days=1))
+        # Counters keep the purged run
+        body = self.client.get('/metrics').content.decode()
+        self.assertIn('ringsewa_processing_runs_total{outcome="success"} 2', body)
+        self.assertIn('ringsewa_processing_duration_seconds_count 2', body)
+
+
+class ProcessingStateTests(MediaTestCase):
+    def test_retry_after_ner_failure_resumes_at_ner(self):
+        product = Product.objects.create(call_sid='CA1', audio_url=make_audio())
+        job = claim_jobs(owner='worker-a')[0]
+
+        with mock.patch('core.utils.transcribe_product', return_value='आलु बेच्नु छ'), \
+                mock.patch('core.utils.perform_ner', return_value=None):
+            self.assertFalse(run_job(job))
+
+        product.refresh_from_db()
+        self.assertEqual(product.state, Product.STATE_TRANSCRIBED)
+        self.assertEqual((product.transcription_attempts, product.ner_attempts), (1, 1))
+        self.assertEqual(product.ner_error, 'NER failed')
+        self.assertFalse(product.processed)
+
+        ProcessingJob.objects.filter(id=job.id).update(run_after=timezone.now())
+        job = claim_jobs(owner='worker-b')[0]
+        with mock.patch('core.utils.transcribe_product') as transcribe, \
+                mock.patch('core.utils.perform_ner', return_value={'product_name': 'आलु'}):
+            self.assertTrue(run_job(job))
+
+        transcribe.assert_not_called()
+        product.refresh_from_db()
+        self.assertEqual(product.state, Product.STATE_PROCESSED)
+        self.assertEqual((product.transcription_attempts, product.ner_attempts), (1, 2))
+        self.assertIsNone(product.ner_error)
+        self.assertTrue(product.processed)
+        self.assertEqual(product.extracted_product_name, 'आलु')
+
+    def test_product_fails_when_job_runs_out_of_attempts(self):
+        product = Product.objects.create(call_sid='CA1', audio_url=make_audio())
+        job = claim_jobs(owner='worker-a')[0]
+        job.attempts = job.max_attempts
+
+        with mock.patch('core.utils.transcribe_product', return_value=''):
+            self.assertFalse(run_job(job))
+
+        product.refresh_from_db()
+        self.assertEqual(product.state, Product.STATE_FAILED)
+        self.assertEqual(product.transcription_attempts, 1)
+        self.assertEqual(product.transcription_error, 'Transcription failed')
+        self.assertIsNotNone(product.failed_at)
+        self.assertEqual((product.pending_transcription, product.pending_ner, product.processed), (False, False, False))
+
+
+class BenchmarkTests(TestCase):
+    def test_mock_server_answers_like_the_ai_api(self):
+        with MockAIServer(transcription_latency=0, chat_latency=0) as server, self.settings(
+            AI_PROVIDERS={'mock': {'BACKEND': 'core.providers.OpenAICompatibleProvider', 'API_BASE': server.api_base}},
+            AI_TRANSCRIPTION_PROVIDERS=['mock'], AI_CHAT_PROVIDERS=['mock'],
+        ):
+            first = providers.transcribe(b'RIFF', 'a.wav', 'ne')
+            second = providers.transcribe(b'RIFF', 'b.wav', 'ne')
+            results = perform_ner_batch([first, second])
+
+        self.assertNotEqual(first, second)
+        self.assertEqual([result['product_name'] for result in results], ['आलु', 'आलु'])
+        self.assertEqual(server.requests, {'transcription': 2, 'chat': 1, 'errors': 0})
+
+    def test_percentiles_use_nearest_rank(self):
+        self.assertEqual(percentiles(range(1, 101), points=(50, 99)), {'p50': 50, 'p99': 99})
+        self.assertEqual(percentiles([]), {})
+
+
+def fake_async_client(transcripts, ner_content='{"product_name": "आलु"}'):
+    """
+    An httpx.AsyncClient answering like the AI API; uploads are matched to a
+    transcript by their bytes. Requests are kept in `client.requests`.
+    """
+    sent = []
+
+    def handle(request):
+        sent.append(request)
+        if request.url.path.endswith('/audio/transcriptions'):
+            text = next((text for audio, text in transcripts.items() if audio in request.content), '')
+            return httpx.Response(200, json={'text': text})
+        return httpx.Response(200, json={'choices': [{'message': {'content': ner_content}}]})
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handle))
+    client.requests = sent
+    return client
+
+
+def sent_to(client, path):
+    return [request for request in client.requests if request.url.path.endswith(path)]
+
+
+@override_settings(AI_PROVIDERS=TEST_AI_PROVIDERS, AI_TRANSCRIPTION_PROVIDERS=['openai'], AI_CHAT_PROVIDERS=['openai'])
+class AsyncPipelineTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        clients._breakers.clear()
+
+    def test_processes_products_concurrently(self):
+        products = [
+            Product.objects.create(call_sid=f'CA{i}', audio_url=make_audio(content=f'audio-{i}'.encode()))
+            for i in range(3)
+        ]
+        client = fake_async_client({f'audio-{i}'.encode(): f'आलु {i}' for i in range(3)})
+
+        with mock.patch('core.pipeline.build_async_client', return_value=client):
+            outcomes = run_pipeline(products, concurrency=2)
+
+        self.assertEqual(outcomes, {p.id: True for p in products})
+        self.assertEqual(len(sent_to(client, '/audio/transcriptions')), 3)
+        for product in Product.objects.all():
+            self.assertFalse(product.pending_transcription)
+            self.assertEqual(product.extracted_product_name, 'आलु')
+
+    def test_empty_transcript_leaves_product_pending(self):
+        product = Product.objects.create(call_sid='CA1', audio_url=make_audio(content=b'x'))
+        client = fake_async_client({b'x': ''})
+
+        with mock.patch('core.pipeline.build_async_client', return_value=client):
+            self.assertEqual(run_pipeline([product]), {product.id: False})
+
+        self.assertEqual(sent_to(client, '/chat/completions'), [])
+        product.refresh_from_db()
+        self.assertTrue(product.pending_transcription)
+
+    @mock.patch('core.clients.backoff_wait', return_value=0)
+    def test_falls_back_to_the_next_configured_backend(self, wait):
+        product = Product.objects.create(call_sid='CA1', audio_url=make_audio(content=b'audio'))
+        local = {'BACKEND': 'core.providers.OpenAICompatibleProvider', 'API_BASE': 'http://local'}
+
+        def handle(request):
+            if request.url.host == 'ai':
+                return httpx.Response(503)
+            if request.url.path.endswith('/audio/transcriptions'):
+                return httpx.Response(200, json={'text': 'आलु'})
+            return httpx.Response(200, json={'choices': [{'message': {'content': '{"product_name": "आलु"}'}}]})
+
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handle))
+        with self.settings(AI_PROVIDERS={**TEST_AI_PROVIDERS, 'local': local},
+                           AI_TRANSCRIPTION_PROVIDERS=['openai', 'local'], AI_CHAT_PROVIDERS=['openai', 'local']), \
+                mock.patch('core.pipeline.build_async_client', return_value=client):
+            self.assertEqual(run_pipeline([product]), {product.id: True})
+
+        product.refresh_from_db()
+        self.assertEqual(product.extracted_product_name, 'आलु')
+
+    def test_no_backend_configured(self):
+        product = Product.objects.create(call_sid='CA1', audio_url=make_audio(content=b'x'))
+        client = fake_async_client({b'x': 'आलु'})
+
+        with self.settings(AI_TRANSCRIPTION_PROVIDERS=[]), \
+                mock.patch('core.pipeline.build_async_client', return_value=client):
+            self.assertEqual(run_pipeline([product]), {product.id: False})
+        self.assertEqual(client.requests, [])
+
+
+class ProductListTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.products = [
+            Product.objects.create(call_sid=f'CA{i}', audio_url=make_audio(), audio_transcription='लामो पाठ')
+            for i in range(5)
+        ]
+        # Two rows share a timestamp so the id tiebreaker is exercised
+        Product.objects.filter(pk__in=[self.products[1].pk, self.products[2].pk]).update(
+            created_at=self.products[1].created_at
+        )
+
+    def walk(self, **params):
+        ids, url = [], reverse('product-list')
+        while url:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            ids += [row['id'] for row in response.json()['results']]
+            url, params = response.json()['next'], {}
+        return ids
+
+    def test_pages_cover_every_row_once_newest_first(self):
+        ids = self.walk(page_size=2)
+        expected = list(Product.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+
+    def test_ascending_order(self):
+        ids = self.walk(page_size=2, order='asc')
+        self.assertEqual(ids, list(Product.objects.order_by('created_at', 'id').values_list('id', flat=True)))
+
+    def test_sparse_fields(self):
+        response = self.client.get(reverse('product-list'), {'fields': 'id,processed,bogus', 'page_size': 1})
+
+        self.assertEqual(set(response.json()['results'][0]), {'id', 'processed'})
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get(reverse('product-list'), {'cursor': 'nope'}).status_code, 404)
+
+
+class ProductPriceTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        for i, price in enumerate(['रु ५०', '१,२०० रुपैयाँ प्रति किलो', 'डेढ लाख', '$20', 'थाहा छैन']):
+            Product.objects.create(call_sid=f'CA{i}', audio_url=make_audio(), extracted_price=price)
+
+    def test_parse_price(self):
+        self.assertEqual(parse_price('रु ५०० प्रति किलो'), (Decimal('500.00'), None, 'NPR'))
+        self.assertEqual(parse_price('दुई लाख'), (Decimal('200000.00'), None, 'NPR'))
+        self.assertEqual(parse_price('५० देखि ६० रुपैयाँ'), (Decimal('50.00'), Decimal('60.00'), 'NPR'))
+        self.assertEqual(parse_price('१० किलो ५०० रुपैयाँ'), (Decimal('500.00'), None, 'NPR'))
+        self.assertEqual(parse_price('१० किलो'), (None, None, None))
+
+    def test_extraction_stores_parsed_price(self):
+        product = Product.objects.get(call_sid='CA0')
+        save_extraction(product, 'आलु', {'product_name': 'आलु', 'price': '५०-६० रुपैयाँ'})
+
+        product.refresh_from_db()
+        self.assertEqual((product.price_amount, product.price_amount_max), (Decimal('50.00'), Decimal('60.00')))
+        self.assertEqual(product.price_currency, 'NPR')
+
+    def test_backfill_then_filter_and_stats(self):
+        call_command('backfill_prices', batch_size=2, stdout=StringIO())
+
+        amounts = dict(Product.objects.values_list('call_sid', 'price_amount'))
+        self.assertEqual(amounts, {
+            'CA0': Decimal('50.00'), 'CA1': Decimal('1200.00'), 'CA2': Decimal('150000.00'), 'CA3': Decimal('20.00'),
+            'CA4': None,
+        })
+        response = self.client.get(reverse('product-list'), {'min_price': 40, 'max_price': 2000})
+        self.assertEqual({row['call_sid'] for row in response.json()['results']}, {'CA0', 'CA1'})
+        response = self.client.get(reverse('product-list'), {'currency': 'usd'})
+        self.assertEqual([row['call_sid'] for row in response.json()['results']], ['CA3'])
+
+        price = self.client.get(reverse('product-stats')).json()['price']
+        self.assertEqual(price['NPR'], {'count': 3, 'min': '50.00', 'max': '150000.00', 'avg': '50416.67', 'median': '1200.00'})
+        self.assertEqual(price['USD']['count'], 1)
+
+    def test_invalid_price_filters(self):
+        self.assertEqual(self.client.get(reverse('product-list'), {'min_price': 'cheap'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('product-list'), {'min_price': 10, 'max_price': 5}).status_code, 400)
+
+
+class ProductSearchTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.potato = Product.objects.create(call_sid='CA1', audio_url=make_audio())
+        save_extraction(self.potato, 'मेरो ताजा आलु छ', {
+            'product_name': 'आलु', 'price': 'रु ५०', 'location': 'चितवनबाट',
+        })
+        self.tomato = Product.objects.create(
+            call_sid='CA2', audio_url=make_audio(), audio_transcription='गोलभेडा र आलु पनि छ', extracted_product_name='गोलभेडा',
+        )
+        self.other = Product.objects.create(call_sid='XB3', audio_url=make_audio(), extracted_product_name='Honey')
+
+    def search(self, **params):
+        response = self.client.get(reverse('product-search'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_ranks_product_name_above_transcript(self):
+        ids = [row['id'] for row in self.search(q='आलु')['results']]
+
+        self.assertEqual(ids, [self.potato.id, self.tomato.id])
+
+    def test_prefixes_postpositions_and_digits(self):
+        self.assertEqual(search_products('चितवनमा', 10), [self.potato.id])
+        self.assertEqual(search_products('50', 10), [self.potato.id])
+        self.assertEqual(search_products('honey', 10), [self.other.id])
+        self.assertEqual(search_products('CA', 10, 0).__len__(), 2)
+        self.assertEqual(search_products('आलु चितवन', 10), [self.potato.id])
+
+    def test_devanagari_words_are_not_split(self):
+        # "ची" would prefix-match the "चि" left over if vowel signs split words
+        self.assertEqual(search_products('ची', 10), [])
+        self.assertEqual(search_products('लु', 10), [])
+        self.assertEqual(search_products('गोल', 10), [self.tomato.id])
+
+    def test_index_follows_updates_and_deletes(self):
+        self.tomato.extracted_location = 'Pokhara'
+        self.tomato.save()
+        self.assertEqual(search_products('pokhara', 10), [self.tomato.id])
+
+        self.tomato.delete()
+        self.assertEqual(search_products('गोलभेडा', 10), [])
+
+    def test_pages(self):
+        first = self.search(q='आलु', page_size=1)
+        second = self.client.get(first['next']).json()
+
+        self.assertEqual([row['id'] for row in first['results'] + second['results']], [self.potato.id, self.tomato.id])
+        self.assertIsNone(second['next'])
+
+    def test_missing_query(self):
+        self.assertEqual(self.client.get(reverse('product-search')).status_code, 400)
+
+    def test_admin_filter(self):
+        matches = search_filter(Product.objects.all(), 'गोलभेडा')
+        self.assertEqual(list(matches.values_list('id', flat=True)), [self.tomato.id])
+
+    def test_dropped_triggers_are_restored(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TRIGGER {SEARCH_TRIGGERS[0]}")
+        Product.objects.create(call_sid='CA4', audio_url=make_audio(), extracted_product_name='मकै')
+
+        ensure_search_triggers()
+
+        self.assertEqual(len(search_products('मकै', 10)), 1)
+
+
+class ConditionalGetTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.product = Product.objects.create(call_sid='CA1', audio_url=make_audio())
+        self.url = reverse('product-retrieve', args=[self.product.pk])
+
+    def test_unchanged_product_returns_304(self):
+        first = self.client.get(self.url)
+        self.assertEqual(first.status_code, 200)
+        self.assertIn('ETag', first)
+        self.assertIn('Last-Modified', first)
+
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=first['Last-Modified']).status_code, 304)
+
+    def test_save_changes_etag_and_payload(self):
+        first = self.client.get(self.url)
+        self.product.extracted_product_name = 'Tomato'
+        self.product.save(update_fields=['extracted_product_name'])
+
+        second = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 200)
+        self.assertNotEqual(second['ETag'], first['ETag'])
+        self.assertEqual(second.json()['extracted_product_name'], 'Tomato')
+
+    def test_cached_payload_is_not_reserialized(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, {'fields': 'id,audio_url'})
+
+        self.assertEqual(set(response.json()), {'id', 'audio_url'})
+        self.assertTrue(response.json()['audio_url'].startswith('http://testserver/'))
+        self.assertEqual(cache_stats.snapshot()['product_hits'], 1)
+
+    def test_list_etag(self):
+        first = self.client.get(reverse('product-list'))
+        self.assertEqual(self.client.get(reverse('product-list'), HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+
+        Product.objects.create(call_sid='CA2', audio_url=make_audio())
+        self.assertEqual(self.client.get(reverse('product-list'), HTTP_IF_NONE_MATCH=first['ETag']).status_code, 200)
+
+
+class ProductEventsTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.product = Product.objects.create(call_sid='CA1', audio_url=make_audio())
+        self.url = reverse('product-events', args=[self.product.pk])
+
+    def test_long_poll_reports_each_transition(self):
+        first = self.client.get(self.url, {'timeout': 0}).json()
+        self.assertEqual(first['events'], [])
+        self.assertFalse(first['done'])
+
+        save_transcription(self.product, 'नमस्ते')
+        second = self.client.get(self.url, {'since': first['cursor'], 'timeout': 0}).json()
+        self.assertEqual(second['events'], ['transcription_done'])
+
+        save_extraction(self.product, 'नमस्ते', {})
+        third = self.client.get(self.url, {'since': second['cursor'], 'timeout': 0}).json()
+        self.assertEqual(third['events'], ['ner_done', 'processed'])
+        self.assertTrue(third['done'])
+
+    def test_failed_product_ends_the_stream(self):
+        cursor = self.client.get(self.url, {'timeout': 0}).json()['cursor']
+        save_failed(self.product.pk)
+
+        change = self.client.get(self.url, {'since': cursor, 'timeout': 0}).json()
+        self.assertEqual(change['events'], ['failed'])
+        self.assertTrue(change['done'])
+
+        body = b''.join(self.client.get(self.url, HTTP_ACCEPT='text/event-stream').streaming_content).decode()
+        self.assertIn('event: failed', body)
+        self.assertNotIn('event: processed', body)
+        self.assertEqual(status_counts(Product.objects.all())['pending_transcription'], 0)
+        self.assertEqual(status_counts(Product.objects.all())['failed'], 1)
+
+    def test_long_poll_times_out_without_change(self):
+        cursor = self.client.get(self.url, {'timeout': 0}).json()['cursor']
+        response = self.client.get(self.url, {'since': cursor, 'timeout': 0.05}).json()
+
+        self.assertEqual((response['cursor'], response['events']), (cursor, []))
+
+    def test_stream_ends_once_processed(self):
+        save_extraction(self.product, 'नमस्ते', {})
+        response = self.client.get(self.url, HTTP_ACCEPT='text/event-stream')
+
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        body = b''.join(response.streaming_content).decode()
+        self.assertIn('event: status', body)
+        self.assertIn('event: transcription_done', body)
+        self.assertIn('event: processed', body)
+
+    @mock.patch('core.events.EVENTS_KEEPALIVE', 0.05)
+    def test_reconnect_after_the_end_repeats_the_final_event_and_closes(self):
+        save_extraction(self.product, 'नमस्ते', {})
+        body = b''.join(self.client.get(self.url, HTTP_ACCEPT='text/event-stream').streaming_content).decode()
+        last_id = [line for line in body.splitlines() if line.startswith('id: ')][-1][4:]
+
+        started = time.monotonic()
+        body = b''.join(self.client.get(
+            self.url, HTTP_ACCEPT='text/event-stream', HTTP_LAST_EVENT_ID=last_id,
+        ).streaming_content).decode()
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertIn('event: processed', body)
+        self.assertNotIn('keep-alive', body)
+
+        async def collect():
+            return [message async for message in astream_events(self.product.pk, last_id, timeout=5)]
+
+        self.assertIn('event: processed', ''.join(async_to_sync(collect)()))
+        self.assertEqual(self.client.get(self.url, {'since': last_id}).json()['events'], ['processed'])
+
+    def test_async_stream(self):
+        save_transcription(self.product, 'नमस्ते')
+
+        async def collect():
+            return [message async for message in astream_events(self.product.pk, None, timeout=0.2)]
+
+        body = ''.join(async_to_sync(collect)())
+
+        self.assertIn('event: transcription_done', body)
+        self.assertNotIn('event: processed', body)
+
+    def test_missing_product(self):
+        url = reverse('product-events', args=[self.product.pk + 1])
+        self.assertEqual(self.client.get(url, {'timeout': 0}).status_code, 404)
+        self.assertEqual(self.client.get(url, HTTP_ACCEPT='text/event-stream').status_code, 404)
+
+
+class ProductChangesTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.products = [Product.objects.create(call_sid=f'CA{i}', audio_url=make_audio()) for i in range(3)]
+
+    def changes(self, **params):
+        response = self.client.get(reverse('product-changes'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_full_sync_then_only_changed_rows(self):
+        first = self.changes(page_size=2)
+        self.assertTrue(first['has_more'])
+        second = self.changes(since=first['next'], page_size=2)
+        self.assertFalse(second['has_more'])
+        synced = [row['id'] for row in first['results'] + second['results']]
+        self.assertEqual(synced, [product.pk for product in self.products])
+
+        save_extraction(self.products[0], 'नमस्ते', {'product_name': 'Tomato'})
+        delta = self.changes(since=second['next'])
+        self.assertEqual([row['id'] for row in delta['results']], [self.products[0].pk])
+        self.assertEqual(delta['results'][0]['extracted_product_name'], 'Tomato')
+
+        self.assertEqual(self.changes(since=delta['next'])['results'], [])
+
+    def test_change_seq_is_monotonic(self):
+        seqs = [product.change_seq for product in self.products]
+        self.products[0].save(update_fields=['call_sid'])
+
+        self.assertEqual(sorted(set(seqs)), seqs)
+        self.assertGreater(self.products[0].change_seq, seqs[-1])
+
+    def test_invalid_token(self):
+        self.assertEqual(self.client.get(reverse('product-changes'), {'since': 'abc'}).status_code, 400)
+
+
+class ProductIndexTests(TestCase):
+    """
+    The product table's hot query shapes must be index scans on SQLite.
+    """
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(f"INDEX {index_name}", plan, plan)
+
+    def test_call_sid_lookup(self):
+        self.assertUsesIndex(Product.objects.filter(call_sid='CA1'), 'product_call_sid_idx')
+
+    def test_pending_scans_use_partial_indexes(self):
+        self.assertUsesIndex(
+            Product.objects.filter(pending_transcription=True).order_by('created_at'), 'product_pending_transcr_idx'
+        )
+        self.assertUsesIndex(Product.objects.filter(pending_ner=True), 'product_pending_ner_idx')
+        self.assertUsesIndex(Product.objects.filter(processed=False), 'product_unprocessed_idx')
+
+    def test_date_range_and_ordering(self):
+        now = timezone.now()
+        self.assertUsesIndex(
+            Product.objects.filter(created_at__range=(now - timedelta(days=7), now)), 'product_created_id_idx'
+        )
+        self.assertUsesIndex(Product.objects.order_by('-created_at', '-id')[:100], 'product_created_id_idx')
+
+    def test_keyset_page(self):
+        now = timezone.now()
+        queryset = Product.objects.filter(
+            Q(created_at__lt=now) | Q(created_at=now, id__lt=10)
+        ).order_by('-created_at', '-id')[:101]
+        self.assertUsesIndex(queryset, 'product_created_id_idx')
+
+
+class ProductStatsTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        base = timezone.make_aware(timezone.datetime(2024, 12, 13, 10))
+        for i, latency in enumerate([10, 20, 30, None]):
+            product = Product.objects.create(call_sid=f'CA{i}', audio_url=make_audio())
+            created = base + timedelta(days=i // 2)
+            Product.objects.filter(pk=product.pk).update(
+                created_at=created,
+                processed=latency is not None,
+                pending_transcription=latency is None,
+                processed_at=created + timedelta(seconds=latency) if latency else None,
+            )
+
+    def test_counts_buckets_and_latency(self):
+        data = self.client.get(reverse('product-stats'), {'bucket': 'day'}).json()
+
+        self.assertEqual((data['total'], data['processed'], data['pending_transcription']), (4, 3, 1))
+        self.assertEqual([b['count'] for b in data['buckets']], [2, 2])
+        self.assertEqual(data['latency_seconds']['count'], 3)
+        self.assertEqual(data['latency_seconds']['avg'], 20.0)
+        self.assertEqual(data['latency_seconds']['p50'], 20.0)
+        self.assertEqual(data['latency_seconds']['p99'], 30.0)
+
+    def test_date_range(self):
+        data = self.client.get(reverse('product-stats'), {'start': '2024-12-14', 'end': '2024-12-14'}).json()
+
+        self.assertEqual(data['total'], 2)
+        self.assertEqual(data['latency_seconds']['p50'], 30.0)
+
+    def test_invalid_params(self):
+        self.assertEqual(self.client.get(reverse('product-stats'), {'bucket': 'year'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('product-stats'), {'start': 'yesterday'}).status_code, 400)
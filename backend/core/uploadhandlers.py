@@ -0,0 +1,35 @@
+# core/uploadhandlers.py
+
+from django.core.files.uploadhandler import MemoryFileUploadHandler, TemporaryFileUploadHandler
+
+from .hashing import new_audio_hasher
+
+
+class HashingUploadMixin:
+    """
+    Hashes each uploaded file while it streams in and exposes the hex digest
+    as `content_hash` on the resulting UploadedFile, so no second pass over
+    the bytes is needed.
+    """
+
+    def new_file(self, *args, **kwargs):
+        self.hasher = new_audio_hasher()
+        return super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        self.hasher.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        uploaded_file = super().file_complete(file_size)
+        if uploaded_file is not None:
+            uploaded_file.content_hash = self.hasher.hexdigest()
+        return uploaded_file
+
+
+class HashingMemoryFileUploadHandler(HashingUploadMixin, MemoryFileUploadHandler):
+    pass
+
+
+class HashingTemporaryFileUploadHandler(HashingUploadMixin, TemporaryFileUploadHandler):
+    pass
@@ -0,0 +1,278 @@
+# core/uploads.py
+
+import logging
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .cache import LRUCache
+from .hashing import HASH_CHUNK_SIZE, hash_chunks, new_audio_hasher
+from .jobs import enqueue_products
+from .models import ChangeSequence, Product, UploadSession, product_audio_upload_to
+
+logger = logging.getLogger(__name__)
+
+BULK_UPLOAD_MAX_ITEMS = getattr(settings, 'BULK_UPLOAD_MAX_ITEMS', 500)
+UPLOAD_CHUNK_MAX_SIZE = getattr(settings, 'UPLOAD_CHUNK_MAX_SIZE', 8 * 1024 * 1024)
+UPLOAD_MAX_SIZE = getattr(settings, 'UPLOAD_MAX_SIZE', 2 * 1024 * 1024 * 1024)
+UPLOAD_SESSION_TTL = getattr(settings, 'UPLOAD_SESSION_TTL', 24 * 60 * 60)
+
+# Running hashers of sessions uploading through this process: id -> (offset, hasher).
+# Chunks usually arrive in order at one process, so each byte is hashed once;
+# anywhere else the hasher is rebuilt from the bytes already stored.
+_session_hashers = LRUCache(maxsize=256)
+
+
+class UploadUnsupported(Exception):
+    """
+    Raised when the audio storage cannot hold resumable uploads.
+    """
+
+
+class UploadConflict(Exception):
+    """
+    Raised when a chunk does not continue where the upload currently stands.
+    """
+
+    def __init__(self, message, offset):
+        super().__init__(message)
+        self.offset = offset
+
+
+def bulk_create_products(items):
+    """
+    Stores many uploaded recordings and creates their products and processing
+    jobs with one insert each.
+
+    Files are streamed to storage first (chunk by chunk from the upload
+    handler's memory or temp file). Rows are then inserted in a single
+    transaction; if that fails, the stored files are removed again.
+    `bulk_create` bypasses `Product.save()`, so the hash, version and change
+    sequence it would set are filled in here.
+
+    Args:
+        items (list of dict): Validated {"call_sid", "audio_url"} pairs.
+
+    Returns:
+        list of Product: The created products, in input order.
+    """
+    products = []
+    try:
+        for item in items:
+            uploaded = item['audio_url']
+            product = Product(call_sid=item['call_sid'], version=1)
+            product.audio_hash = getattr(uploaded, 'content_hash', None) or hash_chunks(uploaded.chunks())
+            product.audio_url.save(uploaded.name, uploaded, save=False)
+            products.append(product)
+
+        with transaction.atomic():
+            last_seq = ChangeSequence.next_value(ChangeSequence.PRODUCTS, count=len(products))
+            first_seq = last_seq - len(products) + 1
+            for offset, product in enumerate(products):
+                product.change_seq = first_seq + offset
+            created = Product.objects.bulk_create(products)
+            if any(product.pk is None for product in created):
+                # Backends that cannot return ids from a bulk insert
+                created = list(Product.objects.filter(change_seq__range=(first_seq, last_seq)).order_by('change_seq'))
+            enqueue_products(created)
+    except Exception:
+        for product in products:
+            if product.audio_url.name:
+                product.audio_url.storage.delete(product.audio_url.name)
+        raise
+
+    logger.info(f"Bulk-created {len(created)} product(s).")
+    return created
+
+
+def audio_storage():
+    return Product._meta.get_field('audio_url').storage
+
+
+def create_upload_session(call_sid, filename, size):
+    """
+    Opens a resumable upload and reserves its final storage location.
+
+    Args:
+        call_sid (str): Call the recording belongs to.
+        filename (str): Original file name.
+        size (int): Total size in bytes.
+
+    Returns:
+        UploadSession: The new session, with nothing received yet.
+
+    Raises:
+        UploadUnsupported: If the storage has no local files to write into.
+    """
+    storage = audio_storage()
+    name = storage.generate_filename(product_audio_upload_to(Product(call_sid=call_sid), filename))
+    name = storage.get_available_name(name)
+    # Writing chunks in place needs a local path (FileSystemStorage)
+    try:
+        path = storage.path(name)
+    except NotImplementedError:
+        raise UploadUnsupported(
+            f"Resumable uploads need local file storage, not {type(storage).__name__}; "
+            "upload the file in one request instead."
+        )
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, 'wb').close()
+
+    return UploadSession.objects.create(
+        call_sid=call_sid,
+        filename=os.path.basename(filename),
+        storage_name=name,
+        size=size,
+        expires_at=timezone.now() + timedelta(seconds=UPLOAD_SESSION_TTL),
+    )
+
+
+def _hasher_at(session, offset):
+    """
+    Returns a hasher that has consumed exactly the first `offset` stored bytes.
+    A cached hasher is copied, so bytes hashed by a write that never commits
+    do not leak into it.
+    """
+    cached = _session_hashers.get(session.pk)
+    if cached is not None and cached[0] == offset:
+        return cached[1].copy()
+    hasher = new_audio_hasher()
+    remaining = offset
+    with open(audio_storage().path(session.storage_name), 'rb') as stored:
+        while remaining:
+            chunk = stored.read(min(HASH_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            hasher.update(chunk)
+            remaining -= len(chunk)
+    return hasher
+
+
+def write_upload_chunk(session_id, start, end, stream):
+    """
+    Writes bytes `start`..`end` (inclusive) from `stream` at their final
+    offset. Bytes already received are skipped, so a chunk whose response was
+    lost can simply be sent again.
+
+    The session row stays locked while the body is streamed to the file, so
+    chunks of one upload are written one at a time and the stored bytes
+    always match the hash cached for the committed offset.
+
+    Args:
+        session_id (UUID): Session to append to.
+        start (int): Offset of the first byte in the chunk.
+        end (int): Offset of the last byte in the chunk.
+        stream (file-like): Request body, read in pieces.
+
+    Returns:
+        UploadSession: The session with its new `received` offset.
+
+    Raises:
+        UploadSession.DoesNotExist: For unknown, expired or finalized sessions.
+        UploadConflict: If the chunk starts after the received offset or runs
+            past the size.
+        ValueError: If the body is shorter than the declared range.
+    """
+    with transaction.atomic():
+        open_sessions = UploadSession.objects.filter(status=UploadSession.STATUS_OPEN, expires_at__gt=timezone.now())
+        if connection.vendor == 'sqlite':
+            # SQLite ignores select_for_update; writing first takes its
+            # database lock, which also keeps other writers out
+            open_sessions.filter(pk=session_id).update(updated_at=timezone.now())
+        session = open_sessions.select_for_update().get(pk=session_id)
+        return _write_chunk(session, start, end, stream)
+
+
+def _write_chunk(session, start, end, stream):
+    offset = session.received
+    if start > offset:
+        raise UploadConflict(f"Chunk starts at {start}, expected {offset}", offset)
+    if end >= session.size:
+        raise UploadConflict(f"Chunk ends past the declared size {session.size}", offset)
+    if end < offset:
+        return session  # Already have all of it
+
+    # Bytes past `received` are not committed yet: a failed write leaves them
+    # to be overwritten by the retry, and finalizing truncates any excess.
+    # The hasher is a copy, so a failed write does not touch the cached one.
+    skip = offset - start
+    hasher = _hasher_at(session, offset)
+    written = 0
+    with open(audio_storage().path(session.storage_name), 'r+b') as stored:
+        stored.seek(offset)
+        remaining = end - start + 1
+        while remaining:
+            piece = stream.read(min(HASH_CHUNK_SIZE, remaining))
+            if not piece:
+                break
+            remaining -= len(piece)
+            if skip:
+                dropped = min(skip, len(piece))
+                piece, skip = piece[dropped:], skip - dropped
+            stored.write(piece)
+            hasher.update(piece)
+            written += len(piece)
+    if remaining:
+        raise ValueError(f"Body ended {remaining} byte(s) short of the declared range")
+
+    session.received = offset + written
+    session.expires_at = timezone.now() + timedelta(seconds=UPLOAD_SESSION_TTL)
+    session.save(update_fields=['received', 'expires_at', 'updated_at'])
+    transaction.on_commit(lambda: _session_hashers.set(session.pk, (session.received, hasher)))
+    return session
+
+
+def finalize_upload(session_id):
+    """
+    Creates the Product for a fully received upload. The file is already in
+    place, so nothing is copied and the content hash is the running one.
+
+    Returns:
+        Product: The created product (queued for processing by the usual signal).
+
+    Raises:
+        UploadSession.DoesNotExist: For unknown or expired sessions.
+        UploadConflict: If bytes are still missing.
+    """
+    with transaction.atomic():
+        session = UploadSession.objects.select_for_update().get(pk=session_id, expires_at__gt=timezone.now())
+        if session.status == UploadSession.STATUS_COMPLETE and session.product_id:
+            return session.product
+        if session.received < session.size:
+            raise UploadConflict(f"Only {session.received} of {session.size} bytes received", session.received)
+
+        hasher = _hasher_at(session, session.size)
+        with open(audio_storage().path(session.storage_name), 'r+b') as stored:
+            stored.truncate(session.size)  # Drop bytes left over from an interrupted chunk
+
+        product = Product(call_sid=session.call_sid, audio_hash=hasher.hexdigest())
+        product.audio_url.name = session.storage_name
+        product.save()
+
+        session.status = UploadSession.STATUS_COMPLETE
+        session.product = product
+        session.save(update_fields=['status', 'product', 'updated_at'])
+    _session_hashers.delete(session.pk)
+    return product
+
+
+def purge_expired_uploads():
+    """
+    Deletes abandoned upload sessions and the partial files they reserved.
+
+    Returns:
+        int: Number of sessions deleted.
+    """
+    storage = audio_storage()
+    expired = UploadSession.objects.filter(status=UploadSession.STATUS_OPEN, expires_at__lte=timezone.now())
+    count = 0
+    for session in expired.iterator():
+        storage.delete(session.storage_name)
+        session.delete()
+        count += 1
+    if count:
+        logger.debug(f"Deleted {count} expired upload session(s).")
+    return count
@@ -1,10 +1,22 @@
 # core/urls.py
 
 from django.urls import path
-from .views import ProductCreateAPIView, ProductRetrieveAPIView, ProductListAPIView
+from .views import (
+    ProductBulkCreateAPIView, ProductChangesAPIView, ProductCreateAPIView, ProductEventsAPIView, ProductListAPIView,
+    ProductRetrieveAPIView, ProductSearchAPIView, ProductStatsAPIView, UploadSessionAPIView,
+    UploadSessionCreateAPIView, UploadSessionFinalizeAPIView,
+)
 
 urlpatterns = [
     path('create/', ProductCreateAPIView.as_view(), name='product-create'),
+    path('bulk/', ProductBulkCreateAPIView.as_view(), name='product-bulk-create'),
+    path('uploads/', UploadSessionCreateAPIView.as_view(), name='upload-create'),
+    path('uploads/<uuid:pk>/', UploadSessionAPIView.as_view(), name='upload-detail'),
+    path('uploads/<uuid:pk>/finalize/', UploadSessionFinalizeAPIView.as_view(), name='upload-finalize'),
+    path('changes/', ProductChangesAPIView.as_view(), name='product-changes'),
+    path('stats/', ProductStatsAPIView.as_view(), name='product-stats'),
+    path('search/', ProductSearchAPIView.as_view(), name='product-search'),
     path('<int:pk>/', ProductRetrieveAPIView.as_view(), name='product-retrieve'),
+    path('<int:pk>/events/', ProductEventsAPIView.as_view(), name='product-events'),
     path('', ProductListAPIView.as_view(), name='product-list'),
 ]
@@ -1,14 +1,23 @@
 import os
 import re
+import contextvars
 import json
 import logging
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from decimal import Decimal
-from io import BytesIO
 
 import requests
-import openai 
 from django.conf import settings
-from .models import Product
+from django.utils import timezone
+from . import clients, metrics, providers
+from .audio import (
+    AUDIO_PREPROCESS, TRANSCRIBE_CHUNK_SECONDS, AudioRejected, encode_wav, preprocess_audio, split_on_silence,
+)
+from .cache import get_cached_ner, get_cached_transcript, ner_cache_key, store_ner, store_transcript
+from .extraction import confident_fields, parse_price
+from .hashing import hash_chunks, hash_file
+from .models import ProcessingRun, Product
 
 from django.conf import settings
 
@@ -17,84 +26,281 @@ BASE_MEDIA_URL = settings.BASE_MEDIA_URL
 # Configure logging
 logger = logging.getLogger(__name__)
 
-# OpenAI API Keys
-OPENAI_KEY = settings.OPENAI_KEY
+# Whisper configuration (also part of the transcript cache key). Alternate
+# backends are expected to serve an equivalent model.
+WHISPER_MODEL = providers.DEFAULT_TRANSCRIPTION_MODEL
+WHISPER_LANGUAGE = "ne"  # Nepali language code
 
-# Set the OpenAI API key directly (don't instantiate)
-openai.api_key = OPENAI_KEY
+# Audio larger than this is spilled from memory to a temporary file on disk
+AUDIO_SPOOL_MAX_SIZE = getattr(settings, 'AUDIO_SPOOL_MAX_SIZE', 5 * 1024 * 1024)
 
 # Function to download audio from a URL
 def download_audio(recording_url):
     """
-    Downloads the audio file from the given URL.
+    Streams the audio file at the given URL into a spooled temporary file.
 
     Args:
         recording_url (str): URL of the audio file.
 
     Returns:
-        bytes or None: Binary content of the audio file if successful, else None.
+        SpooledTemporaryFile or None: Readable file positioned at the start if successful, else None.
     """
     try:
-        response = requests.get(recording_url, timeout=15)
-        response.raise_for_status()
+        with clients.get('media', recording_url, stream=True) as response:
+            audio_file = tempfile.SpooledTemporaryFile(max_size=AUDIO_SPOOL_MAX_SIZE)
+            for chunk in response.iter_content(chunk_size=64 * 1024):
+                audio_file.write(chunk)
+        metrics.record('bytes_in', audio_file.tell())
+        audio_file.seek(0)
         logger.debug(f"Successfully downloaded audio from {recording_url}")
-        return response.content
+        return audio_file
     except requests.RequestException as e:
         logger.error(f"Failed to download audio from {recording_url}: {e}")
         return None
 
+# Function to open stored audio for reading
+@metrics.stage('read')
+def open_audio(audio_field):
+    """
+    Opens a stored audio file through Django's storage API.
+
+    Local and remote storages are read directly as a stream. The HTTP download
+    from BASE_MEDIA_URL is only used when the storage cannot open the file
+    (e.g. the media lives on another host).
+
+    Args:
+        audio_field (FieldFile): The `audio_url` field of a Product.
+
+    Returns:
+        file-like or None: Binary file handle positioned at the start, else None.
+    """
+    try:
+        audio_file = audio_field.storage.open(audio_field.name, 'rb')
+    except (OSError, NotImplementedError) as e:
+        if not BASE_MEDIA_URL:
+            logger.error(f"Failed to open audio {audio_field.name} from storage: {e}")
+            return None
+        logger.warning(f"Storage could not open {audio_field.name} ({e}); falling back to HTTP")
+        return download_audio(str(BASE_MEDIA_URL) + str(audio_field.name))
+    metrics.record('bytes_in', getattr(audio_file, 'size', 0))
+    return audio_file
+
 # Function to transcribe audio using OpenAI Whisper
-def transcribe_audio(recording_url):
+def transcribe_audio(audio_file, filename="audio.wav"):
     """
-    Transcribes audio using OpenAI's Whisper API.
+    Transcribes audio using the configured Whisper backends (hedged across
+    them when more than one is configured).
 
     Args:
-        recording_url (str): URL of the audio file.
+        audio_file (file-like): Binary audio stream to upload.
+        filename (str): File name sent to Whisper; its extension selects the decoder.
 
     Returns:
         str: Transcribed text or empty string on failure.
     """
-    if not OPENAI_KEY:
-        logger.error("Whisper API key is not configured.")
+    if not providers.providers_for(providers.TRANSCRIPTION):
+        logger.error("No transcription backend is configured.")
         return ""
 
-    audio_content = download_audio(recording_url)
-    if not audio_content:
+    try:
+        logger.debug(f"Transcribing audio {filename}")
+        # Streamed from the file by every attempt rather than read into memory
+        source = clients.UploadSource(audio_file)
+        metrics.record('bytes_out', source.size)
+        transcript = providers.transcribe(source, filename, WHISPER_LANGUAGE)
+        logger.debug(f"Transcription successful: {transcript}")
+        return transcript
+    except providers.ProviderError as e:
+        logger.error(f"Transcription request failed for {filename}: {e}")
+        return ""
+    except Exception as e:
+        logger.error(f"Transcription failed for {filename}: {e}")
         return ""
 
-    try:
-        audio_file = BytesIO(audio_content)
-        audio_file.name = "audio.wav"  # Whisper requires a name attribute
-
-        logger.debug(f"Transcribing audio from {recording_url}")
-        response = openai.audio.transcriptions.create(
-            model="whisper-1",
-            file=audio_file,
-            language="ne",  # Nepali language code
-        )
-
-        # Ensure response contains 'text' attribute
-        if hasattr(response, 'text'):
-            transcript = response.text.strip()  # Access the 'text' attribute
-            logger.debug(f"Transcription successful: {transcript}")
+# Long recordings are split and transcribed concurrently
+TRANSCRIBE_CHUNK_CONCURRENCY = getattr(settings, 'TRANSCRIBE_CHUNK_CONCURRENCY', 4)
+TRANSCRIBE_CHUNK_RETRIES = getattr(settings, 'TRANSCRIBE_CHUNK_RETRIES', 2)
+
+# Longest run of words compared when removing text repeated across a chunk overlap
+STITCH_MAX_OVERLAP_WORDS = 20
+
+
+def stitch_transcripts(parts, max_overlap_words=STITCH_MAX_OVERLAP_WORDS):
+    """
+    Joins chunk transcripts in order, dropping words at the start of each
+    chunk that repeat the end of the previous one (from the audio overlap).
+
+    Args:
+        parts (list of str): Chunk transcripts in audio order.
+
+    Returns:
+        str: The combined transcript.
+    """
+    words = []
+    for part in parts:
+        new_words = part.split()
+        longest = min(max_overlap_words, len(words), len(new_words))
+        for size in range(longest, 0, -1):
+            if words[-size:] == new_words[:size]:
+                new_words = new_words[size:]
+                break
+        words.extend(new_words)
+    return " ".join(words)
+
+
+def chunk_uploads(samples, rate, filename):
+    """
+    Splits long audio at silences into overlapping chunks encoded as WAV.
+
+    Returns:
+        list of tuple: (chunk file name, BytesIO) in audio order.
+    """
+    stem, ext = os.path.splitext(filename)
+    return [
+        (f"{stem}.part{i}{ext}", encode_wav(samples[start:end], rate))
+        for i, (start, end) in enumerate(split_on_silence(samples, rate))
+    ]
+
+
+def transcribe_chunk(filename, audio_file, attempts=TRANSCRIBE_CHUNK_RETRIES + 1):
+    """
+    Transcribes one chunk, retrying only this chunk on failure.
+
+    Returns:
+        str or None: The chunk transcript, or None if every attempt failed.
+    """
+    for attempt in range(1, attempts + 1):
+        audio_file.seek(0)
+        transcript = transcribe_audio(audio_file, filename)
+        if transcript:
             return transcript
-        else:
-            logger.error(f"Unexpected response structure: {response}")
-            return ""
-    except Exception as e:
-        logger.error(f"Transcription failed for {recording_url}: {e}")
+        logger.warning(f"Chunk {filename} attempt {attempt}/{attempts} failed")
+    return None
+
+
+def transcribe_uploads(uploads):
+    """
+    Transcribes chunk uploads concurrently and stitches the results in order.
+
+    Args:
+        uploads (list of tuple): (file name, file-like) per chunk, in audio order.
+
+    Returns:
+        str: Transcribed text or empty string if any chunk failed.
+    """
+    logger.debug(f"Transcribing {len(uploads)} chunks")
+    with ThreadPoolExecutor(max_workers=max(1, TRANSCRIBE_CHUNK_CONCURRENCY)) as pool:
+        # Each chunk runs in a copy of the caller's context, so it is counted in the current run
+        futures = [
+            pool.submit(contextvars.copy_context().run, transcribe_chunk, filename, audio_file)
+            for filename, audio_file in uploads
+        ]
+        parts = [future.result() for future in futures]
+
+    if any(part is None for part in parts):
+        logger.error(f"Chunked transcription failed for {uploads[0][0]}")
         return ""
+    return stitch_transcripts(parts)
 
-# Function to perform NER using GPT-3
-def perform_ner(transcript):
+
+def transcribe_chunked(samples, rate, filename):
+    """
+    Transcribes long audio by splitting it at silences into overlapping chunks,
+    transcribing the chunks concurrently and stitching the results in order.
+
+    Args:
+        samples (ndarray): Mono float samples.
+        rate (int): Sample rate of `samples`.
+        filename (str): Base file name for the uploaded chunks.
+
+    Returns:
+        str: Transcribed text or empty string if any chunk failed.
     """
-    Performs NER using GPT-3.
+    return transcribe_uploads(chunk_uploads(samples, rate, filename))
+
+
+def prepare_transcription(product_instance, audio_file):
     """
-    if not OPENAI_KEY:
-        logger.error("GPT API key is not configured.")
-        return {"product_name": "", "description": "", "price": "", "location": ""}
+    Does the local work before transcription: fingerprints the audio, checks
+    the transcript cache and preprocesses/chunks what has to be uploaded.
+
+    Args:
+        product_instance (Product): The product whose audio is transcribed.
+        audio_file (file-like): Open binary stream of the product's audio.
+
+    Returns:
+        tuple: (audio_hash, cached transcript or None, uploads) where uploads is
+        a list of (file name, file-like) to send, one per chunk.
 
-    prompt = f"""
+    Raises:
+        AudioRejected: If preprocessing finds nothing worth transcribing.
+    """
+    audio_hash = product_instance.audio_hash
+    if not audio_hash and audio_file.seekable():
+        # Rows created before hashing at ingest: fingerprint now and remember it
+        with metrics.stage('read'):
+            audio_hash = hash_file(audio_file)
+        Product.objects.filter(pk=product_instance.pk).update(audio_hash=audio_hash)
+        product_instance.audio_hash = audio_hash
+
+    if audio_hash:
+        transcript = get_cached_transcript(audio_hash, WHISPER_MODEL, WHISPER_LANGUAGE)
+        if transcript is not None:
+            logger.debug(f"Transcript cache hit for Product {product_instance.id}")
+            return audio_hash, transcript, []
+
+    filename = os.path.basename(product_instance.audio_url.name)
+    if AUDIO_PREPROCESS and audio_file.seekable():
+        with metrics.stage('preprocess'):
+            # Raises AudioRejected for silent/too-short recordings: no API call
+            preprocessed = preprocess_audio(audio_file, filename)
+            if preprocessed is not None:
+                if preprocessed.seconds_out > TRANSCRIBE_CHUNK_SECONDS:
+                    uploads = chunk_uploads(preprocessed.samples, preprocessed.rate, preprocessed.filename)
+                    return audio_hash, None, uploads
+                return audio_hash, None, [(preprocessed.filename, preprocessed.file)]
+
+    return audio_hash, None, [(filename, audio_file)]
+
+
+# Function to transcribe audio, reusing transcripts of identical recordings
+def transcribe_with_cache(product_instance, audio_file):
+    """
+    Returns the transcript for a product's audio, skipping Whisper when the
+    same audio (by content hash) has been transcribed before.
+
+    Args:
+        product_instance (Product): The product whose audio is transcribed.
+        audio_file (file-like): Open binary stream of the product's audio.
+
+    Returns:
+        str: Transcribed text or empty string on failure.
+
+    Raises:
+        AudioRejected: If preprocessing finds nothing worth transcribing.
+    """
+    audio_hash, transcript, uploads = prepare_transcription(product_instance, audio_file)
+    if transcript is not None:
+        return transcript
+
+    with metrics.stage('transcribe'):
+        if len(uploads) == 1:
+            filename, upload = uploads[0]
+            transcript = transcribe_audio(upload, filename)
+        else:
+            transcript = transcribe_uploads(uploads)
+
+    if transcript and audio_hash:
+        store_transcript(audio_hash, WHISPER_MODEL, WHISPER_LANGUAGE, transcript)
+    return transcript
+
+# NER configuration. The prompt version is derived from the prompt text, so
+# editing the prompt automatically invalidates cached NER results.
+NER_MODEL = providers.DEFAULT_CHAT_MODEL
+NER_TEMPERATURE = 0
+NER_FIELDS = ["product_name", "description", "price", "location"]
+NER_SYSTEM_PROMPT = "You extract specific fields from Nepali text."
+NER_PROMPT_TEMPLATE = """
     Use your AI assistant to extract specific fields from the Nepali text below with your acumen and intuition just like a human would as call center agent.
     
     Extract the following information from the Nepali text below:
@@ -119,48 +325,396 @@ def perform_ner(transcript):
     
     """
 
-    headers = {
-        "Authorization": f"Bearer {OPENAI_KEY}",
-        "Content-Type": "application/json"
-    }
+NER_BATCH_PROMPT_TEMPLATE = """
+    Use your AI assistant to extract specific fields from each of the Nepali texts below with your acumen and intuition just like a human would as call center agent.
+
+    For every item extract:
+    - Product Name
+    - Description
+    - Price
+    - Location
+
+    Items (JSON array of objects with "id" and "text"):
+    {items}
+
+    Reply with only a JSON array containing one object per item, in any order, like this:
+    [
+        {{"id": "1", "product_name": "", "description": "", "price": "", "location": ""}}
+    ]
 
-    data = {
-        "model": "gpt-4-turbo",
-        "messages": [
-            {"role": "system", "content": "You extract specific fields from Nepali text."},
-            {"role": "user", "content": prompt}
-        ],
-        "temperature": 0
-    }
+    Note: Leave a field empty if the information is not present but do your best to search for it and guess and you can change the text if needed, if transcription is not accurate.
+    Important: Every id from the input must appear exactly once in the output.
+    """
+NER_PROMPT_VERSION = hash_chunks([
+    NER_SYSTEM_PROMPT.encode(), NER_PROMPT_TEMPLATE.encode(), NER_BATCH_PROMPT_TEMPLATE.encode(),
+])[:16]
 
+# Maximum number of transcripts packed into one batched NER request
+NER_BATCH_SIZE = getattr(settings, 'NER_BATCH_SIZE', 8)
+
+
+def empty_ner_result():
+    return {key: "" for key in NER_FIELDS}
+
+
+def parse_ner_content(content):
+    """
+    Parses JSON out of a chat-completion message, tolerating code fences.
+
+    Returns:
+        dict, list or None: Parsed JSON, or None if it is not valid JSON.
+    """
     try:
-        logger.debug("Sending transcript for NER")
-        response = requests.post("https://api.openai.com/v1/chat/completions", headers=headers, json=data, timeout=15)
-        response.raise_for_status()
+        return json.loads(content.strip().replace("```json", "").replace("\n```", ""))
+    except json.JSONDecodeError as e:
+        logger.error(f"Failed to parse NER response: {e}")
+        return None
 
-        ner_result = response.json()['choices'][0]['message']['content']
-        logger.debug(f"NER response: {ner_result}")
 
-        # Parsing NER result: stripping unnecessary characters
-        try:
-            ner_data = json.loads(ner_result.strip().replace("```json", "").replace("\n```", ""))
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse NER response: {e}")
-            ner_data = {}
+def clean_ner_data(ner_data):
+    """
+    Ensures all NER keys are present and strips string values.
+    """
+    ner_data = dict(ner_data)
+    for key in NER_FIELDS:
+        ner_data.setdefault(key, "")
+    return {k: v.strip() if isinstance(v, str) else v for k, v in ner_data.items()}
 
-        # Ensure all keys are present and clean up data
-        for key in ["product_name", "description", "price", "location"]:
-            ner_data.setdefault(key, "")
 
-        ner_data = {k: v.strip() if isinstance(v, str) else v for k, v in ner_data.items()}
-        return ner_data
+def chat_completion(prompt, timeout=None):
+    """
+    Sends a prompt to the configured chat backends with the NER system prompt.
 
-    except requests.RequestException as e:
+    Returns:
+        str or None: The message content, or None if the request failed.
+    """
+    messages = [
+        {"role": "system", "content": NER_SYSTEM_PROMPT},
+        {"role": "user", "content": prompt}
+    ]
+
+    try:
+        content = providers.chat(messages, NER_TEMPERATURE, timeout=timeout)
+        logger.debug(f"NER response: {content}")
+        return content
+
+    except providers.ProviderError as e:
         logger.error(f"NER request failed: {e}")
     except Exception as e:
         logger.error(f"Unexpected error during NER: {e}")
 
-    return {"product_name": "", "description": "", "price": "", "location": ""}
+    return None
+
+
+def request_ner(transcript):
+    """
+    Sends a single transcript to the chat-completion API.
+
+    Returns:
+        dict or None: Cleaned NER fields, or None if the request or parsing failed.
+    """
+    logger.debug("Sending transcript for NER")
+    content = chat_completion(NER_PROMPT_TEMPLATE.format(transcript=transcript))
+    if content is None:
+        return None
+
+    # Parsing NER result: stripping unnecessary characters
+    ner_data = parse_ner_content(content)
+    if not isinstance(ner_data, dict):
+        return None
+    return clean_ner_data(ner_data)
+
+
+def request_ner_batch(transcripts):
+    """
+    Sends several transcripts to the chat-completion API in one request.
+
+    Args:
+        transcripts (list of str): Transcripts to extract fields from.
+
+    Returns:
+        list: Cleaned NER fields per transcript, in input order; None for any
+        item missing from or malformed in the response.
+    """
+    items = [{"id": str(i), "text": transcript} for i, transcript in enumerate(transcripts, start=1)]
+    logger.debug(f"Sending {len(items)} transcripts for batched NER")
+    # Completions for K items need roughly K times the output tokens of one.
+    connect_timeout, read_timeout = clients.HTTP_TIMEOUTS['chat']
+    content = chat_completion(
+        NER_BATCH_PROMPT_TEMPLATE.format(items=json.dumps(items, ensure_ascii=False)),
+        timeout=(connect_timeout, read_timeout + 10 * len(items)),
+    )
+    results = [None] * len(transcripts)
+    if content is None:
+        return results
+
+    parsed = parse_ner_content(content)
+    if isinstance(parsed, dict):
+        # Tolerate {"results": [...]} or {"<id>": {...}} shapes
+        parsed = parsed.get("results", [dict(v, id=k) for k, v in parsed.items() if isinstance(v, dict)])
+    if not isinstance(parsed, list):
+        return results
+
+    for entry in parsed:
+        if not isinstance(entry, dict):
+            continue
+        try:
+            index = int(str(entry.pop("id", "")).strip()) - 1
+        except ValueError:
+            continue
+        if 0 <= index < len(results) and results[index] is None:
+            results[index] = clean_ner_data(entry)
+    return results
+
+
+# Function to perform NER using GPT-3
+@metrics.stage('ner')
+def perform_ner(transcript, strict=False):
+    """
+    Performs NER using GPT, memoized on the normalized transcript, model,
+    prompt version and temperature. The rule-based fast path runs first; GPT
+    is only asked when it is unsure of some field, and fields the fast path
+    is confident about keep its values.
+
+    Args:
+        transcript (str): Transcribed text.
+        strict (bool): Return None instead of empty fields on failure.
+
+    Returns:
+        dict: Extracted fields; empty strings for anything not found or on failure.
+    """
+    fast = confident_fields(transcript)
+    if len(fast) == len(NER_FIELDS):
+        return clean_ner_data(fast)
+
+    failed = None if strict else dict(empty_ner_result(), **fast)
+    if not providers.providers_for(providers.CHAT):
+        logger.error("No chat backend is configured.")
+        return failed
+
+    cache_key = ner_cache_key(transcript, NER_MODEL, NER_PROMPT_VERSION, NER_TEMPERATURE)
+    ner_data = get_cached_ner(cache_key)
+    if ner_data is not None:
+        logger.debug("NER cache hit")
+        return dict(ner_data, **fast)
+
+    ner_data = request_ner(transcript)
+    if ner_data is None:
+        return failed
+
+    store_ner(cache_key, ner_data)
+    return dict(ner_data, **fast)
+
+
+@metrics.stage('ner')
+def perform_ner_batch(transcripts, batch_size=None, strict=False):
+    """
+    Performs NER for many transcripts, packing cache misses into requests of
+    up to `batch_size` items so the instruction preamble is paid once per batch.
+    Items the batched response fails to cover are retried one by one, and
+    items the fast path resolves completely are not sent at all.
+
+    Args:
+        transcripts (list of str): Transcribed texts.
+        batch_size (int): Items per request; defaults to NER_BATCH_SIZE.
+        strict (bool): Return None instead of empty fields for failed items.
+
+    Returns:
+        list of dict: Extracted fields for each transcript, in input order.
+    """
+    fast = [confident_fields(transcript) for transcript in transcripts]
+    results = [clean_ner_data(fields) if len(fields) == len(NER_FIELDS) else None for fields in fast]
+    remaining = [index for index, ner_data in enumerate(results) if ner_data is None]
+    if remaining and not providers.providers_for(providers.CHAT):
+        logger.error("No chat backend is configured.")
+        return [results[i] or (None if strict else dict(empty_ner_result(), **fast[i])) for i in range(len(transcripts))]
+
+    batch_size = max(1, batch_size or NER_BATCH_SIZE)
+    cache_keys = [ner_cache_key(t, NER_MODEL, NER_PROMPT_VERSION, NER_TEMPERATURE) for t in transcripts]
+
+    pending = []
+    for index in remaining:
+        results[index] = get_cached_ner(cache_keys[index])
+        if results[index] is None:
+            pending.append(index)
+
+    for start in range(0, len(pending), batch_size):
+        chunk = pending[start:start + batch_size]
+        if len(chunk) == 1:
+            batch_results = [request_ner(transcripts[chunk[0]])]
+        else:
+            batch_results = request_ner_batch([transcripts[i] for i in chunk])
+
+        for index, ner_data in zip(chunk, batch_results):
+            if ner_data is None and len(chunk) > 1:
+                logger.warning(f"Batched NER missed item {index}; retrying it on its own")
+                ner_data = request_ner(transcripts[index])
+            if ner_data is None:
+                results[index] = None if strict else empty_ner_result()
+                continue
+            store_ner(cache_keys[index], ner_data)
+            results[index] = ner_data
+
+    for index in remaining:
+        if results[index] is not None and fast[index]:
+            results[index] = dict(results[index], **fast[index])
+    return results
+
+
+def transcribe_product(product_instance):
+    """
+    Reads a product's audio from storage and transcribes it.
+
+    Returns:
+        str: Transcribed text or empty string on failure.
+    """
+    audio_file = open_audio(product_instance.audio_url)
+    if audio_file is None:
+        logger.error(f"Failed to read audio for Product {product_instance.id}.")
+        return ""
+
+    with audio_file:
+        return transcribe_with_cache(product_instance, audio_file)
+
+
+@metrics.stage('db')
+def save_transcription(product_instance, transcript):
+    """
+    Stores the transcript and moves a product on to NER, so status
+    subscribers see transcription finish before extraction does, and a
+    retry after a failed NER does not transcribe again.
+    """
+    product_instance.audio_transcription = transcript
+    product_instance.state = Product.STATE_TRANSCRIBED
+    product_instance.transcription_attempts += 1
+    product_instance.transcription_error = None
+    product_instance.transcribed_at = timezone.now()
+    product_instance.pending_transcription = False
+    product_instance.pending_ner = True
+    product_instance.save(update_fields=[
+        'audio_transcription', 'state', 'transcription_attempts', 'transcription_error', 'transcribed_at',
+        'pending_transcription', 'pending_ner',
+    ])
+
+
+@metrics.stage('db')
+def save_extraction(product_instance, transcript, ner_data):
+    """
+    Stores the transcript and extracted fields on a product.
+    """
+    product_instance.audio_transcription = transcript
+    product_instance.extracted_product_name = ner_data.get('product_name', '')
+    product_instance.extracted_description = ner_data.get('description', '')
+    product_instance.extracted_price = ner_data.get('price', '')
+    product_instance.extracted_location = ner_data.get('location', '')
+    set_price(product_instance)
+    product_instance.state = Product.STATE_PROCESSED
+    product_instance.ner_attempts += 1
+    product_instance.ner_error = None
+    product_instance.pending_transcription = False
+    product_instance.pending_ner = False
+    product_instance.processed = True
+    product_instance.processed_at = timezone.now()
+
+    # Save the updated product instance
+    product_instance.save()
+
+    logger.info(f"Product {product_instance.id} updated with NER data.")
+
+
+PRICE_FIELDS = ['price_amount', 'price_amount_max', 'price_currency']
+
+
+def set_price(product_instance):
+    """
+    Fills the numeric price fields from `extracted_price` (without saving).
+
+    Returns:
+        bool: True if any of them changed.
+    """
+    parsed = parse_price(product_instance.extracted_price)
+    current = tuple(getattr(product_instance, name) for name in PRICE_FIELDS)
+    for name, value in zip(PRICE_FIELDS, parsed):
+        setattr(product_instance, name, value)
+    return parsed != current
+
+
+@metrics.stage('db')
+def save_rejection(product_instance, reason):
+    """
+    Closes out a product whose audio was rejected before transcription, so it
+    is not retried.
+    """
+    product_instance.audio_transcription = ""
+    product_instance.state = Product.STATE_REJECTED
+    product_instance.pending_transcription = False
+    product_instance.pending_ner = False
+    product_instance.processed = True
+    product_instance.processed_at = timezone.now()
+    product_instance.save()
+    metrics.set_outcome(ProcessingRun.OUTCOME_REJECTED)
+
+    logger.warning(f"Product {product_instance.id} audio rejected: {reason}")
+
+
+def current_stage(product_instance):
+    """
+    Returns the stage a product's next attempt starts at: NER once a
+    transcript is stored, transcription otherwise.
+    """
+    if product_instance.state == Product.STATE_TRANSCRIBED and product_instance.audio_transcription:
+        return Product.STAGE_NER
+    return Product.STAGE_TRANSCRIPTION
+
+
+@metrics.stage('db')
+def save_stage_failure(product_instance, error, stage=None):
+    """
+    Counts a failed attempt at `stage` (default: the product's current stage)
+    and keeps its error. The state is unchanged, so the retry resumes there.
+    """
+    stage = stage or current_stage(product_instance)
+    attempts_field, error_field = f"{stage}_attempts", f"{stage}_error"
+    setattr(product_instance, attempts_field, getattr(product_instance, attempts_field) + 1)
+    setattr(product_instance, error_field, str(error)[:2000])
+    product_instance.save(update_fields=[attempts_field, error_field])
+    logger.error(f"Product {product_instance.id} {stage} failed: {error}")
+
+
+def save_failed(product_id):
+    """
+    Marks a product failed once its job has no attempts left. The stage
+    counters and errors say how far it got; the pending flags are cleared
+    since nothing will pick it up again.
+    """
+    product_instance = Product.objects.filter(pk=product_id).first()
+    if product_instance is None or product_instance.state in (Product.STATE_PROCESSED, Product.STATE_REJECTED):
+        return
+    product_instance.state = Product.STATE_FAILED
+    product_instance.failed_at = timezone.now()
+    product_instance.pending_transcription = False
+    product_instance.pending_ner = False
+    product_instance.save(update_fields=['state', 'failed_at', 'pending_transcription', 'pending_ner'])
+
+
+def transcribe_or_resume(product_instance):
+    """
+    Returns the product's transcript, reusing the stored one when a previous
+    attempt got past transcription.
+
+    Raises:
+        AudioRejected: If preprocessing finds nothing worth transcribing.
+    """
+    if current_stage(product_instance) == Product.STAGE_NER:
+        logger.debug(f"Product {product_instance.id} resumes at NER")
+        return product_instance.audio_transcription
+
+    transcript = transcribe_product(product_instance)
+    if not transcript:
+        save_stage_failure(product_instance, "Transcription failed", Product.STAGE_TRANSCRIPTION)
+        return ""
+    save_transcription(product_instance, transcript)
+    return transcript
 
 
 # Function to extract and save NER data in the database
@@ -168,29 +722,70 @@ def extract_and_save(product_instance):
     """
     This function is called to extract and save NER data in the database.
     It will update the corresponding product instance with the extracted fields.
+    Each stage is recorded as it completes, so a retry resumes at the stage
+    that failed.
+
+    Returns:
+        bool: True if the product was transcribed and updated, else False.
     """
-    # Step 1: Transcribe audio
-    recording_url = str(BASE_MEDIA_URL) + str(product_instance.audio_url)  # Assuming the audio URL is stored in the model
-    transcript = transcribe_audio(recording_url)
+    # Step 1: Transcribe audio, streamed straight from storage (or resume)
+    try:
+        transcript = transcribe_or_resume(product_instance)
+    except AudioRejected as e:
+        save_rejection(product_instance, e)
+        return True
+    if not transcript:
+        return False
 
     # Step 2: Perform NER on the transcript
-    if transcript:
-        ner_data = perform_ner(transcript)
-        
-        print(ner_data)
-
-        # Step 3: Update product instance with extracted data
-        product_instance.audio_transcription = transcript
-        product_instance.extracted_product_name = ner_data.get('product_name', '')
-        product_instance.extracted_description = ner_data.get('description', '')
-        product_instance.extracted_price = ner_data.get('price', '')
-        product_instance.extracted_location = ner_data.get('location', '')
-        product_instance.pending_transcription = False
-        product_instance.pending_ner = False
-        
-        # Save the updated product instance
-        product_instance.save()
-
-        logger.info(f"Product {product_instance.id} updated with NER data.")
-    else:
-        logger.error(f"Failed to transcribe audio for Product {product_instance.id}.")
+    ner_data = perform_ner(transcript, strict=True)
+    if ner_data is None:
+        save_stage_failure(product_instance, "NER failed", Product.STAGE_NER)
+        return False
+
+    # Step 3: Update product instance with extracted data
+    save_extraction(product_instance, transcript, ner_data)
+    return True
+
+
+def extract_and_save_batch(product_instances, runs=None):
+    """
+    Batch variant of `extract_and_save`: transcribes each product, then runs
+    NER for all transcripts through `perform_ner_batch`.
+
+    Args:
+        product_instances (list of Product): Products to process.
+        runs (dict): Optional product id -> metrics.RunRecorder, so each
+            product's stages are recorded in its own run.
+
+    Returns:
+        dict: Product id -> True if that product was transcribed and updated.
+    """
+    runs = runs or {}
+    outcomes = {}
+    transcribed = []
+    for product_instance in product_instances:
+        with metrics.recording(runs.get(product_instance.id)):
+            try:
+                transcript = transcribe_or_resume(product_instance)
+            except AudioRejected as e:
+                save_rejection(product_instance, e)
+                outcomes[product_instance.id] = True
+                continue
+            if transcript:
+                transcribed.append((product_instance, transcript))
+            else:
+                outcomes[product_instance.id] = False
+
+    with metrics.recording() as batch_run:
+        ner_results = perform_ner_batch([transcript for _, transcript in transcribed], strict=True)
+    for (product_instance, transcript), ner_data in zip(transcribed, ner_results):
+        with metrics.recording(runs.get(product_instance.id)) as run:
+            run.absorb(batch_run, len(transcribed))
+            if ner_data is None:
+                save_stage_failure(product_instance, "NER failed", Product.STAGE_NER)
+                outcomes[product_instance.id] = False
+                continue
+            save_extraction(product_instance, transcript, ner_data)
+        outcomes[product_instance.id] = True
+    return outcomes
@@ -1,15 +1,84 @@
 # core/views.py
 
+import re
+
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import require_GET
 from rest_framework import generics, status, permissions
+from rest_framework.parsers import MultiPartParser
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
-from drf_yasg.utils import swagger_auto_schema
-from .models import Product
-from .serializers import ProductCreateSerializer, ProductRetrieveSerializer
+from rest_framework.utils.urls import replace_query_param
+from drf_yasg import openapi
+from drf_yasg.utils import no_body, swagger_auto_schema
+from .cache import get_product_payloads
+from .events import (
+    EVENTS_LONG_POLL_TIMEOUT, STAGE_DONE, EventStreamRenderer, advance, already_done, astream_events, format_cursor,
+    parse_cursor, product_stage, product_state, stream_events, wait_for_change,
+)
+from .extraction import DEFAULT_CURRENCY
+from .hashing import hash_chunks
+from .metrics import flush_stats, render_metrics
+from .models import Product, UploadSession
+from .pagination import KeysetPagination
+from .serializers import (
+    ProductCreateSerializer, ProductListQuerySerializer, ProductRetrieveSerializer, ProductSearchQuerySerializer,
+    ProductStatsQuerySerializer, UploadSessionSerializer,
+)
+from .search import search_products
+from .stats import product_stats
+from .uploadhandlers import HashingTemporaryFileUploadHandler
+from .uploads import (
+    BULK_UPLOAD_MAX_ITEMS, UPLOAD_CHUNK_MAX_SIZE, UPLOAD_MAX_SIZE, UploadConflict, UploadUnsupported,
+    bulk_create_products, create_upload_session, finalize_upload, write_upload_chunk,
+)
 from .utils import extract_and_save  # Assuming you have a utility function to handle transcription and NER
 
 from rest_framework.permissions import AllowAny
 
 
+def product_etag(request, products, *extra):
+    """
+    Builds an ETag from the (id, version) of every product in the response,
+    plus the sparse-field selection and anything else that shapes the body.
+    """
+    parts = [f"{product.pk}:{product.version}" for product in products]
+    parts.append(request.query_params.get('fields', ''))
+    parts.extend(str(value) for value in extra)
+    return quote_etag(hash_chunks(['|'.join(parts).encode()])[:32])
+
+
+def not_modified(request, etag, last_modified=None):
+    """
+    Returns a 304 response if the client's validators still match, else None.
+    """
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    return get_conditional_response(request, etag=etag, last_modified=timestamp)
+
+
+def with_validators(response, etag, last_modified=None):
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    # Clients may keep the body but must revalidate before reusing it
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+def present_product(request, payload):
+    """
+    Applies `?fields=` and absolute media URLs to a cached product payload.
+    """
+    requested = ProductRetrieveSerializer.requested_fields(request)
+    data = {name: value for name, value in payload.items() if not requested or name in requested}
+    if data.get('audio_url'):
+        data['audio_url'] = request.build_absolute_uri(data['audio_url'])
+    return data
+
+
 
 class ProductCreateAPIView(generics.CreateAPIView):
     """
@@ -47,6 +116,199 @@ class ProductCreateAPIView(generics.CreateAPIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class ProductBulkCreateAPIView(generics.GenericAPIView):
+    """
+    API view to create many Products from one multipart upload.
+    """
+    queryset = Product.objects.all()
+    serializer_class = ProductCreateSerializer
+    parser_classes = [MultiPartParser]
+    permission_classes = [AllowAny]  # Open to everyone
+    authentication_classes = []  # No authentication required
+
+    @swagger_auto_schema(
+        operation_description=(
+            "Create many Products at once. Repeat `call_sid` and `audio_url` once per recording; they are "
+            f"paired by position (at most {BULK_UPLOAD_MAX_ITEMS}). Valid items are created and queued even if "
+            "others fail; `results` reports each item."
+        ),
+        manual_parameters=[
+            openapi.Parameter('call_sid', openapi.IN_FORM, type=openapi.TYPE_STRING, required=True),
+            openapi.Parameter('audio_url', openapi.IN_FORM, type=openapi.TYPE_FILE, required=True),
+        ],
+        responses={
+            201: 'All products created.',
+            207: 'Some items were rejected; see `results`.',
+            400: 'Bad Request - No valid items.',
+        },
+        operation_summary="Create products from many audio files."
+    )
+    def post(self, request, *args, **kwargs):
+        """
+        Validate each (call_sid, audio) pair, then store and queue the valid ones in bulk.
+        """
+        # Spool every file to disk while hashing it, however small, so a batch
+        # of hundreds of recordings does not sit in memory
+        request._request.upload_handlers = [HashingTemporaryFileUploadHandler(request._request)]
+
+        call_sids = request.data.getlist('call_sid')
+        files = request.FILES.getlist('audio_url')
+        count = max(len(call_sids), len(files))
+        if count == 0:
+            return Response({'detail': 'No items.'}, status=status.HTTP_400_BAD_REQUEST)
+        if count > BULK_UPLOAD_MAX_ITEMS:
+            return Response({'detail': f'At most {BULK_UPLOAD_MAX_ITEMS} items per request.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        results, valid, positions = [], [], []
+        for index in range(count):
+            serializer = self.get_serializer(data={
+                'call_sid': call_sids[index] if index < len(call_sids) else None,
+                'audio_url': files[index] if index < len(files) else None,
+            })
+            if serializer.is_valid():
+                valid.append(serializer.validated_data)
+                positions.append(index)
+                results.append(None)
+            else:
+                results.append({'index': index, 'status': 'rejected', 'errors': serializer.errors})
+
+        if not valid:
+            return Response({'results': results}, status=status.HTTP_400_BAD_REQUEST)
+
+        for index, product in zip(positions, bulk_create_products(valid)):
+            results[index] = {'index': index, 'status': 'created', 'id': product.id, 'call_sid': product.call_sid}
+
+        code = status.HTTP_201_CREATED if len(valid) == count else status.HTTP_207_MULTI_STATUS
+        return Response({'results': results}, status=code)
+
+
+CONTENT_RANGE_RE = re.compile(r'^bytes (\d+)-(\d+)/(\d+|\*)$')
+
+
+class UploadSessionCreateAPIView(generics.CreateAPIView):
+    """
+    API view to open a resumable upload for a large recording.
+    """
+    queryset = UploadSession.objects.all()
+    serializer_class = UploadSessionSerializer
+    permission_classes = [AllowAny]  # Open to everyone
+    authentication_classes = []  # No authentication required
+
+    def get_serializer_context(self):
+        return {**super().get_serializer_context(), 'max_size': UPLOAD_MAX_SIZE}
+
+    @swagger_auto_schema(
+        operation_description=(
+            "Open a resumable upload. Then PUT the bytes to `/product/uploads/<id>/` in chunks with a "
+            "`Content-Range: bytes start-end/size` header, and POST `/product/uploads/<id>/finalize/` "
+            "to create the Product. After an interruption, GET the session and continue from `received`."
+        ),
+        request_body=UploadSessionSerializer,
+        responses={
+            201: UploadSessionSerializer(),
+            400: 'Bad Request - Invalid data, or the server stores audio where resumable uploads cannot write.',
+        },
+        tags=['Upload'],
+    )
+    def post(self, request, *args, **kwargs):
+        try:
+            return super().post(request, *args, **kwargs)
+        except UploadUnsupported as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    def perform_create(self, serializer):
+        data = serializer.validated_data
+        serializer.instance = create_upload_session(data['call_sid'], data['filename'], data['size'])
+
+
+class UploadSessionAPIView(generics.GenericAPIView):
+    """
+    API view to inspect a resumable upload and send it byte ranges.
+    """
+    queryset = UploadSession.objects.all()
+    serializer_class = UploadSessionSerializer
+    parser_classes = []  # The body is read as a raw stream
+    permission_classes = [AllowAny]  # Open to everyone
+    authentication_classes = []  # No authentication required
+
+    @swagger_auto_schema(
+        operation_description="Get an upload's progress; resume by sending bytes from `received` on.",
+        responses={200: UploadSessionSerializer(), 404: 'Upload Not Found'},
+        tags=['Upload'],
+    )
+    def get(self, request, *args, **kwargs):
+        return Response(self.get_serializer(self.get_object()).data)
+
+    @swagger_auto_schema(
+        operation_description=(
+            "Write one chunk. The body holds the raw bytes named by `Content-Range: bytes start-end/size`; "
+            "`start` may be at or before `received` (already stored bytes are skipped)."
+        ),
+        manual_parameters=[
+            openapi.Parameter('Content-Range', openapi.IN_HEADER, type=openapi.TYPE_STRING, required=True),
+        ],
+        responses={
+            200: UploadSessionSerializer(),
+            400: 'Bad Request - Missing or malformed Content-Range, or a short body.',
+            404: 'Upload Not Found',
+            409: 'Conflict - The chunk does not continue the upload; see `received`.',
+            413: 'Chunk Too Large',
+        },
+        tags=['Upload'],
+    )
+    def put(self, request, *args, **kwargs):
+        match = CONTENT_RANGE_RE.match(request.headers.get('Content-Range', ''))
+        if not match:
+            return Response({'detail': 'Content-Range: bytes start-end/size is required.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        start, end = int(match.group(1)), int(match.group(2))
+        if end < start:
+            return Response({'detail': 'Invalid Content-Range.'}, status=status.HTTP_400_BAD_REQUEST)
+        if end - start + 1 > UPLOAD_CHUNK_MAX_SIZE:
+            return Response({'detail': f'Chunks are limited to {UPLOAD_CHUNK_MAX_SIZE} bytes.'},
+                            status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+        try:
+            session = write_upload_chunk(self.kwargs['pk'], start, end, request._request)
+        except UploadSession.DoesNotExist:
+            raise Http404
+        except UploadConflict as e:
+            return Response({'detail': str(e), 'received': e.offset}, status=status.HTTP_409_CONFLICT)
+        except ValueError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(self.get_serializer(session).data)
+
+
+class UploadSessionFinalizeAPIView(generics.GenericAPIView):
+    """
+    API view to turn a fully received upload into a Product.
+    """
+    queryset = UploadSession.objects.all()
+    serializer_class = ProductRetrieveSerializer
+    permission_classes = [AllowAny]  # Open to everyone
+    authentication_classes = []  # No authentication required
+
+    @swagger_auto_schema(
+        operation_description="Create the Product for a complete upload. Repeating the call returns the same Product.",
+        request_body=no_body,
+        responses={
+            201: ProductRetrieveSerializer(),
+            404: 'Upload Not Found',
+            409: 'Conflict - Bytes are still missing; see `received`.',
+        },
+        tags=['Upload'],
+    )
+    def post(self, request, *args, **kwargs):
+        try:
+            product = finalize_upload(self.kwargs['pk'])
+        except UploadSession.DoesNotExist:
+            raise Http404
+        except UploadConflict as e:
+            return Response({'detail': str(e), 'received': e.offset}, status=status.HTTP_409_CONFLICT)
+        return Response(self.get_serializer(product).data, status=status.HTTP_201_CREATED)
+
+
 class ProductRetrieveAPIView(generics.RetrieveAPIView):
     """
     API view to retrieve a single Product by its `call_sid`.
@@ -71,26 +333,300 @@ class ProductRetrieveAPIView(generics.RetrieveAPIView):
         """
         return super().get(request, *args, **kwargs)
 
+    def get_queryset(self):
+        # Only the validators; the full row is loaded on a payload cache miss
+        return super().get_queryset().only('id', 'version', 'updated_at')
+
+    def retrieve(self, request, *args, **kwargs):
+        product = self.get_object()
+        etag = product_etag(request, [product])
+        response = not_modified(request, etag, product.updated_at)
+        if response is None:
+            payload = get_product_payloads([product])[product.pk]
+            response = Response(present_product(request, payload))
+        return with_validators(response, etag, product.updated_at)
+
 
 class ProductListAPIView(generics.ListAPIView):
     """
-    API view to list all Product instances.
+    API view to list Product instances, newest first, one keyset page at a time.
     """
     queryset = Product.objects.all()
     serializer_class = ProductRetrieveSerializer
+    pagination_class = KeysetPagination
     permission_classes = [permissions.AllowAny]  # Open to everyone
     authentication_classes = []  # No authentication required
 
+    def get_filters(self):
+        query = ProductListQuerySerializer(data=self.request.query_params)
+        query.is_valid(raise_exception=True)
+        return query.validated_data
+
+    def get_queryset(self):
+        # Page on the cursor keys and validators; payloads come from the cache
+        queryset = super().get_queryset().only('id', 'created_at', 'version', 'updated_at')
+        self.filters = filters = self.get_filters()
+        if 'currency' in filters or 'min_price' in filters or 'max_price' in filters:
+            queryset = queryset.filter(price_currency=filters.get('currency', DEFAULT_CURRENCY))
+        if 'min_price' in filters:
+            queryset = queryset.filter(price_amount__gte=filters['min_price'])
+        if 'max_price' in filters:
+            queryset = queryset.filter(price_amount__lte=filters['max_price'])
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        page = self.paginate_queryset(self.get_queryset())
+        # No Last-Modified: deletions would not move it, the ETag covers them
+        etag = product_etag(request, page, self.paginator.has_next, sorted(self.filters.items()))
+        response = not_modified(request, etag)
+        if response is None:
+            payloads = get_product_payloads(page)
+            data = [present_product(request, payloads[product.pk]) for product in page if product.pk in payloads]
+            response = self.get_paginated_response(data)
+        return with_validators(response, etag)
 
     @swagger_auto_schema(
-        operation_description="List all Products in the system.",
+        operation_description=(
+            "List Products, newest first. Pages are cursor-based: follow `next`, or pass `cursor`. "
+            "Use `page_size` to size pages, `order=asc` to walk oldest-first, and "
+            "`fields=id,processed,...` to return only some fields. `min_price`/`max_price` filter on the "
+            "parsed price in `currency` (default NPR)."
+        ),
+        manual_parameters=[
+            openapi.Parameter('cursor', openapi.IN_QUERY, type=openapi.TYPE_STRING, description="Opaque page cursor."),
+            openapi.Parameter('page_size', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, description="Rows per page."),
+            openapi.Parameter('order', openapi.IN_QUERY, type=openapi.TYPE_STRING, enum=['desc', 'asc']),
+            openapi.Parameter('fields', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+                              description="Comma-separated fields to include."),
+            openapi.Parameter('min_price', openapi.IN_QUERY, type=openapi.TYPE_NUMBER,
+                              description="Lowest price_amount to include."),
+            openapi.Parameter('max_price', openapi.IN_QUERY, type=openapi.TYPE_NUMBER,
+                              description="Highest price_amount to include."),
+            openapi.Parameter('currency', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+                              description="ISO currency code of the price filters, e.g. NPR."),
+        ],
         responses={
             200: ProductRetrieveSerializer(many=True),  # List of products
+            400: 'Bad Request - Invalid filters.',
         },
         tags=['Product'],
     )
     def get(self, request, *args, **kwargs):
         """
-        List all products with basic information (name, price, etc.).
+        List products with basic information (name, price, etc.).
         """
         return super().get(request, *args, **kwargs)
+
+
+class ProductSearchAPIView(generics.GenericAPIView):
+    """
+    API view for ranked full-text search over transcriptions and extracted
+    fields, served from the database's full-text index.
+    """
+    queryset = Product.objects.all()
+    permission_classes = [permissions.AllowAny]  # Open to everyone
+    authentication_classes = []  # No authentication required
+
+    @swagger_auto_schema(
+        operation_description=(
+            "Search products by product name, description, location, price, transcription or call SID, best "
+            "match first. Every word must match, as a prefix, so `चितवन` also finds `चितवनबाट`; digits match in "
+            "either script. Follow `next` for more results; `fields=` works as on the list."
+        ),
+        query_serializer=ProductSearchQuerySerializer,
+        responses={
+            200: ProductRetrieveSerializer(many=True),
+            400: 'Bad Request - Invalid parameters.',
+        },
+        tags=['Product'],
+    )
+    def get(self, request, *args, **kwargs):
+        """
+        Return one page of matches; the index does the work, not a table scan.
+        """
+        query = ProductSearchQuerySerializer(data=request.query_params)
+        if not query.is_valid():
+            return Response(query.errors, status=status.HTTP_400_BAD_REQUEST)
+        q, page, page_size = (query.validated_data[name] for name in ('q', 'page', 'page_size'))
+
+        # One extra id tells whether another page exists
+        ids = search_products(q, page_size + 1, (page - 1) * page_size)
+        has_next = len(ids) > page_size
+        rows = self.get_queryset().only('id', 'version', 'updated_at').in_bulk(ids[:page_size])
+        products = [rows[pk] for pk in ids[:page_size] if pk in rows]
+
+        etag = product_etag(request, products, has_next, q, page)
+        response = not_modified(request, etag)
+        if response is None:
+            payloads = get_product_payloads(products)
+            response = Response({
+                'next': replace_query_param(request.build_absolute_uri(), 'page', page + 1) if has_next else None,
+                'results': [present_product(request, payloads[p.pk]) for p in products if p.pk in payloads],
+            })
+        return with_validators(response, etag)
+
+
+class ProductStatsAPIView(generics.GenericAPIView):
+    """
+    API view returning aggregate Product statistics computed in the database.
+    """
+    queryset = Product.objects.all()
+    permission_classes = [permissions.AllowAny]  # Open to everyone
+    authentication_classes = []  # No authentication required
+
+    @swagger_auto_schema(
+        operation_description=(
+            "Status counts, products created per hour/day/week, processing-latency percentiles and price "
+            "statistics per currency, optionally limited to a created_at range."
+        ),
+        query_serializer=ProductStatsQuerySerializer,
+        responses={
+            200: 'Aggregate statistics.',
+            400: 'Bad Request - Invalid parameters.',
+        },
+        tags=['Product'],
+    )
+    def get(self, request, *args, **kwargs):
+        """
+        Return statistics whose size depends on the number of buckets, not rows.
+        """
+        query = ProductStatsQuerySerializer(data=request.query_params)
+        if not query.is_valid():
+            return Response(query.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(product_stats(**query.validated_data))
+
+
+class ProductEventsAPIView(generics.GenericAPIView):
+    """
+    API view pushing a Product's processing transitions as they happen.
+
+    With `Accept: text/event-stream` it streams Server-Sent Events; otherwise
+    it long-polls and returns the next change as JSON.
+    """
+    queryset = Product.objects.all()
+    renderer_classes = [JSONRenderer, EventStreamRenderer]
+    permission_classes = [permissions.AllowAny]  # Open to everyone
+    authentication_classes = []  # No authentication required
+
+    @swagger_auto_schema(
+        operation_description=(
+            "Wait for a Product's status to change. Events: `status`, `transcription_done`, `ner_done`, "
+            "`processed`. Pass the last `cursor` (or SSE Last-Event-ID) as `since` to resume."
+        ),
+        manual_parameters=[
+            openapi.Parameter('since', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+                              description="Cursor from the previous response."),
+            openapi.Parameter('timeout', openapi.IN_QUERY, type=openapi.TYPE_NUMBER,
+                              description="Seconds to wait for a change (long-poll only)."),
+        ],
+        responses={
+            200: 'Next change (JSON) or an event stream.',
+            404: 'Product Not Found',
+        },
+        tags=['Product'],
+    )
+    def get(self, request, *args, **kwargs):
+        """
+        Stream or long-poll status changes for one product.
+        """
+        pk = self.kwargs['pk']
+        cursor = request.query_params.get('since') or request.headers.get('Last-Event-ID')
+
+        if request.accepted_renderer.format == 'sse':
+            if not Product.objects.filter(pk=pk).exists():
+                raise Http404
+            if isinstance(request._request, ASGIRequest):
+                stream = astream_events(pk, cursor)
+            else:
+                stream = stream_events(pk, cursor)
+            response = StreamingHttpResponse(stream, content_type='text/event-stream')
+            response['Cache-Control'] = 'no-cache'
+            response['X-Accel-Buffering'] = 'no'  # Don't let nginx buffer the stream
+            return response
+
+        try:
+            timeout = min(float(request.query_params.get('timeout', EVENTS_LONG_POLL_TIMEOUT)), EVENTS_LONG_POLL_TIMEOUT)
+        except ValueError:
+            return Response({'timeout': 'Must be a number.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        version, stage = parse_cursor(cursor)
+        state = product_state(pk)
+        if state is not None and already_done(state, version):
+            # Nothing more will change; answer without waiting out the timeout
+            return Response(already_done(state, version))
+        state = wait_for_change(pk, version, max(0.0, timeout))
+        if state is None:
+            raise Http404
+        change = advance(state, version, stage) or {
+            'cursor': format_cursor(version, stage),
+            'state': state,
+            'events': [],
+            'done': product_stage(state) == STAGE_DONE,
+        }
+        return Response(change)
+
+
+class ProductChangesAPIView(generics.GenericAPIView):
+    """
+    API view returning Products created or modified after a change token, in
+    the order the changes were committed.
+    """
+    queryset = Product.objects.all()
+    permission_classes = [permissions.AllowAny]  # Open to everyone
+    authentication_classes = []  # No authentication required
+
+    @swagger_auto_schema(
+        operation_description=(
+            "Delta sync: returns up to `page_size` products changed after `since` (omit it for a full sync). "
+            "Store `next` and pass it as `since` on the following call; keep going while `has_more` is true."
+        ),
+        manual_parameters=[
+            openapi.Parameter('since', openapi.IN_QUERY, type=openapi.TYPE_STRING, description="Change token."),
+            openapi.Parameter('page_size', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, description="Rows per page."),
+            openapi.Parameter('fields', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+                              description="Comma-separated fields to include."),
+        ],
+        responses={
+            200: 'Changed products and the next token.',
+            400: 'Bad Request - Invalid token.',
+        },
+        tags=['Product'],
+    )
+    def get(self, request, *args, **kwargs):
+        """
+        Return one bounded page of changes; cost follows churn, not table size.
+        """
+        token = request.query_params.get('since') or '0'
+        if not token.isdigit():
+            return Response({'since': 'Invalid change token.'}, status=status.HTTP_400_BAD_REQUEST)
+        since = int(token)
+        page_size = KeysetPagination().get_page_size(request)
+
+        rows = list(
+            self.get_queryset().filter(change_seq__gt=since).order_by('change_seq')
+            .only('id', 'version', 'change_seq')[:page_size + 1]
+        )
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+
+        payloads = get_product_payloads(rows)
+        return Response({
+            'since': str(since),
+            'next': str(rows[-1].change_seq if rows else since),
+            'has_more': has_more,
+            'results': [present_product(request, payloads[row.pk]) for row in rows if row.pk in payloads],
+        })
+
+
+@require_GET
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint: processing latency histograms, outcomes,
+    token usage, cache and pipeline counters and queue depth in the text
+    exposition format.
+    """
+    flush_stats()
+    response = HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
+    patch_cache_control(response, no_store=True)
+    return response
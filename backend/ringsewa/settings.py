@@ -20,7 +20,8 @@ load_dotenv()
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
-BASE_MEDIA_URL = os.getenv('BASE_MEDIA_URL')
+BASE_MEDIA_URL = os.getenv('BASE_MEDIA_URL')  # Only used when storage cannot open uploaded audio
+AUDIO_SPOOL_MAX_SIZE = int(os.getenv('AUDIO_SPOOL_MAX_SIZE', 5 * 1024 * 1024))  # bytes kept in memory before spilling to disk
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/4.2/howto/deployment/checklist/
@@ -30,6 +31,114 @@ SECRET_KEY = os.getenv('DJANGO_SECRET_KEY')
 
 # OpenAI API Keys
 OPENAI_KEY = os.getenv('OPENAI_KEY')
+OPENAI_API_BASE = os.getenv('OPENAI_API_BASE', 'https://api.openai.com/v1')
+
+# AI backends (core/providers.py). BACKEND is OpenAIProvider, OpenAICompatibleProvider
+# (e.g. a local Whisper/LLM server) or FakeProvider; the *_PROVIDERS lists are tried in order
+AI_PROVIDERS = {
+    'openai': {
+        'BACKEND': 'core.providers.OpenAIProvider',
+        'API_BASE': OPENAI_API_BASE,
+        'API_KEY': OPENAI_KEY,
+    },
+}
+if os.getenv('AI_LOCAL_API_BASE'):
+    AI_PROVIDERS['local'] = {
+        'BACKEND': 'core.providers.OpenAICompatibleProvider',
+        'API_BASE': os.getenv('AI_LOCAL_API_BASE'),
+        'API_KEY': os.getenv('AI_LOCAL_API_KEY'),
+        'TRANSCRIPTION_MODEL': os.getenv('AI_LOCAL_TRANSCRIPTION_MODEL', 'whisper-1'),
+        'CHAT_MODEL': os.getenv('AI_LOCAL_CHAT_MODEL', 'gpt-4-turbo'),
+    }
+if os.getenv('AI_FAKE_PROVIDER'):
+    AI_PROVIDERS['fake'] = {
+        'BACKEND': 'core.providers.FakeProvider',
+        'TRANSCRIPT': os.getenv('AI_FAKE_TRANSCRIPT', 'नमस्ते'),
+        'LATENCY': float(os.getenv('AI_FAKE_LATENCY', 0)),
+        'FAILURE_RATE': float(os.getenv('AI_FAKE_FAILURE_RATE', 0)),
+    }
+_ai_default_order = ','.join(AI_PROVIDERS)
+AI_TRANSCRIPTION_PROVIDERS = os.getenv('AI_TRANSCRIPTION_PROVIDERS', _ai_default_order).split(',')
+AI_CHAT_PROVIDERS = os.getenv('AI_CHAT_PROVIDERS', _ai_default_order).split(',')
+# Hedging: if a backend is slower than its recent p95, also ask the next one
+AI_HEDGE_ENABLED = os.getenv('AI_HEDGE_ENABLED', 'true').lower() == 'true'
+AI_HEDGE_PERCENTILE = int(os.getenv('AI_HEDGE_PERCENTILE', 95))
+AI_HEDGE_DEFAULT_DELAY = float(os.getenv('AI_HEDGE_DEFAULT_DELAY', 10.0))  # seconds, until enough samples
+AI_HEDGE_MIN_DELAY = float(os.getenv('AI_HEDGE_MIN_DELAY', 0.5))
+
+# Outbound HTTP (core/clients.py): pooled keep-alive session, retries, circuit breaker
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', 20))
+HTTP_MAX_ATTEMPTS = int(os.getenv('HTTP_MAX_ATTEMPTS', 4))
+HTTP_BACKOFF_BASE = float(os.getenv('HTTP_BACKOFF_BASE', 0.5))  # seconds, doubled per attempt with full jitter
+HTTP_BACKOFF_MAX = float(os.getenv('HTTP_BACKOFF_MAX', 30.0))
+HTTP_TIMEOUTS = {  # (connect, read) seconds per endpoint
+    'transcription': (5, 120),
+    'chat': (5, 60),
+    'media': (5, 30),
+}
+CIRCUIT_BREAKER_THRESHOLD = int(os.getenv('CIRCUIT_BREAKER_THRESHOLD', 5))  # consecutive failures before opening
+CIRCUIT_BREAKER_RESET = float(os.getenv('CIRCUIT_BREAKER_RESET', 30.0))  # seconds before a trial request
+
+# Product list API: keyset page size (`?page_size=` is capped at the maximum)
+PRODUCT_PAGE_SIZE = int(os.getenv('PRODUCT_PAGE_SIZE', 100))
+PRODUCT_MAX_PAGE_SIZE = int(os.getenv('PRODUCT_MAX_PAGE_SIZE', 1000))
+
+# Full-text search API (`/product/search/`): results per page and the cap on `?page_size=`
+SEARCH_PAGE_SIZE = int(os.getenv('SEARCH_PAGE_SIZE', 20))
+SEARCH_MAX_PAGE_SIZE = int(os.getenv('SEARCH_MAX_PAGE_SIZE', 100))
+
+# Serialized product payloads are cached per (id, version). Local memory by
+# default; point CACHE_BACKEND/CACHE_LOCATION at e.g. Redis to share it.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'ringsewa'),
+    },
+}
+PRODUCT_CACHE_ALIAS = os.getenv('PRODUCT_CACHE_ALIAS', 'default')
+PRODUCT_CACHE_TTL = int(os.getenv('PRODUCT_CACHE_TTL', 60 * 60))
+
+# Status events (`/product/<id>/events/`): SSE under ASGI, long-poll under WSGI
+EVENTS_POLL_INTERVAL = float(os.getenv('EVENTS_POLL_INTERVAL', 0.5))  # seconds between checks for worker updates
+EVENTS_LONG_POLL_TIMEOUT = float(os.getenv('EVENTS_LONG_POLL_TIMEOUT', 25.0))
+EVENTS_STREAM_TIMEOUT = float(os.getenv('EVENTS_STREAM_TIMEOUT', 300.0))  # ASGI streams reconnect after this
+EVENTS_KEEPALIVE = float(os.getenv('EVENTS_KEEPALIVE', 15.0))
+
+# Background processing queue (see `manage.py run_workers`)
+JOB_VISIBILITY_TIMEOUT = int(os.getenv('JOB_VISIBILITY_TIMEOUT', 300))  # seconds a claimed job stays leased
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', 5))
+JOB_RETRY_BACKOFF = int(os.getenv('JOB_RETRY_BACKOFF', 30))  # seconds, multiplied by the attempt number
+WORKER_CONCURRENCY = int(os.getenv('WORKER_CONCURRENCY', 2))
+WORKER_POLL_INTERVAL = float(os.getenv('WORKER_POLL_INTERVAL', 1.0))
+ASYNC_PIPELINE_CONCURRENCY = int(os.getenv('ASYNC_PIPELINE_CONCURRENCY', 100))  # jobs in flight with `run_workers --async`
+METRICS_RUN_RETENTION = int(os.getenv('METRICS_RUN_RETENTION', 7 * 24 * 60 * 60))  # seconds processing runs are kept for /metrics
+METRICS_STATS_FLUSH_INTERVAL = float(os.getenv('METRICS_STATS_FLUSH_INTERVAL', 10))  # seconds between saves of cache/pipeline counters
+
+# In-process LRU in front of the transcript cache table
+TRANSCRIPT_CACHE_SIZE = int(os.getenv('TRANSCRIPT_CACHE_SIZE', 1024))
+
+# NER result cache: in-process LRU size and database TTL (seconds)
+NER_CACHE_SIZE = int(os.getenv('NER_CACHE_SIZE', 1024))
+NER_CACHE_TTL = int(os.getenv('NER_CACHE_TTL', 30 * 24 * 60 * 60))
+
+# Audio preprocessing before Whisper upload (WAV only): mono, resample, trim silence
+AUDIO_PREPROCESS = os.getenv('AUDIO_PREPROCESS', 'true').lower() == 'true'
+AUDIO_TARGET_RATE = int(os.getenv('AUDIO_TARGET_RATE', 16000))
+AUDIO_SILENCE_THRESHOLD_DB = float(os.getenv('AUDIO_SILENCE_THRESHOLD_DB', -40.0))
+AUDIO_MIN_SECONDS = float(os.getenv('AUDIO_MIN_SECONDS', 1.0))  # shorter recordings are rejected
+
+# Recordings longer than this are split at silences and transcribed in parallel
+TRANSCRIBE_CHUNK_SECONDS = float(os.getenv('TRANSCRIBE_CHUNK_SECONDS', 120.0))
+TRANSCRIBE_CHUNK_OVERLAP = float(os.getenv('TRANSCRIBE_CHUNK_OVERLAP', 1.0))
+TRANSCRIBE_CHUNK_CONCURRENCY = int(os.getenv('TRANSCRIBE_CHUNK_CONCURRENCY', 4))
+TRANSCRIBE_CHUNK_RETRIES = int(os.getenv('TRANSCRIBE_CHUNK_RETRIES', 2))
+
+# Transcripts packed into one NER request when workers have a backlog
+NER_BATCH_SIZE = int(os.getenv('NER_BATCH_SIZE', 8))
+
+# Rule-based extraction before the LLM; the LLM is only asked about fields scoring below the threshold (0-1)
+NER_FAST_PATH = os.getenv('NER_FAST_PATH', 'true').lower() == 'true'
+NER_FAST_PATH_THRESHOLD = float(os.getenv('NER_FAST_PATH_THRESHOLD', 0.8))
 
 
 DEBUG = True
@@ -118,6 +227,19 @@ DATABASES = {
     }
 }
 
+# Set DATABASE_ENGINE=postgresql (plus the DATABASE_* connection settings) to
+# run on PostgreSQL; full-text search then uses a tsvector column instead of FTS5
+# (needs the optional `psycopg` driver, which requirements.txt leaves out)
+if os.getenv('DATABASE_ENGINE') == 'postgresql':
+    DATABASES['default'] = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.getenv('DATABASE_NAME', 'ringsewa'),
+        'USER': os.getenv('DATABASE_USER', ''),
+        'PASSWORD': os.getenv('DATABASE_PASSWORD', ''),
+        'HOST': os.getenv('DATABASE_HOST', ''),
+        'PORT': os.getenv('DATABASE_PORT', ''),
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -186,6 +308,21 @@ STATIC_ROOT = f"{os.environ.get('HOST_PATH')}/static"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = f"{os.environ.get('HOST_PATH')}/media"
 
+# Hash uploaded audio while it streams in (see core/uploadhandlers.py)
+FILE_UPLOAD_HANDLERS = [
+    'core.uploadhandlers.HashingMemoryFileUploadHandler',
+    'core.uploadhandlers.HashingTemporaryFileUploadHandler',
+]
+
+# Bulk uploads (`/product/bulk/`): recordings per request
+BULK_UPLOAD_MAX_ITEMS = int(os.getenv('BULK_UPLOAD_MAX_ITEMS', 500))
+DATA_UPLOAD_MAX_NUMBER_FILES = BULK_UPLOAD_MAX_ITEMS
+
+# Resumable uploads (`/product/uploads/`)
+UPLOAD_CHUNK_MAX_SIZE = int(os.getenv('UPLOAD_CHUNK_MAX_SIZE', 8 * 1024 * 1024))  # bytes per PUT
+UPLOAD_MAX_SIZE = int(os.getenv('UPLOAD_MAX_SIZE', 2 * 1024 * 1024 * 1024))
+UPLOAD_SESSION_TTL = int(os.getenv('UPLOAD_SESSION_TTL', 24 * 60 * 60))  # seconds an idle session is kept
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
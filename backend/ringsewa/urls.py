@@ -7,6 +7,8 @@ from rest_framework import permissions
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
 
+from core.views import metrics_view
+
 schema_view = get_schema_view(
    openapi.Info(
       title="RingSewa API",
@@ -23,6 +25,7 @@ schema_view = get_schema_view(
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('product/', include('core.urls')),
+    path('metrics', metrics_view, name='metrics'),  # Prometheus scrape target
     
     # Swagger UI and ReDoc
     path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),